@@ -7,8 +7,12 @@ from flask_cors import CORS
 from config import Config
 from app.extentions import db
 from app.api import api_bp
+from app.service.migration_service import MigrationService
+from app.service.import_job_service import ImportJobService
+from app.service.cashflow_search_service import CashflowSearchService
+from app.service.cost_basis_service import CostBasisService
 
-def create_app():
+def create_app(migrate=True):
     app = Flask(__name__)
     CORS(app)
     app.config.from_object(Config)
@@ -18,9 +22,19 @@ def create_app():
     # 初始化数据库
     db.init_app(app)
 
-    # 创建数据库表
+    # 创建数据库表，并对已有的库执行未执行的结构迁移
     with app.app_context():
         db.create_all()
+        if migrate:
+            MigrationService.upgrade()
+
+    # 通过 ORM 增删改现金流时同步维护搜索索引
+    CashflowSearchService.register()
+    # 交易变更提交后清除对应证券的批次成本缓存
+    CostBasisService.register()
+
+    # 启动后台导入任务队列；未完成的任务只在服务进程中恢复（见 run.py），命令行脚本不会接管
+    ImportJobService.init_app(app)
 
     # 注册总API蓝图
     app.register_blueprint(api_bp, url_prefix='/api')
@@ -2,7 +2,8 @@
 # app/api/asset/__init__.py
 from flask import Blueprint
 from flask_restful import Api
-from .resources import AssetBalanceResource, PositionListResource, AccountBalanceListResource
+from .resources import AssetBalanceResource, PositionListResource, PositionResource, PositionLotResource, \
+    NavResource, RiskResource, AccountBalanceListResource
 
 # 定义蓝图，URL 前缀 /api/account
 asset_bp = Blueprint("asset", __name__, url_prefix='/asset')
@@ -13,3 +14,7 @@ api = Api(asset_bp)
 # 注册资源（RESTful 接口）
 api.add_resource(AssetBalanceResource, '/balance')
 api.add_resource(PositionListResource, '/position')
+api.add_resource(PositionResource, '/position/<string:stock_code>')
+api.add_resource(PositionLotResource, '/position/<string:stock_code>/lots')
+api.add_resource(NavResource, '/nav')
+api.add_resource(RiskResource, '/risk')
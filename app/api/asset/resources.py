@@ -2,7 +2,7 @@
 # app/api/asset/resources.py
 from datetime import datetime
 
-from sqlalchemy import func
+from sqlalchemy import func, select
 from flask import request
 from flask_restful import Resource
 from marshmallow import Schema, fields, validate, ValidationError
@@ -12,6 +12,10 @@ from app.models import BankStatementSummary  # 假设 models.py 里有上面的
 
 from app.extentions import db
 from app.models import VCurrentAsset, AccountBalance, AccountMonthlyBalance
+from app.service.cost_basis_service import CostBasisService
+from app.service.nav_service import NavService
+from app.service.risk_service import RiskService
+from app.service.position_service import PositionService
 
 class AssetBalanceResource(Resource):
     """账户余额资源"""
@@ -57,44 +61,41 @@ class PositionListResource(Resource):
             page_num = int(request.args.get('pageNum', 1))
             page_size = int(request.args.get('pageSize', 10))
 
-            # 构建查询
-            query = VCurrentAsset.query
-
-            # 应用排序
-            sort_by = request.args.get('sortBy', 'stock_code')
+            # 应用排序，证券代码作为次级排序保证分页稳定
+            columns = VCurrentAsset.__table__.c
+            sort_column = columns.get(request.args.get('sortBy', 'stock_code'), columns.stock_code)
             sort_order = request.args.get('sortOrder', 'asc')
-
-            if hasattr(VCurrentAsset, sort_by):
-                if sort_order.lower() == 'desc':
-                    query = query.order_by(getattr(VCurrentAsset, sort_by).desc())
-                else:
-                    query = query.order_by(getattr(VCurrentAsset, sort_by).asc())
+            order = sort_column.desc() if sort_order.lower() == 'desc' else sort_column.asc()
+
+            # 总数和总现值由窗口函数在同一次查询中计算，视图只计算一次
+            total_count = func.count().over().label('total_count')
+            total_realized_value = func.sum(VCurrentAsset.realized_pnl).over().label('total_realized_value')
+            rows = db.session.execute(
+                select(VCurrentAsset, total_count, total_realized_value)
+                .order_by(order, columns.stock_code.asc())
+                .limit(page_size).offset((page_num - 1) * page_size)
+            ).all()
+
+            if rows:
+                total, total_value = rows[0].total_count, rows[0].total_realized_value or 0
             else:
-                query = query.order_by(VCurrentAsset.stock_code.asc())
-
-            # 分页处理
-            paginated_query = query.limit(page_size).offset((page_num - 1) * page_size).all()
-            total_count = query.count()
-
-            # 转换为字典列表
-            positions_data = [position.to_dict() for position in paginated_query]
-
-            # 计算总现值用于计算仓位
-            # 注意：这里我们需要获取所有持仓的总现值，而不是当前页的
-            all_positions = VCurrentAsset.query.all()
-            total_realized_value = sum(position.realized_pnl for position in all_positions)
+                # 页码超出范围时没有行可以携带窗口函数结果，单独汇总一次
+                total, total_value = db.session.execute(
+                    select(func.count(), func.coalesce(func.sum(VCurrentAsset.realized_pnl), 0))
+                    .select_from(VCurrentAsset)
+                ).one()
 
             # 添加仓位字段（现值/总现值）
-            for position in positions_data:
-                if total_realized_value > 0:
-                    position['position_ratio'] = position['realized_pnl'] / float(total_realized_value)
-                else:
-                    position['position_ratio'] = 0
+            positions_data = []
+            for row in rows:
+                position = row.VCurrentAsset.to_dict()
+                position['position_ratio'] = position['realized_pnl'] / float(total_value) if total_value > 0 else 0
+                positions_data.append(position)
 
             return {
                 "data": positions_data,
-                "total": total_count,
-                "total_realized_value": float(total_realized_value),
+                "total": total,
+                "total_realized_value": float(total_value),
                 "page_num": page_num,
                 "page_size": page_size
             }, 200
@@ -103,7 +104,74 @@ class PositionListResource(Resource):
             return {"error": str(e)}, 500
 
 
+class PositionResource(Resource):
+    """单个证券持仓资源"""
+
+    def get(self, stock_code):
+        """按证券代码查询持仓数量、成本及最近交易时间"""
+        position = PositionService.get(stock_code)
+        if position is None:
+            return {"error": "Position not found"}, 404
+        return position.to_dict(), 200
+
+
+class PositionLotResource(Resource):
+    """证券批次成本资源"""
+
+    def get(self, stock_code):
+        """
+        按批次计算持仓成本、已实现盈亏及分红分摊
+        请求参数：method=fifo（默认）、lifo 或 average
+        """
+        try:
+            result = CostBasisService.get(stock_code, request.args.get('method', 'fifo'))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if not result['lots'] and not result['sells'] and not result['dividends']:
+            return {"error": "Position not found"}, 404
+        return result, 200
+
 
+class NavResource(Resource):
+    """组合每日估值资源"""
+
+    def get(self):
+        """
+        读取已计算的每日市值、累计净投入和单位净值，不触发重新计算
+        请求参数：startDate、endDate（YYYY-MM-DD，包含两端日期，可省略）
+        """
+        try:
+            start, end = (datetime.strptime(value, '%Y-%m-%d').date() if value else None
+                          for value in (request.args.get('startDate'), request.args.get('endDate')))
+        except ValueError:
+            return {"error": "日期格式错误，应为 YYYY-MM-DD"}, 400
+        return [row.to_dict() for row in NavService.range(start, end)], 200
+
+
+class RiskResource(Resource):
+    """组合风险收益指标资源"""
+
+    def get(self):
+        """
+        计算组合及持仓证券的波动率、最大回撤、夏普/索提诺比率、贝塔，以及时间加权与资金加权收益率
+        请求参数：
+        - startDate、endDate：区间（YYYY-MM-DD），endDate 默认为最新行情日，startDate 默认为其前一年；
+        - benchmark：基准指数代码，默认 000300；
+        - riskFree：年化无风险利率，默认 0。
+        """
+        try:
+            start, end = (datetime.strptime(value, '%Y-%m-%d').date() if value else None
+                          for value in (request.args.get('startDate'), request.args.get('endDate')))
+            risk_free = float(request.args.get('riskFree', 0))
+        except ValueError:
+            return {"error": "参数格式错误：日期应为 YYYY-MM-DD，riskFree 应为数值"}, 400
+        if start and end and start > end:
+            return {"error": "startDate 不能晚于 endDate"}, 400
+
+        result = RiskService.get(start, end, request.args.get('benchmark', '000300'), risk_free)
+        if result is None:
+            return {"error": "No price data"}, 404
+        return result, 200
 
 
 class AccountBalanceListResource(Resource):
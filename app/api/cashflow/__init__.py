@@ -2,7 +2,8 @@
 # app/api/cashflow/__init__.py
 from flask import Blueprint
 from flask_restful import Api
-from .resources import CashflowListResource, CashflowResource, TransferResource, UploadResource
+from .resources import CashflowListResource, CashflowResource, TransferResource, TransferUnpairResource, \
+    UploadResource, UploadJobResource, ImportDirectoryResource, CashflowExportResource
 
 # 定义蓝图，URL 前缀 /api/account
 cashflow_bp = Blueprint("cashflow", __name__, url_prefix='/cashflow')
@@ -12,6 +13,10 @@ api = Api(cashflow_bp)
 
 # 注册资源（RESTful 接口）
 api.add_resource(CashflowListResource, '')
+api.add_resource(CashflowExportResource, '/export')
 api.add_resource(CashflowResource, '/<string:cashflow_id>')
 api.add_resource(TransferResource, '/transfer', '/transfer/<string:transfer_id>')
-api.add_resource(UploadResource, '/upload')
\ No newline at end of file
+api.add_resource(TransferUnpairResource, '/transfer/<string:transfer_id>/unpair')
+api.add_resource(UploadResource, '/upload')
+api.add_resource(UploadJobResource, '/upload/<string:job_id>')
+api.add_resource(ImportDirectoryResource, '/import')
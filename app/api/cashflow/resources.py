@@ -3,36 +3,141 @@
 import os
 import uuid
 from datetime import datetime
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flask_restful import Resource
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
+from sqlalchemy.exc import IntegrityError
 
 from app.models.cashflow import Cashflow
 from app.extentions import db
-from app.service.import_service import ImportService
-from app.utils.utils import generate_cashflow_id
+from app.service.bulk_import_service import BulkImportService
+from app.service.cashflow_batch_service import CashflowBatchService
+from app.service.cashflow_dedup_service import add_cashflow_records
+from app.service.cashflow_export_service import CashflowExportService
+from app.service.cashflow_search_service import CashflowSearchService
+from app.service.import_job_service import ImportJobService
+from app.service.transfer_match_service import TransferMatchService
+from app.utils.pagination import CountCache, InvalidCursor, keyset_page
+from app.utils.time_range import date_range, period_filter, time_range_filter
+from app.utils.utils import generate_cashflow_fingerprint, generate_cashflow_id
+
+# 游标分页时总数按过滤条件缓存
+total_cache = CountCache(ttl=60)
+# 分页控制参数，不参与过滤；startDate、endDate 是过滤条件，须计入总数缓存的键
+PAGING_PARAMS = ('pageNum', 'pageSize', 'cursor', 'withTotal')
+# 可按等值过滤的字段（模型列），以及时间、关键词等特殊过滤参数
+FILTER_COLUMNS = frozenset(column.key for column in Cashflow.__mapper__.column_attrs)
+SPECIAL_FILTERS = ('time', 'startDate', 'endDate', 'q')
+# 单条修改时不可直接修改的列：主键，以及由其他字段生成的去重指纹、月份键
+DERIVED_COLUMNS = ('cashflow_id', 'fingerprint', 'month_date')
+# 参与生成去重指纹的字段
+FINGERPRINT_FIELDS = ('time', 'debit_credit', 'amount', 'payment_method')
+
+
+def apply_cashflow_filters(query, args, rank=False):
+    """
+    按请求参数过滤现金流，列表与导出接口共用，query 可以是 Query 或 select 语句
+
+    - 与 Cashflow 字段同名的参数按等值过滤；
+    - time：时间段过滤，支持 YYYY、YYYY-Qn、YYYY-MM、YYYY-MM-DD；
+    - startDate、endDate：日期区间过滤（YYYY-MM-DD，包含两端日期）；
+    - q：交易对方、商品 子串搜索，多个关键词以空白分隔，rank=True 时按匹配得分排序。
+    时间条件转换为左闭右开区间以使用索引。
+
+    Raises:
+        ValueError: 时间参数格式错误
+    """
+    for param, value in args.items():
+        if param in FILTER_COLUMNS:
+            if param == 'time':
+                query = query.filter(period_filter(Cashflow.time, value))
+            else:
+                query = query.filter(getattr(Cashflow, param) == value)
+
+    start_date, end_date = args.get('startDate'), args.get('endDate')
+    if start_date or end_date:
+        query = query.filter(time_range_filter(Cashflow.time, *date_range(start_date, end_date)))
+
+    if args.get('q'):
+        query = CashflowSearchService.search(query, args.get('q'), rank=rank)
+    return query
+
+
+def resolve_batch_targets(data):
+    """
+    批量接口的目标记录：ids 列表，或 filter 过滤条件（同列表接口参数）匹配的全部记录
+
+    filter 只接受模型字段及 time、startDate、endDate、q，出现未知参数（如拼写错误）或没有任何有效条件时拒绝，
+    避免过滤条件被忽略后匹配全表。
+
+    Returns:
+        list: 去重后保持顺序的 cashflow_id
+
+    Raises:
+        ValueError: 未指定目标或过滤条件格式错误
+    """
+    ids, filters = data.get('ids'), data.get('filter')
+    if ids:
+        if not isinstance(ids, list):
+            raise ValueError('ids must be a list')
+        return list(dict.fromkeys(str(cashflow_id) for cashflow_id in ids))
+    if filters:
+        if not isinstance(filters, dict):
+            raise ValueError('filter must be an object')
+        unknown = sorted(key for key in filters if key not in FILTER_COLUMNS and key not in SPECIAL_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {', '.join(unknown)}")
+        # startDate、endDate 为空或 q 不含关键词时不产生过滤条件
+        if not any(key in FILTER_COLUMNS or (CashflowSearchService.terms(value) if key == 'q' else value)
+                   for key, value in filters.items()):
+            raise ValueError('filter has no effective condition')
+        statement = apply_cashflow_filters(select(Cashflow.cashflow_id), filters)
+        return list(db.session.execute(statement).scalars())
+    raise ValueError('Either ids or a non-empty filter is required')
+
+
+def batch_report(targets, done, status):
+    """逐条结果，存在未找到的记录时返回 207"""
+    results = [{"cashflow_id": cashflow_id, "status": status if cashflow_id in done else "not_found"}
+               for cashflow_id in targets]
+    return {"results": results, status: len(done)}, 200 if len(done) == len(targets) else 207
 
 
 class CashflowListResource(Resource):
     """现金流列表资源"""
 
     def get(self):
-        """根据 cashflow_id 查询所有记录并支持分页"""
+        """
+        根据 cashflow_id 查询所有记录并支持分页
+
+        - 过滤条件见 apply_cashflow_filters；
+        - 页码分页：pageNum、pageSize，返回精确总数；带 q 搜索时按匹配得分、时间倒序排列；
+        - 游标分页：传入 cursor（第一页传空值），按 (time, cashflow_id) 定位，返回 next_cursor，
+          withTotal=true 时附带总数（按过滤条件缓存）。
+        """
         # 获取分页参数
         page_num = int(request.args.get('pageNum', 1))
         page_size = int(request.args.get('pageSize', 10))
 
-        # 构建查询
-        query = Cashflow.query
+        # 构建查询并应用过滤条件，游标分页按时间定位，不按搜索得分排序
+        try:
+            query = apply_cashflow_filters(Cashflow.query, request.args, rank='cursor' not in request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
-        # 应用过滤条件
-        if request.args:
-            for param, value in request.args.items():
-                if hasattr(Cashflow, param):
-                    if param == 'time':
-                        query = query.filter(func.date_format(Cashflow.time, '%Y-%m') == value)
-                    else:
-                        query = query.filter(getattr(Cashflow, param) == value)
+        # 游标分页
+        if 'cursor' in request.args:
+            try:
+                rows, next_cursor = keyset_page(query, Cashflow.time, Cashflow.cashflow_id,
+                                                request.args.get('cursor'), page_size)
+            except InvalidCursor as e:
+                return {"error": str(e)}, 400
+
+            result = {"data": [cashflow.to_dict() for cashflow in rows], "next_cursor": next_cursor}
+            if request.args.get('withTotal') == 'true':
+                filters = tuple(sorted((k, v) for k, v in request.args.items() if k not in PAGING_PARAMS))
+                result['total'] = total_cache.get(('cashflow', filters), query)
+            return result, 200
 
         # 分页处理
         paginated_query = query.order_by(desc(Cashflow.time)).limit(page_size).offset((page_num - 1) * page_size).all()
@@ -43,10 +148,78 @@ class CashflowListResource(Resource):
         data = request.get_json()
         cashflows = add_cashflow_records(data)
         return {
-            "cashflow_id": [t.cashflow_id for t in cashflows],
+            "cashflow_id": [t['cashflow_id'] for t in cashflows],
             "message": "Cashflow created successfully"
         }, 201
 
+    def patch(self):
+        """
+        批量修改记录，所有记录在一个事务内修改
+        请求参数：
+        {
+            "ids": ["cashflow_id", ...],            // 与 filter 二选一
+            "filter": {"category": "餐饮", "time": "2024-01"},
+            "values": {"category": "交通"}          // 可修改字段见 CashflowBatchService.EDITABLE_FIELDS
+        }
+        """
+        data = request.get_json() or {}
+        values = data.get('values')
+        if not values or not isinstance(values, dict):
+            return {"error": "values is required"}, 400
+        try:
+            targets = resolve_batch_targets(data)
+            updated = CashflowBatchService.update(targets, values)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            return {"error": str(e)}, 500
+        total_cache.clear()
+        return batch_report(targets, updated, 'updated')
+
+    def delete(self):
+        """
+        批量删除记录，所有记录在一个事务内删除
+        请求参数：{"ids": ["cashflow_id", ...]} 或 {"filter": {...}}
+        """
+        data = request.get_json() or {}
+        try:
+            targets = resolve_batch_targets(data)
+            deleted = CashflowBatchService.delete(targets)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            return {"error": str(e)}, 500
+        total_cache.clear()
+        return batch_report(targets, deleted, 'deleted')
+
+
+class CashflowExportResource(Resource):
+    """现金流导出资源"""
+
+    def get(self):
+        """
+        按列表接口相同的过滤条件流式导出现金流
+        请求参数：format=csv（默认）或 ndjson，其余参数见 apply_cashflow_filters
+        """
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return {"error": f"Unsupported export format: {export_format}"}, 400
+
+        try:
+            statement = apply_cashflow_filters(CashflowExportService.statement(), request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        if export_format == 'csv':
+            body, content_type = CashflowExportService.iter_csv(statement), 'text/csv; charset=utf-8'
+        else:
+            body, content_type = CashflowExportService.iter_ndjson(statement), 'application/x-ndjson; charset=utf-8'
+        return Response(
+            stream_with_context(body),
+            content_type=content_type,
+            headers={'Content-Disposition': f'attachment; filename=cashflow.{export_format}'}
+        )
+
 
 class CashflowResource(Resource):
     """现金流资源"""
@@ -56,16 +229,31 @@ class CashflowResource(Resource):
         return transaction.to_dict()
 
     def put(self, cashflow_id):
-        """修改一条记录"""
-        data = request.get_json()
+        """修改一条记录，时间、收/支、金额或支付方式变化时重新生成去重指纹"""
+        data = request.get_json() or {}
         cashflow = Cashflow.query.get_or_404(cashflow_id)
 
-        # 遍历键值对并更新字段
-        for key, value in data.items():
-            if hasattr(cashflow, key):
+        # 遍历键值对并更新字段，主键和由其他字段生成的列不可直接修改
+        try:
+            for key, value in data.items():
+                if key not in FILTER_COLUMNS or key in DERIVED_COLUMNS:
+                    continue
+                if key == 'time' and isinstance(value, str):
+                    value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
                 setattr(cashflow, key, value)
+            if any(key in data for key in FINGERPRINT_FIELDS):
+                cashflow.fingerprint = generate_cashflow_fingerprint(
+                    cashflow.time, cashflow.debit_credit, cashflow.amount, cashflow.payment_method)
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
 
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {"error": "Duplicate cashflow: same time, debit_credit, amount and payment_method"}, 409
+        total_cache.clear()
         return cashflow.to_dict()
 
     def delete(self, cashflow_id):
@@ -88,71 +276,6 @@ class CashflowResource(Resource):
             db.session.rollback()
             return {"error": str(e)}, 500
 
-def add_cashflow_records(data_list):
-    """
-    批量添加现金流记录到数据库
-
-    该函数会检查每条记录是否已存在，如果不存在则创建新的现金流记录。
-    记录的唯一性通过时间（精确到分钟）、借贷方向、金额和支付方式来判断。
-
-    Args:
-        data_list (list): 包含现金流数据的字典列表，每个字典应包含以下键：
-            - time (str or datetime): 交易时间
-            - debit_credit (str): 借贷方向，'收入' 或 '支出'
-            - amount (float): 金额
-            - payment_method (str): 支付方式
-            - type (str, optional): 交易类型
-            - counterparty (str, optional): 交易对手
-            - goods (str, optional): 商品或服务描述
-            - status (str, optional): 状态
-            - category (str, optional): 分类
-            - source (str, optional): 数据来源
-
-    Returns:
-        list: 新创建的 Cashflow 对象列表
-
-    Note:
-        - 如果记录已存在（根据时间、借贷方向、金额和支付方式匹配），则不会重复创建
-        - 所有新创建的记录会在一个数据库事务中提交
-    """
-    created_cashflow = []
-
-    for data in data_list:
-        time = datetime.strptime(data.get('time'), '%Y-%m-%d %H:%M:%S') if isinstance(data.get('time'),
-                                                                                      str) else data.get('time')
-        debit_credit = data.get('debit_credit')
-        amount = data.get('amount')
-        payment_method = data.get('payment_method')
-
-        # 查询是否存在相同记录
-        existing_cashflow = Cashflow.query.filter(
-            func.date_format(Cashflow.time, '%Y-%m-%d %H:%i') == time.strftime('%Y-%m-%d %H:%M'),
-            Cashflow.debit_credit == debit_credit,
-            Cashflow.amount == amount,
-            Cashflow.payment_method == payment_method
-        ).first()
-
-        if not existing_cashflow:
-            cashflow = Cashflow(
-                cashflow_id=generate_cashflow_id(),
-                time=time,
-                type=data.get('type'),
-                counterparty=data.get('counterparty'),
-                goods=data.get('goods'),
-                debit_credit=debit_credit,
-                amount=amount,
-                payment_method=payment_method,
-                status=data.get('status'),
-                category=data.get('category'),
-                source=data.get('source'),
-            )
-            db.session.add(cashflow)
-            created_cashflow.append(cashflow)
-
-    db.session.commit()
-    return created_cashflow
-
-
 class TransferResource(Resource):
     """转账资源"""
 
@@ -241,11 +364,25 @@ class TransferResource(Resource):
             return {"error": str(e)}, 500
 
 
+class TransferUnpairResource(Resource):
+    """取消自动配对的转账"""
+
+    def post(self, transfer_id):
+        """清空两条记录的转账ID，记录重新计入收支汇总，且不再参与自动配对"""
+        try:
+            count = TransferMatchService.unpair(transfer_id)
+        except Exception as e:
+            return {"error": str(e)}, 500
+        if not count:
+            return {"error": "Cashflow not found"}, 404
+        return {"unpaired": count}, 200
+
+
 class UploadResource(Resource):
     """文件上传资源"""
 
     def post(self):
-        """上传并处理文件"""
+        """上传文件并登记后台导入任务，立即返回任务ID"""
         # 检查是否有文件在请求中
         if 'file' not in request.files:
             return {"error": "No file part"}, 400
@@ -263,11 +400,44 @@ class UploadResource(Resource):
 
             try:
                 file.save(file_path)
-                data = ImportService.import_cashflow(file_path)
-                add_cashflow_records(data)
+                job_id = ImportJobService.submit(file_name, file_path, owns_file=True)
             except Exception as e:
-                os.remove(file_path)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
                 return {"error": f"Error processing file: {str(e)}"}, 500
 
-            return {"message": f"File saved successfully as {file_name}"}, 200
+            return {"message": f"File saved successfully as {file_name}", "job_id": job_id}, 202
         return {"error": f"Invalid file as {file}"}, 400
+
+
+class UploadJobResource(Resource):
+    """文件导入任务资源"""
+
+    def get(self, job_id):
+        """查询导入任务状态及进度"""
+        job = ImportJobService.get(job_id)
+        if not job:
+            return {"error": "Import job not found"}, 404
+        return job.to_dict(), 200
+
+
+class ImportDirectoryResource(Resource):
+    """服务器目录/压缩包批量导入资源"""
+
+    def post(self):
+        """
+        登记批量导入任务
+        请求参数：{"path": "上传目录下的子目录或 zip 文件"}
+        """
+        data = request.get_json() or {}
+        upload_folder = os.path.realpath(current_app.config['UPLOAD_FOLDER'])
+        path = os.path.realpath(os.path.join(upload_folder, data.get('path', '')))
+
+        # 只允许导入上传目录内的文件，避免读取任意服务器路径
+        if os.path.commonpath([upload_folder, path]) != upload_folder:
+            return {"error": "Path must be inside the upload folder"}, 400
+        if not os.path.exists(path) or not BulkImportService.is_bundle(path):
+            return {"error": f"Not a directory or zip archive: {data.get('path')}"}, 400
+
+        job_id = ImportJobService.submit(os.path.basename(path), path)
+        return {"message": "Import job created", "job_id": job_id}, 202
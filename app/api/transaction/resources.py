@@ -9,12 +9,27 @@ from sqlalchemy import desc
 from app.extentions import db
 from app.models.cashflow import Cashflow
 from app.models.transaction import Transaction
-from app.utils.utils import determine_cashflow_properties, generate_cashflow_id, calculate_cashflow_amount
+from app.service.position_service import PositionService
+from app.service.transaction_service import TransactionService
+from app.utils.pagination import CountCache, InvalidCursor, keyset_page
+from app.utils.time_range import date_range, time_range_filter
+from app.utils.utils import calculate_cashflow_amount
+
+# 游标分页时总数按过滤条件缓存
+total_cache = CountCache(ttl=60)
+# 分页控制参数，不参与过滤
+PAGING_PARAMS = ('pageNum', 'pageSize', 'cursor', 'withTotal')
 
 
 class TransactionListResource(Resource):
     def get(self):
-        """获取交易记录列表，支持分页和过滤"""
+        """
+        获取交易记录列表，支持分页和过滤
+
+        - 页码分页：pageNum、pageSize，返回精确总数；
+        - 游标分页：传入 cursor（第一页传空值），按 (timestamp, transaction_id) 定位，返回 next_cursor，
+          withTotal=true 时附带总数（按过滤条件缓存）。
+        """
         # 获取分页参数
         page_num = int(request.args.get('pageNum', 1))
         page_size = int(request.args.get('pageSize', 10))
@@ -26,16 +41,15 @@ class TransactionListResource(Resource):
         if request.args:
             for param, value in request.args.items():
                 if hasattr(Transaction, param) and param not in ['pageNum', 'pageSize', 'dateRange',
-                                                                       'stock_code']:
+                                                                       'stock_code', 'cursor', 'withTotal']:
                     query = query.filter(getattr(Transaction, param) == value)
 
             # 处理时间范围参数
             start_date, end_date = request.args.get('startDate'), request.args.get('endDate')
             if start_date and end_date:
                 try:
-                    date_begin = datetime.strptime(start_date, '%Y-%m-%d')
-                    date_end = datetime.strptime(end_date, '%Y-%m-%d')
-                    query = query.filter(Transaction.timestamp.between(date_begin, date_end))
+                    # 左闭右开区间，包含结束日期当天
+                    query = query.filter(time_range_filter(Transaction.timestamp, *date_range(start_date, end_date)))
                 except ValueError:
                     pass  # 如果日期格式不正确，忽略该过滤条件
 
@@ -44,6 +58,20 @@ class TransactionListResource(Resource):
             if stock_code:
                 query = query.filter(Transaction.stock_code.like(f'%{stock_code}%'))
 
+        # 游标分页
+        if 'cursor' in request.args:
+            try:
+                rows, next_cursor = keyset_page(query, Transaction.timestamp, Transaction.transaction_id,
+                                                request.args.get('cursor'), page_size, nullable=True)
+            except InvalidCursor as e:
+                return {"error": str(e)}, 400
+
+            result = {"data": [transaction.to_dict() for transaction in rows], "next_cursor": next_cursor}
+            if request.args.get('withTotal') == 'true':
+                filters = tuple(sorted((k, v) for k, v in request.args.items() if k not in PAGING_PARAMS))
+                result['total'] = total_cache.get(('transaction', filters), query)
+            return result, 200
+
         # 分页处理
         paginated_query = query.order_by(desc(Transaction.timestamp)).limit(page_size).offset(
             (page_num - 1) * page_size).all()
@@ -51,7 +79,7 @@ class TransactionListResource(Resource):
 
     def post(self):
         """
-        创建交易记录（保持原有数据库操作）
+        批量创建交易记录及关联的现金流
         请求参数：
         [
             {
@@ -59,66 +87,22 @@ class TransactionListResource(Resource):
                 "type": "交易类型，BUY 或 SELL",
                 "timestamp": "交易时间，格式为 YYYY-MM-DD HH:MM:SS",
                 "price": "交易价格，数值类型",
+                "quantity": "交易数量，数值类型",
                 "fee": "手续费，数值类型"
-                "amount": "金额，数值类型"
+                "amount": "金额，数值类型",
+                "payment_method": "支付方式"
             }
         ]
+        整批先校验，校验通过的记录在一个事务中写入；存在校验失败的记录时返回 207 及逐条错误
         """
         data_list = request.get_json()
-        created_ids = []
-        errors = []
+        if not isinstance(data_list, list):
+            return {"error": "Request body must be a list"}, 400
 
-        for data in data_list:
-            # 处理交易数据，计算数量、金额等字段
-            cashflow_properties, error_response = determine_cashflow_properties(data)
-
-            # 如果处理过程中出现错误，则记录错误信息并跳过当前记录
-            if error_response:
-                errors.append(error_response)
-                continue
-
-            try:
-                # 开启数据库事务，确保数据一致性
-                with db.session.begin():
-                    # 创建 Transaction 表记录
-                    transaction = Transaction(
-                        stock_code=data['stock_code'],
-                        type=data['type'],
-                        timestamp=data['timestamp'],
-                        quantity=data['quantity'],
-                        price=data['price'],
-                        fee=data['fee'],
-                        amount=data['amount']
-                    )
-                    db.session.add(transaction)
-                    db.session.flush()  # 刷新会话以生成 transaction_id
-
-                    # 使用工具函数计算现金流金额
-                    cashflow_amount = calculate_cashflow_amount(
-                        transaction.type, transaction.amount, transaction.fee
-                    )
-
-                    # 创建 Cashflow 表记录并与 Transaction 表关联
-                    cashflow_record = Cashflow(
-                        cashflow_id=generate_cashflow_id(),
-                        transaction_id=transaction.transaction_id,
-                        type=cashflow_properties['cashflow_type'],
-                        category="投资理财",
-                        time=data['timestamp'],
-                        payment_method=data['payment_method'],
-                        counterparty=data['stock_code'],
-                        debit_credit=cashflow_properties['debit_credit'],
-                        amount=cashflow_amount,
-                        goods=f'股票代码:{data["stock_code"]},金额:{data["amount"]},价格:{data["price"]},数量:{data["quantity"]},费用:{data["fee"]}'
-                    )
-                    db.session.add(cashflow_record)
-                    # 记录成功创建的 transaction_id
-                    created_ids.append(transaction.transaction_id)
-
-            except Exception as e:
-                # 出现异常时回滚事务并返回错误信息
-                db.session.rollback()
-                return {"error": str(e)}, 500
+        try:
+            created_ids, errors = TransactionService.bulk_create(data_list)
+        except Exception as e:
+            return {"error": str(e)}, 500
 
         # 如果存在处理失败的记录，则返回部分成功信息和错误详情
         if errors:
@@ -160,7 +144,8 @@ class TransactionResource(Resource):
             if not cashflow:
                 return {"error": "关联的现金流记录不存在"}, 404
 
-            # 3. 更新交易表字段
+            # 3. 更新交易表字段，保留修改前的值用于更新持仓
+            previous = PositionService.snapshot(transaction)
             update_fields = []
             stock_code = data.get('stock_code', transaction.stock_code)
             timestamp = data.get('timestamp', transaction.timestamp)
@@ -189,7 +174,9 @@ class TransactionResource(Resource):
             cashflow.goods = f'股票代码:{stock_code},金额:{amount},价格:{price},数量:{quantity},费用:{fee}'
             update_fields.extend(['amount', 'goods'])
 
-            # 4. 提交修改
+            # 4. 在同一事务内按修改前后的差额更新持仓并提交
+            db.session.flush()
+            PositionService.apply(added=[transaction], removed=[previous])
             db.session.commit()
 
             return {
@@ -218,10 +205,13 @@ class TransactionResource(Resource):
                 return {"error": "Transaction not found"}, 404
 
             # 删除记录
+            previous = PositionService.snapshot(transaction_record)
             db.session.delete(transaction_record)
             db.session.delete(cashflow_record)
 
-            # 提交事务
+            # 在同一事务内扣减持仓并提交
+            db.session.flush()
+            PositionService.apply(removed=[previous])
             db.session.commit()
             return {"message": "Transaction deleted successfully"}, 200
         except Exception as e:
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# app/migrations/__init__.py
+"""
+数据库结构版本化迁移
+
+每个迁移模块定义：
+    VERSION        递增的版本号
+    NAME           迁移名称
+    upgrade()      结构变更，须可重复执行（已存在的列、索引跳过）
+    hot_queries()  迁移后应走索引的查询 [(描述, select 语句)]，用于 EXPLAIN 校验
+新增迁移时在 MIGRATIONS 末尾追加模块，并在模型中同步声明对应的列或索引，
+使新库由 db.create_all() 直接建出相同结构。
+"""
+from . import v001_cashflow_fingerprint, v002_cashflow_month_date, v003_query_indexes, v004_cashflow_search, \
+    v005_position, v006_portfolio_nav, v007_latest_price, v008_import_job_owns_file, \
+    v009_import_job_lease, v010_cashflow_transfer_excluded
+
+MIGRATIONS = [
+    v001_cashflow_fingerprint,
+    v002_cashflow_month_date,
+    v003_query_indexes,
+    v004_cashflow_search,
+    v005_position,
+    v006_portfolio_nav,
+    v007_latest_price,
+    v008_import_job_owns_file,
+    v009_import_job_lease,
+    v010_cashflow_transfer_excluded,
+]
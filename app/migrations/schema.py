@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# app/migrations/schema.py
+"""迁移使用的结构检查与变更工具，所有操作均可重复执行"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from app.extentions import db
+
+
+def column_names(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+
+def add_column(table, column_name):
+    """按模型中的列定义为已有表补充列，列已存在时跳过"""
+    if column_name in column_names(table.name):
+        return False
+    column_ddl = CreateColumn(table.c[column_name]).compile(dialect=db.engine.dialect)
+    table_name = db.engine.dialect.identifier_preparer.quote(table.name)
+    with db.engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_ddl}'))
+    return True
+
+
+def has_index(table_name, name, columns=None):
+    """
+    是否已有同名索引，或已有以 columns 为前缀的索引（例如外键自动创建的索引）
+    """
+    for index in inspect(db.engine).get_indexes(table_name):
+        if index['name'] == name:
+            return True
+        if columns and list(index['column_names'][:len(columns)]) == list(columns):
+            return True
+    return False
+
+
+def ensure_index(table, name):
+    """创建模型中声明的索引，已存在时跳过；唯一索引只按名称判断"""
+    index = next(index for index in table.indexes if index.name == name)
+    columns = None if index.unique else [column.name for column in index.columns]
+    if has_index(table.name, name, columns):
+        return False
+    index.create(bind=db.engine)
+    return True
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v001_cashflow_fingerprint.py
+"""cashflow 去重指纹列及唯一索引"""
+from sqlalchemy import select
+
+from app.migrations.schema import add_column, ensure_index, has_index
+from app.models import Cashflow
+from app.service.cashflow_dedup_service import CashflowDedupService
+
+VERSION = 1
+NAME = 'cashflow_fingerprint'
+
+
+def upgrade():
+    table = Cashflow.__table__
+    add_column(table, 'fingerprint')
+    if not has_index(table.name, 'uk_cashflow_fingerprint'):
+        # 先为存量记录补齐指纹，避免违反唯一索引
+        CashflowDedupService.backfill_fingerprints()
+    ensure_index(table, 'uk_cashflow_fingerprint')
+
+
+def hot_queries():
+    """导入去重时按指纹批量查询"""
+    return [
+        ('cashflow by fingerprint', select(Cashflow.fingerprint).where(Cashflow.fingerprint.in_(['0' * 32]))),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v002_cashflow_month_date.py
+"""cashflow 月份生成列及按月、账户汇总索引"""
+from datetime import date
+
+from sqlalchemy import select
+
+from app.migrations.schema import add_column, ensure_index
+from app.models import Cashflow
+
+VERSION = 2
+NAME = 'cashflow_month_date'
+
+
+def upgrade():
+    table = Cashflow.__table__
+    add_column(table, 'month_date')
+    ensure_index(table, 'idx_cashflow_month_payment')
+
+
+def hot_queries():
+    """对账单与月度汇总按月份、账户定位"""
+    return [
+        ('cashflow by month and account',
+         select(Cashflow.amount).where(Cashflow.month_date == date(2024, 1, 1), Cashflow.payment_method == '零钱')),
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v003_query_indexes.py
+"""按接口实际查询条件补充 cashflow、transaction 的组合索引"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.migrations.schema import ensure_index
+from app.models import Cashflow, Transaction
+
+VERSION = 3
+NAME = 'query_indexes'
+
+CASHFLOW_INDEXES = (
+    'idx_cashflow_time_id',
+    'idx_cashflow_payment_time',
+    'idx_cashflow_category_time',
+    'idx_cashflow_transfer',
+    'idx_cashflow_transaction',
+)
+TRANSACTION_INDEXES = (
+    'idx_transaction_timestamp_id',
+    'idx_transaction_stock_time',
+)
+
+
+def upgrade():
+    for name in CASHFLOW_INDEXES:
+        ensure_index(Cashflow.__table__, name)
+    for name in TRANSACTION_INDEXES:
+        ensure_index(Transaction.__table__, name)
+
+
+def hot_queries():
+    """现金流、交易列表及关联查询"""
+    start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    return [
+        ('cashflow list by month',
+         select(Cashflow).where(Cashflow.time >= start, Cashflow.time < end)
+         .order_by(Cashflow.time.desc(), Cashflow.cashflow_id.desc()).limit(10)),
+        ('cashflow list by account and month',
+         select(Cashflow).where(Cashflow.payment_method == '零钱', Cashflow.time >= start, Cashflow.time < end)),
+        ('cashflow list by category and month',
+         select(Cashflow).where(Cashflow.category == '餐饮', Cashflow.time >= start, Cashflow.time < end)),
+        ('cashflow by transfer_id', select(Cashflow).where(Cashflow.transfer_id == '0' * 32)),
+        ('cashflow by transaction_id', select(Cashflow).where(Cashflow.transaction_id == 1)),
+        ('transaction list by date range',
+         select(Transaction).where(Transaction.timestamp >= start, Transaction.timestamp < end)
+         .order_by(Transaction.timestamp.desc(), Transaction.transaction_id.desc()).limit(10)),
+        ('transaction by stock', select(Transaction).where(Transaction.stock_code == '000001')),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v004_cashflow_search.py
+"""交易对方、商品 搜索倒排索引表，并为存量现金流建立索引"""
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import CashflowNgram
+from app.service.cashflow_search_service import CashflowSearchService
+
+VERSION = 4
+NAME = 'cashflow_search'
+
+
+def upgrade():
+    table = CashflowNgram.__table__
+    table.create(bind=db.engine, checkfirst=True)
+    # 倒排表为空时才重建，存量数据较多时耗时与现金流行数成正比
+    if db.session.execute(select(table.c.cashflow_id).limit(1)).first() is None:
+        CashflowSearchService.rebuild()
+
+
+def hot_queries():
+    """按分词查找倒排列表、按记录清理分词"""
+    return [
+        ('cashflow search by grams', CashflowSearchService.match('星巴克').element),
+        ('cashflow ngram by cashflow_id', select(CashflowNgram.gram).where(CashflowNgram.cashflow_id == '0')),
+    ]
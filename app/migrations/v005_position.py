@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v005_position.py
+"""持仓汇总表 position，并按存量交易记录初始化"""
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import Position, Transaction
+from app.service.position_service import PositionService
+
+VERSION = 5
+NAME = 'position'
+
+
+def upgrade():
+    table = Position.__table__
+    table.create(bind=db.engine, checkfirst=True)
+    if db.session.execute(select(table.c.stock_code).limit(1)).first() is None:
+        PositionService.rebuild()
+
+
+def hot_queries():
+    """按证券代码读取持仓、维护持仓时取最近交易时间"""
+    return [
+        ('position by stock_code', select(Position).where(Position.stock_code == '000001')),
+        ('latest trade by stock',
+         select(Transaction.timestamp).where(Transaction.stock_code == '000001')
+         .order_by(Transaction.timestamp.desc()).limit(1)),
+    ]
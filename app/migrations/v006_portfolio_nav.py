@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v006_portfolio_nav.py
+"""组合每日估值表 portfolio_daily_value，并按存量交易和行情计算历史估值"""
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import PortfolioDailyValue
+from app.service.nav_service import NavService
+
+VERSION = 6
+NAME = 'portfolio_nav'
+
+
+def upgrade():
+    table = PortfolioDailyValue.__table__
+    table.create(bind=db.engine, checkfirst=True)
+    if db.session.execute(select(table.c.date).limit(1)).first() is None:
+        NavService.update()
+
+
+def hot_queries():
+    """按日期范围读取估值、增量更新时取最后一个交易日"""
+    return [
+        ('nav by date range',
+         select(PortfolioDailyValue).where(PortfolioDailyValue.date.between('2024-01-01', '2024-12-31'))),
+        ('latest nav', select(PortfolioDailyValue).order_by(PortfolioDailyValue.date.desc()).limit(1)),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v007_latest_price.py
+"""最新价格表 latest_price，并按存量行情初始化"""
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import LatestPrice, Position
+from app.service.latest_price_service import LatestPriceService
+
+VERSION = 7
+NAME = 'latest_price'
+
+
+def upgrade():
+    table = LatestPrice.__table__
+    table.create(bind=db.engine, checkfirst=True)
+    if db.session.execute(select(table.c.stock_code).limit(1)).first() is None:
+        LatestPriceService.refresh()
+
+
+def hot_queries():
+    """持仓按主键关联最新价格"""
+    return [
+        ('latest price by stock_code', select(LatestPrice).where(LatestPrice.stock_code == '000001')),
+        ('position join latest price',
+         select(Position.stock_code, LatestPrice.close).join(LatestPrice, LatestPrice.stock_code == Position.stock_code)),
+    ]
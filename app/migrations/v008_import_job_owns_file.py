@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v008_import_job_owns_file.py
+"""import_job 记录文件是否由上传接口写入，任务失败时只删除这类文件"""
+from sqlalchemy import select
+
+from app.migrations.schema import add_column
+from app.models import ImportJob
+
+VERSION = 8
+NAME = 'import_job_owns_file'
+
+
+def upgrade():
+    # 存量任务默认不拥有文件，失败时不删除
+    add_column(ImportJob.__table__, 'owns_file')
+
+
+def hot_queries():
+    """恢复未完成的任务时按状态查询"""
+    return [
+        ('import job by state', select(ImportJob).where(ImportJob.state == ImportJob.PENDING)),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v009_import_job_lease.py
+"""import_job 执行进程与心跳，多进程恢复任务时按租约认领，避免同一任务被重复执行"""
+from sqlalchemy import select
+
+from app.migrations.schema import add_column
+from app.models import ImportJob
+
+VERSION = 9
+NAME = 'import_job_lease'
+
+
+def upgrade():
+    table = ImportJob.__table__
+    add_column(table, 'owner')
+    # 存量执行中的任务没有心跳，视为租约已过期，由服务进程重新认领
+    add_column(table, 'heartbeat')
+
+
+def hot_queries():
+    """刷新心跳时按执行进程查询"""
+    return [
+        ('running jobs by state', select(ImportJob.job_id).where(ImportJob.state == ImportJob.RUNNING)),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# app/migrations/v010_cashflow_transfer_excluded.py
+"""cashflow 记录是否已取消转账配对，取消后的记录不再被自动配对"""
+from sqlalchemy import select
+
+from app.migrations.schema import add_column
+from app.models import Cashflow
+
+VERSION = 10
+NAME = 'cashflow_transfer_excluded'
+
+
+def upgrade():
+    # 存量记录默认参与自动配对
+    add_column(Cashflow.__table__, 'transfer_excluded')
+
+
+def hot_queries():
+    """取消配对时按 transfer_id 查询"""
+    return [
+        ('cashflow by transfer id', select(Cashflow.cashflow_id).where(Cashflow.transfer_id == 'x')),
+    ]
@@ -6,10 +6,16 @@ from .statement import *
 from .transaction import *
 from .project import Project
 from .account_monthly_balance import AccountMonthlyBalance
+from .import_job import ImportJob
+from .import_ledger import ImportLedger
+from .schema_migration import SchemaMigration
+from .cashflow_ngram import CashflowNgram
+from .position import Position
+from .portfolio_daily_value import PortfolioDailyValue
 
 
-__all__ = ['db', 'Cashflow', 'Transaction', 'StockPrice', 'Project',
+__all__ = ['db', 'Cashflow', 'Transaction', 'StockPrice', 'LatestPrice', 'Project',
            'MonthlyBalance', 'VQuarterlyBalance', 'VAnnualBalance',
-           'MonthlyExpCategory', 'MonthlyExpCDF', 'AccountBalance', 'VCurrentAsset',
-           'AccountMonthlyBalance',
-           'BankStatementSummary']
+           'MonthlyExpCategory', 'MonthlyExpCDF', 'AccountBalance', 'AccountInfo', 'VCurrentAsset',
+           'AccountMonthlyBalance', 'ImportJob', 'ImportLedger', 'SchemaMigration',
+           'CashflowNgram', 'Position', 'PortfolioDailyValue', 'BankStatementSummary']
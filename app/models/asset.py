@@ -31,6 +31,26 @@ class AccountBalance(db.Model):
         }
 
 
+class AccountInfo(db.Model):
+    """自有账户清单，账户名称与现金流的支付方式一致"""
+    __tablename__ = 'account_info'
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_name = db.Column(db.String(255), nullable=False)  # 账户名称
+    account_type = db.Column(db.String(50), nullable=False)  # 账户类型
+    is_included = db.Column(db.Integer, nullable=False, default=1)  # 是否计入资产
+    is_active = db.Column(db.Integer, nullable=False, default=1)  # 是否在用
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_name': self.account_name,
+            'account_type': self.account_type,
+            'is_included': self.is_included,
+            'is_active': self.is_active
+        }
+
+
 class BankStatementSummary(db.Model):
     """
     账户月度余额及变动记录表
@@ -138,6 +158,22 @@ class StockPrice(db.Model):
         }
 
 
+class LatestPrice(db.Model):
+    """各证券最近一个交易日的收盘价，由价格更新任务按 stock_price 维护，估值不再扫描历史行情"""
+    __tablename__ = 'latest_price'
+
+    stock_code = db.Column(db.String(10), primary_key=True)  # 股票代码
+    date = db.Column(db.Date, nullable=False)  # 最近交易日
+    close = db.Column(db.Numeric(precision=18, scale=2), nullable=False)  # 收盘价
+
+    def to_dict(self):
+        return {
+            'stock_code': self.stock_code,
+            'date': self.date.strftime('%Y-%m-%d'),
+            'close': float(self.close)
+        }
+
+
 class VCurrentAsset(db.Model):
     __tablename__ = 'v_current_asset'
 
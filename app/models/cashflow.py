@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 # app/models/cashflow.py
-from sqlalchemy import PrimaryKeyConstraint, ForeignKey, text
+from sqlalchemy import PrimaryKeyConstraint, ForeignKey, text, Computed
 
 from app.extentions import db
 
@@ -18,9 +18,22 @@ class Cashflow(db.Model):
     category = db.Column(db.String(128), nullable=True)  # 类别
     source = db.Column(db.String(128), nullable=True)  # 来源
     transfer_id = db.Column(db.String(32), nullable=True)  # 自转账ID
+    transfer_excluded = db.Column(db.Boolean, nullable=False, default=False,
+                                  server_default='0')  # 已取消配对，不再参与自动配对
+    fingerprint = db.Column(db.String(32), nullable=True)  # 去重指纹：分钟级时间+收/支+金额+支付方式
+    # 月份键：交易时间所在月的第一天，由数据库根据 time 计算并存储，用于按月分组
+    month_date = db.Column(db.Date, Computed("makedate(year(`time`), 1) + interval (month(`time`) - 1) month",
+                                             persisted=True))
 
     __table_args__ = (
         PrimaryKeyConstraint('cashflow_id'),
+        db.Index('uk_cashflow_fingerprint', 'fingerprint', unique=True),
+        db.Index('idx_cashflow_time_id', 'time', 'cashflow_id'),  # 按时间倒序的游标分页
+        db.Index('idx_cashflow_month_payment', 'month_date', 'payment_method'),  # 按月、账户汇总
+        db.Index('idx_cashflow_payment_time', 'payment_method', 'time'),  # 按账户过滤并按时间排序
+        db.Index('idx_cashflow_category_time', 'category', 'time'),  # 按类别过滤并按时间排序
+        db.Index('idx_cashflow_transfer', 'transfer_id'),  # 自转账配对查询
+        db.Index('idx_cashflow_transaction', 'transaction_id'),  # 证券交易关联查询
     )
 
     def to_dict(self):
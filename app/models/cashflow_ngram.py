@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# app/models/cashflow_ngram.py
+from app.extentions import db
+
+
+class CashflowNgram(db.Model):
+    """现金流 交易对方、商品 的二元分词倒排索引，由 CashflowSearchService 维护"""
+    __tablename__ = 'cashflow_ngram'
+
+    # 区分大小写、全半角的二进制排序规则，避免不同分词被数据库视为重复主键
+    gram = db.Column(db.String(2, collation='utf8mb4_bin'), nullable=False, comment='二元分词，文本末字单独成词')
+    cashflow_id = db.Column(db.String(36), nullable=False, comment='现金流ID')
+    weight = db.Column(db.Integer, nullable=False, default=1, comment='出现次数加权，交易对方权重高于商品')
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint('gram', 'cashflow_id'),  # 按分词查找倒排列表
+        db.Index('idx_cashflow_ngram_cashflow', 'cashflow_id'),  # 记录修改、删除时清理旧分词
+    )
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# app/models/import_job.py
+from datetime import datetime
+
+from app.extentions import db
+
+
+class ImportJob(db.Model):
+    """账单后台导入任务"""
+    __tablename__ = 'import_job'
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    job_id = db.Column(db.String(32), primary_key=True, comment='任务ID')
+    file_name = db.Column(db.String(255), nullable=False, comment='上传文件名')
+    file_path = db.Column(db.String(512), nullable=False, comment='文件保存路径')
+    owns_file = db.Column(db.Boolean, nullable=False, default=False, server_default='0',
+                          comment='文件由上传接口写入，任务失败时删除；导入已有目录或压缩包时不删除')
+    state = db.Column(db.String(16), nullable=False, default=PENDING, comment='任务状态')
+    rows_parsed = db.Column(db.Integer, nullable=False, default=0, comment='解析行数')
+    rows_inserted = db.Column(db.Integer, nullable=False, default=0, comment='写入行数')
+    duplicates_skipped = db.Column(db.Integer, nullable=False, default=0, comment='跳过的重复行数')
+    error = db.Column(db.Text, nullable=True, comment='错误信息')
+    owner = db.Column(db.String(128), nullable=True, comment='执行任务的进程（主机名:进程号）')
+    heartbeat = db.Column(db.DateTime, nullable=True, comment='执行进程最近一次心跳，超过租约时间后可被其他进程接管')
+    create_time = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    update_time = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+
+    __table_args__ = (
+        db.Index('idx_import_job_state', 'state'),
+    )
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'file_name': self.file_name,
+            'state': self.state,
+            'rows_parsed': self.rows_parsed,
+            'rows_inserted': self.rows_inserted,
+            'duplicates_skipped': self.duplicates_skipped,
+            'error': self.error,
+            'create_time': self.create_time.strftime('%Y-%m-%d %H:%M:%S') if self.create_time else None,
+            'update_time': self.update_time.strftime('%Y-%m-%d %H:%M:%S') if self.update_time else None
+        }
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# app/models/import_ledger.py
+from datetime import datetime
+
+from app.extentions import db
+
+
+class ImportLedger(db.Model):
+    """已导入账单文件登记表"""
+    __tablename__ = 'import_ledger'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    content_hash = db.Column(db.String(64), nullable=False, comment='文件内容 SHA-256')
+    file_name = db.Column(db.String(255), nullable=False, comment='文件名')
+    source = db.Column(db.String(255), nullable=False, comment='账单来源，如 支付宝、微信')
+    start_time = db.Column(db.DateTime, nullable=True, comment='账单明细最早交易时间')
+    end_time = db.Column(db.DateTime, nullable=True, comment='账单明细最晚交易时间')
+    row_count = db.Column(db.Integer, nullable=False, default=0, comment='明细行数')
+    create_time = db.Column(db.DateTime, default=datetime.now, comment='导入时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', name='uk_import_ledger_hash'),
+        db.Index('idx_import_ledger_source_time', 'source', 'start_time', 'end_time'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'file_name': self.file_name,
+            'source': self.source,
+            'start_time': self.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.start_time else None,
+            'end_time': self.end_time.strftime('%Y-%m-%d %H:%M:%S') if self.end_time else None,
+            'row_count': self.row_count,
+            'create_time': self.create_time.strftime('%Y-%m-%d %H:%M:%S') if self.create_time else None
+        }
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# app/models/portfolio_daily_value.py
+from app.extentions import db
+
+
+class PortfolioDailyValue(db.Model):
+    """证券组合每日估值，由 NavService 按交易日增量追加"""
+    __tablename__ = 'portfolio_daily_value'
+
+    date = db.Column(db.Date, primary_key=True, comment='交易日')
+    market_value = db.Column(db.Numeric(18, 2), nullable=False, comment='持仓市值，按当日收盘价（停牌取最近收盘价）')
+    net_investment = db.Column(db.Numeric(18, 2), nullable=False, comment='累计净投入：买入金额+费用-卖出金额+费用-分红')
+    daily_flow = db.Column(db.Numeric(18, 2), nullable=False, comment='当日净投入')
+    nav = db.Column(db.Numeric(18, 6), nullable=False, comment='单位净值，剔除资金进出的影响，起始为 1')
+    position_count = db.Column(db.Integer, nullable=False, default=0, comment='持仓证券数')
+
+    def to_dict(self):
+        return {
+            'date': self.date.strftime('%Y-%m-%d'),
+            'market_value': float(self.market_value),
+            'net_investment': float(self.net_investment),
+            'daily_flow': float(self.daily_flow),
+            'nav': float(self.nav),
+            'position_count': self.position_count
+        }
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# app/models/position.py
+from app.extentions import db
+
+
+class Position(db.Model):
+    """
+    证券持仓汇总表，按交易记录增量维护，口径与 v_position 视图一致：
+    数量 = 买入 - 卖出；成本 = 买入金额 + 费用 - 卖出金额 + 费用 - 分红
+    """
+    __tablename__ = 'position'
+
+    stock_code = db.Column(db.String(10), primary_key=True)  # 证券代码
+    quantity = db.Column(db.Numeric(precision=18, scale=2), nullable=False, default=0)  # 持仓数量
+    cost = db.Column(db.Numeric(precision=24, scale=6), nullable=False, default=0)  # 持仓成本
+    trade_count = db.Column(db.Integer, nullable=False, default=0)  # 交易笔数，为 0 时删除
+    last_updated = db.Column(db.DateTime, nullable=True)  # 最近交易时间
+
+    def to_dict(self):
+        quantity = float(self.quantity) if self.quantity is not None else 0
+        cost = float(self.cost) if self.cost is not None else 0
+        return {
+            'stock_code': self.stock_code,
+            'quantity': quantity,
+            'avg_cost': round(cost / quantity, 3) if quantity > 0 else 0,
+            'total_cost': round(cost, 2),
+            'last_updated': self.last_updated.strftime('%Y-%m-%d %H:%M:%S') if self.last_updated else None
+        }
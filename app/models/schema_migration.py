@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# app/models/schema_migration.py
+from datetime import datetime
+
+from app.extentions import db
+
+
+class SchemaMigration(db.Model):
+    """已执行的数据库结构迁移"""
+    __tablename__ = 'schema_migration'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='迁移版本号')
+    name = db.Column(db.String(128), nullable=False, comment='迁移名称')
+    applied_time = db.Column(db.DateTime, default=datetime.now, comment='执行时间')
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'name': self.name,
+            'applied_time': self.applied_time.strftime('%Y-%m-%d %H:%M:%S') if self.applied_time else None
+        }
@@ -16,6 +16,11 @@ class Transaction(db.Model):
     amount = db.Column(db.Numeric(precision=18, scale=3), nullable=False)  # 交易金额
     fee = db.Column(db.Numeric(precision=18, scale=6), nullable=False, default=0)  # 手续费
 
+    __table_args__ = (
+        db.Index('idx_transaction_timestamp_id', 'timestamp', 'transaction_id'),  # 按时间倒序的游标分页
+        db.Index('idx_transaction_stock_time', 'stock_code', 'timestamp'),  # 按证券汇总持仓
+    )
+
     def to_dict(self):
         return {
             'transaction_id': self.transaction_id,
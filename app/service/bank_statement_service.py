@@ -15,9 +15,9 @@ class BankStatementService:
             month_date (str, optional): 月份筛选，格式为 YYYY-MM-01
             account_name (str: optional): 账户名称筛选
         """
-        # 子查询：现金流按月份和支付方式分组汇总
+        # 子查询：现金流按月份和支付方式分组汇总，month_date 为存储的月份列
         cashflow_subquery = db.session.query(
-            func.date_format(Cashflow.time, '%Y-%m-01').label('month_date'),
+            Cashflow.month_date.label('month_date'),
             Cashflow.payment_method,
             func.sum(
                 db.case((Cashflow.debit_credit == '收入', Cashflow.amount), else_=0)
@@ -36,7 +36,7 @@ class BankStatementService:
         ).filter(
             Cashflow.transaction_id.is_(None)  # 过滤掉证券交易
         ).group_by(
-            func.date_format(Cashflow.time, '%Y-%m-01'),
+            Cashflow.month_date,
             Cashflow.payment_method
         ).subquery()
 
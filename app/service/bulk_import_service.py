@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# app/service/bulk_import_service.py
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import pandas as pd
+
+from parser import parse_bill, source_content
+from app.extentions import db
+from app.service.cashflow_dedup_service import add_cashflow_records
+from app.service.import_ledger_service import ImportLedgerService
+from app.service.import_service import ImportService
+from app.service.transfer_match_service import TransferMatchService
+
+
+def _member_name(info):
+    """压缩包成员文件名；未标记 UTF-8 时按 UTF-8、GBK 依次尝试还原中文文件名"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        raw = info.filename.encode('cp437')
+    except UnicodeEncodeError:
+        return info.filename
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return info.filename
+
+
+class BulkImportService:
+    """目录、zip 压缩包或单个文件的账单导入"""
+    # 超过该大小且处理器支持流式解析的账单逐批解析写库，内存占用与文件大小无关
+    STREAM_THRESHOLD = 32 * 1024 * 1024
+
+    @staticmethod
+    def is_bundle(path):
+        """是否为目录或 zip 压缩包（xlsx 同为 zip 格式，需按扩展名区分）"""
+        return os.path.isdir(path) or (str(path).lower().endswith('.zip') and zipfile.is_zipfile(path))
+
+    @staticmethod
+    def iter_sources(path):
+        """
+        遍历目录或压缩包中的账单文件，单个文件原样返回
+
+        Yields:
+            tuple: (file_name, file_path, member, size)，压缩包成员的 file_path 为压缩包路径、member 为成员名，
+                成员不解压到磁盘，也不整体读入内存，由 parser.source_content 按需打开流
+        """
+        if not BulkImportService.is_bundle(path):
+            yield os.path.basename(path), path, None, os.path.getsize(path)
+            return
+
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    yield name, file_path, None, os.path.getsize(file_path)
+            return
+
+        with zipfile.ZipFile(path) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+        for info in infos:
+            yield os.path.basename(_member_name(info)), path, info.filename, info.file_size
+
+    @staticmethod
+    def import_path(path, max_workers=None, progress=None):
+        """
+        解析目录、压缩包或单个文件中的账单，逐个文件去重写库
+
+        - 内容与已导入文件相同的账单直接跳过，不解析；
+        - 落在同一来源已导入时间窗口内的明细直接跳过，其余明细进入去重写库；
+        - 多个文件时并行解析，不支持或解析、写库失败的文件记录在结果中，不影响其他文件；
+        - 每个文件的明细与导入登记在单独的事务中提交，内存中只保留正在写入的文件的明细；
+        - 超过 STREAM_THRESHOLD 的大账单流式解析，逐批写库并在单独的事务中提交；
+        - 写库后按新记录的时间范围配对自有账户之间的转账。
+
+        Args:
+            path (str): 目录、zip 文件或账单文件路径
+            max_workers (int, optional): 解析进程数，默认为 CPU 核数
+            progress (callable, optional): 每个文件提交后调用 progress(解析行数, 写入行数)，参数为累计值
+
+        Returns:
+            dict: 每个文件的处理结果及整体写入统计
+        """
+        files = []
+        pending = []
+        streamed = []
+        seen_hashes = set()
+        for name, file_path, member, size in BulkImportService.iter_sources(path):
+            content = source_content(file_path, member)
+            if content is None:
+                content_hash = ImportLedgerService.hash_file(file_path)
+            else:
+                with content() as stream:
+                    content_hash = ImportLedgerService.hash_stream(stream)
+            if content_hash in seen_hashes or ImportLedgerService.is_imported(content_hash):
+                files.append(BulkImportService._file_result(name, already_imported=True))
+                continue
+            seen_hashes.add(content_hash)
+
+            bill = ImportService.get_processor(file_path if member is None else name, content)
+            if bill is None:
+                files.append(BulkImportService._file_result(name, error=f'Unsupported file type: {name}'))
+                continue
+            if bill.STREAMING and size >= BulkImportService.STREAM_THRESHOLD:
+                streamed.append((name, content_hash, bill))
+                continue
+            pending.append((name, content_hash, file_path, member))
+
+        rows_parsed = rows_inserted = 0
+        start_time = end_time = None
+        for (name, content_hash, _, _), result in BulkImportService._parse_all(pending, max_workers):
+            if isinstance(result, Exception):
+                logging.error(f"Error processing file {name}: {str(result)}")
+                files.append(BulkImportService._file_result(name, error=str(result)))
+                continue
+            source, rows = result
+            new_rows = ImportLedgerService.filter_new_rows(source, rows)
+            try:
+                # 明细与导入登记在同一个事务中提交，避免写入明细后登记失败导致同一文件被再次导入
+                created = add_cashflow_records(new_rows, commit=False)
+                ImportLedgerService.record(content_hash, name, source, rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error processing file {name}: {str(e)}")
+                files.append(BulkImportService._file_result(name, error=str(e)))
+                continue
+            files.append(BulkImportService._file_result(name, rows=len(rows), window_skipped=len(rows) - len(new_rows)))
+            rows_parsed += len(rows)
+            rows_inserted += len(created)
+            if progress:
+                progress(rows_parsed, rows_inserted)
+            if created:
+                times = [record['time'] for record in created]
+                start_time = min(times) if start_time is None else min(start_time, min(times))
+                end_time = max(times) if end_time is None else max(end_time, max(times))
+        transfers_matched = BulkImportService.match_transfers(start_time, end_time) if start_time else 0
+
+        for name, content_hash, bill in streamed:
+            try:
+                rows, window_skipped, inserted, matched = BulkImportService.import_stream(name, content_hash, bill)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error processing file {name}: {str(e)}")
+                files.append(BulkImportService._file_result(name, error=str(e)))
+                continue
+            files.append(BulkImportService._file_result(name, rows=rows, window_skipped=window_skipped))
+            rows_parsed += rows
+            rows_inserted += inserted
+            transfers_matched += matched
+            if progress:
+                progress(rows_parsed, rows_inserted)
+
+        return {
+            'files': sorted(files, key=lambda f: f['file']),
+            'rows_parsed': rows_parsed,
+            'rows_inserted': rows_inserted,
+            'duplicates_skipped': rows_parsed - rows_inserted,
+            'transfers_matched': transfers_matched
+        }
+
+    @staticmethod
+    def import_stream(name, content_hash, bill, chunk_size=None):
+        """
+        流式导入单个大账单：逐批解析、过滤已导入时间窗口并去重写库
+
+        全部批次在同一个事务中写入，余额校验在最后一批之后进行，失败时抛出异常，
+        由调用方回滚，已写入的批次不会提交。提交后按账单时间范围配对转账。
+
+        Args:
+            name (str): 文件名
+            content_hash (str): 文件内容哈希，用于导入登记
+            bill (Processor): 账单处理器
+            chunk_size (int, optional): 每批行数，默认为处理器的 CHUNK_SIZE
+
+        Returns:
+            tuple: (解析行数, 时间窗口内跳过的行数, 写入行数, 配对的转账数)
+        """
+        source = bill.ledger_source
+        rows = window_skipped = inserted = 0
+        start_time = end_time = None
+        for df in bill.iter_batches(chunk_size):
+            times = pd.to_datetime(df['time'])
+            start_time = times.min() if start_time is None else min(start_time, times.min())
+            end_time = times.max() if end_time is None else max(end_time, times.max())
+
+            records = df.to_dict(orient='records')
+            new_rows = ImportLedgerService.filter_new_rows(source, records)
+            inserted += len(add_cashflow_records(new_rows, commit=False))
+            rows += len(records)
+            window_skipped += len(records) - len(new_rows)
+
+        ImportLedgerService.record_window(
+            content_hash, name, source,
+            start_time.to_pydatetime() if start_time is not None else None,
+            end_time.to_pydatetime() if end_time is not None else None,
+            rows
+        )
+        db.session.commit()
+
+        matched = 0
+        if inserted:
+            matched = BulkImportService.match_transfers(start_time.to_pydatetime(), end_time.to_pydatetime())
+        return rows, window_skipped, inserted, matched
+
+    @staticmethod
+    def match_transfers(start, end):
+        """导入提交后配对时间范围内的自转账，配对失败只记录日志，不影响已提交的导入"""
+        try:
+            return TransferMatchService.match(start, end)
+        except Exception as e:
+            logging.error(f"Error matching transfers between {start} and {end}: {str(e)}")
+            return 0
+
+    @staticmethod
+    def _parse_all(pending, max_workers=None):
+        """解析待导入文件，只有一个文件时直接在当前进程解析"""
+        if len(pending) <= 1:
+            for item in pending:
+                try:
+                    yield item, parse_bill(item[0], item[2], item[3])
+                except Exception as e:
+                    yield item, e
+            return
+
+        # 导入任务运行在 Web 进程的工作线程中，fork 会复制持有中的锁和数据库连接，子进程改用 spawn 启动；
+        # 工作函数 parser.worker.parse_bill 不依赖 app 包，子进程不会创建应用；压缩包成员由子进程自行打开
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn')) as executor:
+            futures = {executor.submit(parse_bill, name, file_path, member): (name, content_hash, file_path, member)
+                       for name, content_hash, file_path, member in pending}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+
+    @staticmethod
+    def _file_result(name, rows=0, window_skipped=0, already_imported=False, error=None):
+        return {
+            'file': name,
+            'rows': rows,
+            'window_skipped': window_skipped,
+            'already_imported': already_imported,
+            'error': error
+        }
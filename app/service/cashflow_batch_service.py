@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# app/service/cashflow_batch_service.py
+from sqlalchemy import delete, select, update
+
+from app.extentions import db
+from app.models import Cashflow
+from app.service.cashflow_search_service import CashflowSearchService
+
+
+class CashflowBatchService:
+    """
+    现金流批量修改、删除
+
+    按 cashflow_id 分批执行集合式 UPDATE/DELETE，全部批次在同一事务内完成，任一批失败整体回滚。
+    语句绕过 ORM，搜索索引在同一事务内显式同步。
+    """
+    # 允许批量修改的字段；时间、金额、收/支、支付方式参与去重指纹，不允许批量修改
+    EDITABLE_FIELDS = ('type', 'counterparty', 'goods', 'category', 'status', 'source')
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def _batches(ids):
+        for i in range(0, len(ids), CashflowBatchService.BATCH_SIZE):
+            yield ids[i:i + CashflowBatchService.BATCH_SIZE]
+
+    @staticmethod
+    def _lock_existing(ids):
+        """锁定并返回存在的记录ID"""
+        existing = set()
+        for batch in CashflowBatchService._batches(ids):
+            existing.update(db.session.execute(
+                select(Cashflow.cashflow_id).where(Cashflow.cashflow_id.in_(batch)).with_for_update()
+            ).scalars())
+        return existing
+
+    @staticmethod
+    def update(ids, values):
+        """
+        批量修改字段
+
+        Args:
+            ids (list): cashflow_id 列表
+            values (dict): 字段及新值，字段须在 EDITABLE_FIELDS 中
+
+        Returns:
+            set: 实际修改的 cashflow_id，其余为不存在的记录
+
+        Raises:
+            ValueError: 包含不允许批量修改的字段
+        """
+        invalid = [field for field in values if field not in CashflowBatchService.EDITABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Fields not editable in batch: {', '.join(invalid)}")
+
+        table = Cashflow.__table__
+        try:
+            existing = CashflowBatchService._lock_existing(ids)
+            targets = [cashflow_id for cashflow_id in ids if cashflow_id in existing]
+            for batch in CashflowBatchService._batches(targets):
+                db.session.execute(update(table).where(table.c.cashflow_id.in_(batch)).values(**values))
+                if 'counterparty' in values or 'goods' in values:
+                    CashflowSearchService.reindex(db.session.execute(
+                        select(table.c.cashflow_id, table.c.counterparty, table.c.goods)
+                        .where(table.c.cashflow_id.in_(batch))
+                    ).all())
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return existing
+
+    @staticmethod
+    def delete(ids):
+        """
+        批量删除
+
+        Returns:
+            set: 实际删除的 cashflow_id，其余为不存在的记录
+        """
+        table = Cashflow.__table__
+        try:
+            existing = CashflowBatchService._lock_existing(ids)
+            targets = [cashflow_id for cashflow_id in ids if cashflow_id in existing]
+            for batch in CashflowBatchService._batches(targets):
+                db.session.execute(delete(table).where(table.c.cashflow_id.in_(batch)))
+            CashflowSearchService.remove(targets)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return existing
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# app/service/cashflow_dedup_service.py
+from datetime import datetime
+
+from sqlalchemy import select, update, bindparam
+
+from app.extentions import db
+from app.models import Cashflow
+from app.service.cashflow_search_service import CashflowSearchService
+from app.utils.upsert import upsert
+from app.utils.utils import generate_cashflow_id, generate_cashflow_fingerprint
+
+
+class CashflowDedupService:
+    # IN 查询及批量更新的分批大小
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def existing_fingerprints(fingerprints):
+        """
+        批量查询已存在的去重指纹
+
+        Args:
+            fingerprints (iterable): 待检查的指纹
+
+        Returns:
+            set: 数据库中已存在的指纹
+        """
+        fingerprints = list(fingerprints)
+        existing = set()
+        for i in range(0, len(fingerprints), CashflowDedupService.BATCH_SIZE):
+            batch = fingerprints[i:i + CashflowDedupService.BATCH_SIZE]
+            existing.update(db.session.execute(
+                select(Cashflow.fingerprint).where(Cashflow.fingerprint.in_(batch))
+            ).scalars())
+        return existing
+
+    @staticmethod
+    def existing_ids(cashflow_ids):
+        """批量查询已存在的记录ID"""
+        cashflow_ids = list(cashflow_ids)
+        existing = set()
+        for i in range(0, len(cashflow_ids), CashflowDedupService.BATCH_SIZE):
+            batch = cashflow_ids[i:i + CashflowDedupService.BATCH_SIZE]
+            existing.update(db.session.execute(
+                select(Cashflow.cashflow_id).where(Cashflow.cashflow_id.in_(batch))
+            ).scalars())
+        return existing
+
+    @staticmethod
+    def backfill_fingerprints():
+        """
+        为存量记录补齐去重指纹
+
+        每个指纹只分配给时间最早的一条记录，其余重复记录保持为空，避免违反唯一索引。
+
+        Returns:
+            int: 补齐的记录数
+        """
+        assigned = set(db.session.execute(
+            select(Cashflow.fingerprint).where(Cashflow.fingerprint.isnot(None))
+        ).scalars())
+        rows = db.session.execute(
+            select(Cashflow.cashflow_id, Cashflow.time, Cashflow.debit_credit,
+                   Cashflow.amount, Cashflow.payment_method)
+            .where(Cashflow.fingerprint.is_(None))
+            .order_by(Cashflow.time, Cashflow.cashflow_id)
+        ).all()
+
+        updates = []
+        for row in rows:
+            fingerprint = generate_cashflow_fingerprint(row.time, row.debit_credit, row.amount, row.payment_method)
+            if fingerprint in assigned:
+                continue
+            assigned.add(fingerprint)
+            updates.append({'b_cashflow_id': row.cashflow_id, 'b_fingerprint': fingerprint})
+
+        table = Cashflow.__table__
+        stmt = update(table).where(
+            table.c.cashflow_id == bindparam('b_cashflow_id')
+        ).values(fingerprint=bindparam('b_fingerprint'))
+        for i in range(0, len(updates), CashflowDedupService.BATCH_SIZE):
+            db.session.execute(stmt, updates[i:i + CashflowDedupService.BATCH_SIZE])
+        db.session.commit()
+        return len(updates)
+
+
+def add_cashflow_records(data_list, commit=True):
+    """
+    批量添加现金流记录到数据库
+
+    该函数会检查每条记录是否已存在，如果不存在则创建新的现金流记录。
+    记录的唯一性通过去重指纹判断，指纹由时间（精确到分钟）、借贷方向、金额和支付方式生成。
+
+    Args:
+        data_list (list): 包含现金流数据的字典列表，每个字典应包含以下键：
+            - time (str or datetime): 交易时间
+            - debit_credit (str): 借贷方向，'收入' 或 '支出'
+            - amount (float): 金额
+            - payment_method (str): 支付方式
+            - type (str, optional): 交易类型
+            - counterparty (str, optional): 交易对手
+            - goods (str, optional): 商品或服务描述
+            - status (str, optional): 状态
+            - category (str, optional): 分类
+            - source (str, optional): 数据来源
+        commit (bool): 是否提交事务，流式导入时由调用方在全部批次写入后统一提交
+
+    Returns:
+        list: 新创建的现金流记录（字典）列表
+
+    Note:
+        - 如果记录已存在（数据库中或同一批次内指纹相同），则不会重复创建
+        - 已存在的指纹通过分批 IN 查询一次性获取，新记录以多行 INSERT 写入
+        - 所有新创建的记录会在一个数据库事务中提交，指纹唯一索引兜底并发导入，被其跳过的记录不在返回值中
+        - 新记录的交易对方、商品同步写入搜索倒排索引
+    """
+    records = {}
+    for data in data_list:
+        time = datetime.strptime(data.get('time'), '%Y-%m-%d %H:%M:%S') if isinstance(data.get('time'),
+                                                                                      str) else data.get('time')
+        debit_credit = data.get('debit_credit')
+        amount = data.get('amount')
+        payment_method = data.get('payment_method')
+        fingerprint = generate_cashflow_fingerprint(time, debit_credit, amount, payment_method)
+
+        # 同一批次内的重复记录只保留第一条
+        if fingerprint in records:
+            continue
+        records[fingerprint] = {
+            'cashflow_id': generate_cashflow_id(),
+            'time': time,
+            'type': data.get('type'),
+            'counterparty': data.get('counterparty'),
+            'goods': data.get('goods'),
+            'debit_credit': debit_credit,
+            'amount': amount,
+            'payment_method': payment_method,
+            'status': data.get('status'),
+            'category': data.get('category'),
+            'source': data.get('source'),
+            'fingerprint': fingerprint,
+        }
+
+    # 批量查询已存在的记录
+    existing = CashflowDedupService.existing_fingerprints(records.keys())
+    created_cashflow = [record for fingerprint, record in records.items() if fingerprint not in existing]
+
+    if created_cashflow:
+        # 查询后、写入前被并发导入写入的指纹按键冲突跳过（不修改已有行），其他错误照常抛出
+        table = Cashflow.__table__
+        upsert(table, created_cashflow, ['fingerprint'], lambda new: {'fingerprint': table.c.fingerprint})
+        # 键冲突跳过的行同样计入影响行数，按记录ID查询实际写入的记录
+        inserted = CashflowDedupService.existing_ids(record['cashflow_id'] for record in created_cashflow)
+        created_cashflow = [record for record in created_cashflow if record['cashflow_id'] in inserted]
+        # 批量 INSERT 不经过 ORM flush 事件，在同一事务内写入搜索索引
+        CashflowSearchService.index_records(created_cashflow)
+    if commit:
+        db.session.commit()
+    return created_cashflow
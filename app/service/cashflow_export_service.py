@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# app/service/cashflow_export_service.py
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import Cashflow
+
+
+class CashflowExportService:
+    """
+    现金流流式导出
+
+    查询通过服务端游标（stream_results）逐批读取，每批格式化后立即输出，
+    内存占用与导出行数无关。
+    """
+    COLUMNS = ['cashflow_id', 'time', 'type', 'counterparty', 'goods', 'debit_credit', 'amount',
+               'payment_method', 'status', 'category', 'source', 'transfer_id']
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def statement():
+        """导出查询，调用方在此基础上追加过滤条件"""
+        table = Cashflow.__table__
+        return select(*[table.c[name] for name in CashflowExportService.COLUMNS])
+
+    @staticmethod
+    def iter_rows(statement):
+        """按批返回导出行（元组列表），时间列格式化为字符串"""
+        statement = statement.order_by(Cashflow.time.desc(), Cashflow.cashflow_id.desc())
+        result = db.session.execute(
+            statement.execution_options(stream_results=True, yield_per=CashflowExportService.BATCH_SIZE)
+        )
+        time_index = CashflowExportService.COLUMNS.index('time')
+        try:
+            for partition in result.partitions():
+                rows = []
+                for row in partition:
+                    row = list(row)
+                    if row[time_index] is not None:
+                        row[time_index] = row[time_index].strftime('%Y-%m-%d %H:%M:%S')
+                    rows.append(row)
+                yield rows
+        finally:
+            result.close()
+
+    @staticmethod
+    def iter_csv(statement):
+        """
+        逐批生成 CSV 文本，带 UTF-8 BOM 以便 Excel 正确识别中文
+
+        Yields:
+            str: 表头或一批数据行
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CashflowExportService.COLUMNS)
+        # 表头立即输出，不等待第一批查询结果
+        yield '\ufeff' + buffer.getvalue()
+
+        for rows in CashflowExportService.iter_rows(statement):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+    @staticmethod
+    def iter_ndjson(statement):
+        """
+        逐批生成 NDJSON 文本，每行一个 JSON 对象
+
+        Yields:
+            str: 一批数据行
+        """
+        columns = CashflowExportService.COLUMNS
+        for rows in CashflowExportService.iter_rows(statement):
+            yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
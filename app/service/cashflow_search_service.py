@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# app/service/cashflow_search_service.py
+import re
+from collections import Counter
+
+from sqlalchemy import delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.extentions import db
+from app.models import Cashflow, CashflowNgram
+
+
+class CashflowSearchService:
+    """
+    交易对方、商品 的子串搜索
+
+    文本统一转小写并去除空白后按二元分词（中文按字切分）建立倒排索引 cashflow_ngram，
+    末字单独成词，使单字查询也能按分词前缀命中。查询时：
+    - 每个关键词（按空白切分）的全部二元分词都须命中，按命中分词的权重之和排序；
+    - 分词命中只是候选，最终仍以 LIKE 校验关键词是否为字段子串，排除分词顺序不同的误命中。
+
+    索引随写入增量维护：ORM 的新增、修改、删除在 flush 后同步（见 register），
+    批量 INSERT 等绕过 ORM 的写入由调用方显式调用 index_records / remove。
+    """
+    # 字段权重，交易对方命中的排序高于商品
+    FIELD_WEIGHTS = {'counterparty': 2, 'goods': 1}
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def normalize(text):
+        return re.sub(r'\s+', '', str(text)).lower() if text else ''
+
+    @staticmethod
+    def ngrams(text):
+        """
+        二元分词，末字单独成词
+
+        Examples:
+            >>> CashflowSearchService.ngrams('星巴克')
+            ['星巴', '巴克', '克']
+        """
+        text = CashflowSearchService.normalize(text)
+        if not text:
+            return []
+        return [text[i:i + 2] for i in range(len(text) - 1)] + [text[-1]]
+
+    @staticmethod
+    def postings(rows):
+        """
+        计算倒排记录，同一记录的重复分词合并为权重
+
+        Args:
+            rows (iterable): 包含 cashflow_id、counterparty、goods 的字典或行对象
+
+        Returns:
+            list: [{'gram', 'cashflow_id', 'weight'}]
+        """
+        weights = Counter()
+        for row in rows:
+            row = row if isinstance(row, dict) else row._mapping
+            for field, weight in CashflowSearchService.FIELD_WEIGHTS.items():
+                for gram in CashflowSearchService.ngrams(row.get(field)):
+                    weights[(gram, row['cashflow_id'])] += weight
+        return [{'gram': gram, 'cashflow_id': cashflow_id, 'weight': weight}
+                for (gram, cashflow_id), weight in weights.items()]
+
+    @staticmethod
+    def index_records(rows, connection=None):
+        """为新记录写入倒排索引，connection 默认为当前 session，不提交事务"""
+        executor = connection if connection is not None else db.session
+        postings = CashflowSearchService.postings(rows)
+        for i in range(0, len(postings), CashflowSearchService.BATCH_SIZE):
+            executor.execute(insert(CashflowNgram.__table__), postings[i:i + CashflowSearchService.BATCH_SIZE])
+        return len(postings)
+
+    @staticmethod
+    def remove(cashflow_ids, connection=None):
+        """删除记录的倒排索引，不提交事务"""
+        executor = connection if connection is not None else db.session
+        cashflow_ids = list(cashflow_ids)
+        table = CashflowNgram.__table__
+        for i in range(0, len(cashflow_ids), CashflowSearchService.BATCH_SIZE):
+            executor.execute(delete(table).where(
+                table.c.cashflow_id.in_(cashflow_ids[i:i + CashflowSearchService.BATCH_SIZE])))
+
+    @staticmethod
+    def reindex(rows, connection=None):
+        """交易对方或商品修改后重建这些记录的倒排索引"""
+        rows = [row if isinstance(row, dict) else dict(row._mapping) for row in rows]
+        CashflowSearchService.remove([row['cashflow_id'] for row in rows], connection)
+        return CashflowSearchService.index_records(rows, connection)
+
+    @staticmethod
+    def rebuild():
+        """
+        清空并按 cashflow_id 分批重建全部倒排索引，用于存量数据初始化
+
+        Returns:
+            int: 建立索引的现金流记录数
+        """
+        db.session.execute(delete(CashflowNgram.__table__))
+        count, last_id = 0, None
+        while True:
+            stmt = select(Cashflow.cashflow_id, Cashflow.counterparty, Cashflow.goods) \
+                .order_by(Cashflow.cashflow_id).limit(CashflowSearchService.BATCH_SIZE)
+            if last_id is not None:
+                stmt = stmt.where(Cashflow.cashflow_id > last_id)
+            rows = db.session.execute(stmt).all()
+            if not rows:
+                break
+            CashflowSearchService.index_records(rows)
+            count += len(rows)
+            last_id = rows[-1].cashflow_id
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def terms(q):
+        """按空白切分的小写关键词"""
+        return [term for term in str(q or '').lower().split() if term]
+
+    @staticmethod
+    def match(q):
+        """
+        查询关键词的候选记录及得分
+
+        Args:
+            q (str): 搜索关键词，多个关键词以空白分隔，须全部命中
+
+        Returns:
+            Subquery: 列 cashflow_id、score；关键词为空时返回 None
+        """
+        terms = CashflowSearchService.terms(q)
+        if not terms:
+            return None
+
+        grams = {term[i:i + 2] for term in terms for i in range(len(term) - 1)}
+        stmt = select(CashflowNgram.cashflow_id, func.sum(CashflowNgram.weight).label('score')) \
+            .group_by(CashflowNgram.cashflow_id)
+        if grams:
+            # 主键 (gram, cashflow_id) 保证同一记录的分词不重复，命中数等于分词数即全部命中
+            stmt = stmt.where(CashflowNgram.gram.in_(grams)) \
+                .having(func.count(CashflowNgram.gram) == len(grams))
+        else:
+            # 只有单字关键词时按分词前缀匹配
+            stmt = stmt.where(CashflowNgram.gram.startswith(terms[0], autoescape=True))
+        return stmt.subquery('cashflow_search')
+
+    @staticmethod
+    def search(query, q, rank=False):
+        """
+        为现金流查询附加搜索条件，query 可以是 Query 或 select 语句
+
+        Args:
+            query: 现金流查询
+            q (str): 搜索关键词
+            rank (bool): 是否按得分降序排序（调用方可继续追加排序条件）
+        """
+        matched = CashflowSearchService.match(q)
+        if matched is None:
+            return query
+        query = query.join(matched, matched.c.cashflow_id == Cashflow.cashflow_id)
+        for term in CashflowSearchService.terms(q):
+            query = query.filter(or_(Cashflow.counterparty.contains(term, autoescape=True),
+                                     Cashflow.goods.contains(term, autoescape=True)))
+        if rank:
+            query = query.order_by(matched.c.score.desc())
+        return query
+
+    @staticmethod
+    def register():
+        """注册 ORM flush 事件，使通过 session 增删改的现金流同步维护倒排索引"""
+        if not event.contains(Session, 'after_flush', _sync_after_flush):
+            event.listen(Session, 'after_flush', _sync_after_flush)
+
+
+def _sync_after_flush(session, flush_context):
+    """flush 后在同一连接、同一事务内同步倒排索引"""
+    removed, changed = set(), []
+    for obj in session.deleted:
+        if isinstance(obj, Cashflow):
+            removed.add(obj.cashflow_id)
+    for obj in session.new:
+        if isinstance(obj, Cashflow):
+            changed.append(obj)
+    for obj in session.dirty:
+        if not isinstance(obj, Cashflow):
+            continue
+        attrs = inspect(obj).attrs
+        if attrs.cashflow_id.history.has_changes():
+            removed.update(attrs.cashflow_id.history.deleted)
+            changed.append(obj)
+        elif attrs.counterparty.history.has_changes() or attrs.goods.history.has_changes():
+            removed.add(obj.cashflow_id)
+            changed.append(obj)
+
+    if not removed and not changed:
+        return
+    connection = session.connection()
+    if removed:
+        CashflowSearchService.remove(removed, connection)
+    if changed:
+        CashflowSearchService.index_records(
+            [{'cashflow_id': obj.cashflow_id, 'counterparty': obj.counterparty, 'goods': obj.goods}
+             for obj in changed], connection)
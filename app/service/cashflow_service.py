@@ -4,6 +4,8 @@ from app.extentions import db
 from app.models import Cashflow
 from sqlalchemy import func
 
+from app.utils.time_range import month_filter
+
 
 class CashflowSummaryService:
     @staticmethod
@@ -11,6 +13,9 @@ class CashflowSummaryService:
         """
         获取按月份和账户分组的现金流汇总数据
 
+        Args:
+            filter_month_date (str): 指定月份，格式为 YYYY-MM-01 或 YYYY-MM
+
         Returns:
             list: 包含每月每个账户的收支汇总数据
         """
@@ -18,13 +23,10 @@ class CashflowSummaryService:
         query = Cashflow.query.filter(Cashflow.transfer_id.is_(None))
 
         if filter_month_date:
-            query = query.filter(func.date_format(Cashflow.time, '%Y-%m-01') == filter_month_date)
+            query = query.filter(month_filter(Cashflow.time, filter_month_date))
 
-        # 构造month_date字段：将时间格式化为YYYY-MM-01
-        month_date = func.concat(
-            func.date_format(Cashflow.time, '%Y-%m'),
-            '-01'
-        ).label('month_date')
+        # month_date 为存储的月份列（所在月的第一天），分组可使用索引
+        month_date = Cashflow.month_date
 
         # 计算收入总额：debit_credit为'收入'时的amount总和
         debit = func.sum(
@@ -52,7 +54,7 @@ class CashflowSummaryService:
         result = []
         for row in summary_data:
             result.append({
-                'month_date': row.month_date,
+                'month_date': row.month_date.strftime('%Y-%m-%d'),
                 'payment_method': row.payment_method,
                 'debit': float(row.debit) if row.debit else 0.0,
                 'credit': float(row.credit) if row.credit else 0.0,
@@ -67,7 +69,7 @@ class CashflowSummaryService:
         获取按月份汇总的账户余额
 
         Args:
-            filter_month_date (str, optional): 指定月份，格式为YYYY-MM
+            filter_month_date (str, optional): 指定月份，格式为 YYYY-MM-01 或 YYYY-MM
 
         Returns:
             dict or float: 指定月份的余额或所有月份的余额字典
@@ -76,13 +78,10 @@ class CashflowSummaryService:
         query = Cashflow.query.filter(Cashflow.transfer_id.is_(None))
 
         if filter_month_date:
-            query = query.filter(func.date_format(Cashflow.time, '%Y-%m-01') == filter_month_date)
+            query = query.filter(month_filter(Cashflow.time, filter_month_date))
 
-        # 构造month_date字段
-        month_date = func.concat(
-            func.date_format(Cashflow.time, '%Y-%m'),
-            '-01'
-        ).label('month_date')
+        # 存储的月份列
+        month_date = Cashflow.month_date
 
         # 计算净余额：收入-支出
         net_balance = func.sum(
@@ -101,5 +100,5 @@ class CashflowSummaryService:
 
         result = {}
         for row in summary_data:
-            result[row.month_date] = float(row.net_balance) if row.net_balance else 0.0
+            result[row.month_date.strftime('%Y-%m-%d')] = float(row.net_balance) if row.net_balance else 0.0
         return result
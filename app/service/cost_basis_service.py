@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+# app/service/cost_basis_service.py
+import threading
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extentions import db
+from app.models import Transaction
+
+# 数量按 0.01 股为单位转换为整数计算，与 transaction.quantity 的精度一致，避免浮点误差
+UNITS = 100
+
+
+class CostBasisService:
+    """
+    按批次（lot）计算持仓成本和已实现盈亏
+
+    按时间顺序回放单只证券的全部交易，支持三种成本计算方法：
+    - fifo：先进先出，卖出依次消耗最早买入的批次；
+    - lifo：后进先出，卖出优先消耗最近买入的批次；
+    - average：移动加权平均，所有批次合并为一个成本池。
+    输出未平仓批次、每笔卖出的已实现盈亏，以及每笔分红按当时持有批次数量分摊的结果。
+
+    各方法卖出可匹配的数量相同：卖出数量超过当时持仓的部分不匹配任何批次（成本为 0），
+    匹配数量通过累计买入、累计卖出的反射过程（maximum.accumulate）一次算出。
+    FIFO 的批次匹配完全向量化：累计买入、累计匹配卖出两组边界合并后，每个区间恰好属于
+    一个买入批次和一笔卖出，按区间长度汇总成本；average 只在买入处递推平均成本；
+    lifo 的出栈顺序依赖时间，按批次栈逐笔处理。
+
+    分红记为分红收入，不冲减成本（position 表沿用原视图口径，分红冲减成本）。
+    结果按 (证券, 方法) 缓存，证券的交易变更并提交后只清除该证券的缓存。
+    每只证券有一个清除计数，回放期间缓存被清除（计数变化）时结果只返回、不写入缓存，避免旧结果覆盖清除。
+    """
+    METHODS = ('fifo', 'lifo', 'average')
+
+    _cache = {}
+    _generations = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(stock_code):
+        """按时间顺序读取证券的全部交易"""
+        return db.session.execute(
+            select(Transaction.transaction_id, Transaction.timestamp, Transaction.type,
+                   Transaction.quantity, Transaction.amount, Transaction.fee)
+            .where(Transaction.stock_code == stock_code)
+            .order_by(Transaction.timestamp, Transaction.transaction_id)
+        ).all()
+
+    @staticmethod
+    def get(stock_code, method='fifo'):
+        """
+        证券的批次持仓及盈亏，优先返回缓存
+
+        Raises:
+            ValueError: 不支持的成本计算方法
+        """
+        if method not in CostBasisService.METHODS:
+            raise ValueError(f'Unsupported cost basis method: {method}')
+        key = (stock_code, method)
+        with CostBasisService._lock:
+            if key in CostBasisService._cache:
+                return CostBasisService._cache[key]
+            generation = CostBasisService._generations.get(stock_code, 0)
+
+        result = {'stock_code': stock_code, **CostBasisService.replay(CostBasisService.load(stock_code), method)}
+        with CostBasisService._lock:
+            if CostBasisService._generations.get(stock_code, 0) == generation:
+                CostBasisService._cache[key] = result
+        return result
+
+    @staticmethod
+    def invalidate(stock_codes):
+        stock_codes = set(stock_codes)
+        with CostBasisService._lock:
+            for stock_code in stock_codes:
+                CostBasisService._generations[stock_code] = CostBasisService._generations.get(stock_code, 0) + 1
+            for key in [key for key in CostBasisService._cache if key[0] in stock_codes]:
+                del CostBasisService._cache[key]
+
+    @staticmethod
+    def mark_changed(stock_codes):
+        """
+        登记当前事务中交易有变更的证券，立即清除缓存，并在事务提交后再次清除，
+        避免提交前其他请求按旧数据重新计算并写入缓存
+        """
+        db.session.info.setdefault('changed_stocks', set()).update(stock_codes)
+        CostBasisService.invalidate(stock_codes)
+
+    @staticmethod
+    def register():
+        """注册事务提交事件，提交后清除 mark_changed 登记的证券缓存"""
+        if not event.contains(Session, 'after_commit', _invalidate_after_commit):
+            event.listen(Session, 'after_commit', _invalidate_after_commit)
+
+    @staticmethod
+    def replay(rows, method='fifo'):
+        """
+        回放交易计算批次持仓，rows 须按时间排序
+
+        Args:
+            rows (list): 包含 transaction_id、timestamp、type、quantity、amount、fee 的行
+            method (str): fifo、lifo 或 average
+
+        Returns:
+            dict: method、lots（未平仓批次）、sells（每笔卖出）、dividends（每笔分红的分摊）、summary
+        """
+        trades = _Trades(rows)
+        if method == 'fifo':
+            lots, sell_cost, allocations = trades.fifo()
+        elif method == 'lifo':
+            lots, sell_cost, allocations = trades.lifo()
+        else:
+            lots, sell_cost, allocations = trades.average()
+        return trades.report(method, lots, sell_cost, allocations)
+
+
+def _invalidate_after_commit(session):
+    changed = session.info.pop('changed_stocks', None)
+    if changed:
+        CostBasisService.invalidate(changed)
+
+
+class _Trades:
+    """单只证券按时间排序的交易数组"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        types = np.array([row.type for row in rows], dtype=object)
+        quantity = np.array([float(row.quantity or 0) for row in rows])
+        amount = np.array([float(row.amount or 0) for row in rows])
+        fee = np.array([float(row.fee or 0) for row in rows])
+        units = np.rint(quantity * UNITS).astype(np.int64)
+
+        self.buy_idx = np.flatnonzero(types == 'BUY')
+        self.sell_idx = np.flatnonzero(types == 'SELL')
+        self.div_idx = np.flatnonzero(types == 'DIVIDEND')
+
+        self.lot_units = units[self.buy_idx]
+        self.lot_cost = amount[self.buy_idx] + fee[self.buy_idx]
+        self.unit_cost = np.divide(self.lot_cost, self.lot_units, out=np.zeros(len(self.lot_units)),
+                                   where=self.lot_units > 0)
+        self.sell_units = units[self.sell_idx]
+        self.proceeds = amount[self.sell_idx] - fee[self.sell_idx]
+        self.div_amount = amount[self.div_idx]
+
+        # 累计买入边界：第 i 个批次占据 [buy_edges[i], buy_edges[i + 1])
+        self.buy_edges = np.concatenate(([0], np.cumsum(self.lot_units)))
+        # 每笔卖出之前的累计买入
+        bought = self.buy_edges[np.searchsorted(self.buy_idx, self.sell_idx)]
+        # 累计匹配卖出 S'_j = min(S'_{j-1} + s_j, bought_j)，等价于累计卖出减去超卖量的前缀最大值
+        total = np.cumsum(self.sell_units)
+        oversold = np.maximum.accumulate(np.maximum(total - bought, 0)) if len(total) else total
+        self.sell_edges = np.concatenate(([0], total - oversold))
+        self.matched_units = np.diff(self.sell_edges)
+
+    def _sold_before(self, index):
+        """各位置之前的累计匹配卖出"""
+        return self.sell_edges[np.searchsorted(self.sell_idx, index)]
+
+    def fifo(self):
+        edges = np.union1d(self.buy_edges, self.sell_edges)
+        start, length = edges[:-1], np.diff(edges)
+        consumed = (length > 0) & (start < self.sell_edges[-1])
+        start, length = start[consumed], length[consumed]
+        lot = np.searchsorted(self.buy_edges, start, side='right') - 1
+        sell = np.searchsorted(self.sell_edges, start, side='right') - 1
+
+        sell_cost = np.bincount(sell, weights=length * self.unit_cost[lot], minlength=len(self.sell_idx))
+        remaining = self.lot_units - np.bincount(lot, weights=length, minlength=len(self.lot_units)).astype(np.int64)
+
+        # 分红时各批次的剩余数量：批次区间扣除此前已卖出的部分，只计分红前买入的批次
+        allocations = []
+        if len(self.div_idx):
+            sold = self._sold_before(self.div_idx)[:, None]
+            held = np.clip(self.buy_edges[1:] - np.maximum(self.buy_edges[:-1], sold), 0, None)
+            held[self.buy_idx[None, :] > self.div_idx[:, None]] = 0
+            allocations = [[(lot, units) for lot, units in zip(np.flatnonzero(row), row[row > 0])] for row in held]
+
+        lots = [(lot, remaining[lot]) for lot in np.flatnonzero(remaining > 0)]
+        return lots, sell_cost, allocations
+
+    def lifo(self):
+        sell_cost = np.zeros(len(self.sell_idx))
+        allocations = []
+        stack = []
+        buy_pos = sell_pos = 0
+        for index in range(len(self.rows)):
+            if buy_pos < len(self.buy_idx) and self.buy_idx[buy_pos] == index:
+                stack.append([buy_pos, int(self.lot_units[buy_pos])])
+                buy_pos += 1
+            elif sell_pos < len(self.sell_idx) and self.sell_idx[sell_pos] == index:
+                need = int(self.matched_units[sell_pos])
+                while need > 0:
+                    lot = stack[-1]
+                    take = min(need, lot[1])
+                    sell_cost[sell_pos] += take * self.unit_cost[lot[0]]
+                    lot[1] -= take
+                    need -= take
+                    if lot[1] == 0:
+                        stack.pop()
+                sell_pos += 1
+            elif self.rows[index].type == 'DIVIDEND':
+                allocations.append([(lot, units) for lot, units in stack if units > 0])
+        return [(lot, units) for lot, units in stack if units > 0], sell_cost, allocations
+
+    def average(self):
+        # 平均成本只在买入时变化：A_k = (A_{k-1} * 买入前持仓 + 买入成本) / 买入后持仓
+        held_before = self.buy_edges[:-1] - self._sold_before(self.buy_idx)
+        avg = np.zeros(len(self.buy_idx))
+        previous = 0.0
+        for k in range(len(self.buy_idx)):
+            held_after = held_before[k] + self.lot_units[k]
+            previous = (previous * held_before[k] + self.lot_cost[k]) / held_after if held_after > 0 else 0.0
+            avg[k] = previous
+
+        last_buy = np.searchsorted(self.buy_idx, self.sell_idx) - 1
+        sell_avg = np.where(last_buy >= 0, avg[np.maximum(last_buy, 0)], 0.0) if len(avg) else np.zeros(len(last_buy))
+        sell_cost = self.matched_units * sell_avg
+
+        # 成本池作为一个批次，记为 None
+        held = self.buy_edges[np.searchsorted(self.buy_idx, self.div_idx)] - self._sold_before(self.div_idx)
+        allocations = [[(None, units)] if units > 0 else [] for units in held]
+        remaining = int(self.buy_edges[-1] - self.sell_edges[-1])
+        self.pool_cost = float(avg[-1]) if len(avg) else 0.0
+        return ([(None, remaining)] if remaining > 0 else []), sell_cost, allocations
+
+    def _open_lots(self, lots):
+        """未平仓批次及其总成本，lot 为 None 表示平均成本法的成本池"""
+        if not lots:
+            return [], 0.0
+        if lots[0][0] is None:
+            units = int(lots[0][1])
+            cost = units * self.pool_cost
+            return [{'transaction_id': None, 'timestamp': None, 'quantity': units / UNITS,
+                     'unit_cost': round(self.pool_cost * UNITS, 3), 'cost': round(cost, 2)}], cost
+
+        lot = np.array([lot for lot, _ in lots], dtype=np.int64)
+        units = np.array([units for _, units in lots], dtype=np.int64)
+        cost = units * self.unit_cost[lot]
+        open_lots = [{
+            'transaction_id': self.rows[index].transaction_id,
+            'timestamp': _format_time(self.rows[index].timestamp),
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'cost': lot_cost
+        } for index, quantity, unit_cost, lot_cost in zip(
+            self.buy_idx[lot].tolist(), (units / UNITS).tolist(),
+            np.round(self.unit_cost[lot] * UNITS, 3).tolist(), np.round(cost, 2).tolist())]
+        return open_lots, float(cost.sum())
+
+    def report(self, method, lots, sell_cost, allocations):
+        open_lots, open_cost = self._open_lots(lots)
+
+        # 超卖部分没有成本，全部卖出所得计入已实现盈亏
+        sells = [{
+            'transaction_id': self.rows[index].transaction_id,
+            'timestamp': _format_time(self.rows[index].timestamp),
+            'quantity': quantity,
+            'matched_quantity': matched,
+            'proceeds': proceeds,
+            'cost': cost,
+            'realized_pnl': pnl
+        } for index, quantity, matched, proceeds, cost, pnl in zip(
+            self.sell_idx.tolist(), (self.sell_units / UNITS).tolist(), (self.matched_units / UNITS).tolist(),
+            np.round(self.proceeds, 2).tolist(), np.round(sell_cost, 2).tolist(),
+            np.round(self.proceeds - sell_cost, 2).tolist())]
+
+        dividends = []
+        for d, index in enumerate(self.div_idx):
+            row = self.rows[index]
+            held = sum(int(units) for _, units in allocations[d])
+            dividends.append({
+                'transaction_id': row.transaction_id,
+                'timestamp': _format_time(row.timestamp),
+                'amount': round(float(self.div_amount[d]), 2),
+                'allocations': [{
+                    'lot_transaction_id': self.rows[self.buy_idx[lot]].transaction_id if lot is not None else None,
+                    'quantity': int(units) / UNITS,
+                    'amount': round(float(self.div_amount[d]) * int(units) / held, 2)
+                } for lot, units in allocations[d]]
+            })
+
+        quantity = sum(int(units) for _, units in lots) / UNITS
+        return {
+            'method': method,
+            'lots': open_lots,
+            'sells': sells,
+            'dividends': dividends,
+            'summary': {
+                'quantity': quantity,
+                'cost': round(open_cost, 2),
+                'avg_cost': round(open_cost / quantity, 3) if quantity > 0 else 0,
+                'realized_pnl': round(float(np.sum(self.proceeds - sell_cost)), 2),
+                'dividend_income': round(float(np.sum(self.div_amount)), 2),
+                'unmatched_quantity': int(np.sum(self.sell_units - self.matched_units)) / UNITS
+            }
+        }
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# app/service/import_job_service.py
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from app.extentions import db
+from app.models import ImportJob
+from app.service.bulk_import_service import BulkImportService
+
+
+class ImportJobService:
+    """
+    账单后台导入任务队列
+
+    上传接口只负责保存文件并登记任务，解析与写库由本地线程池执行。
+    任务文件为目录或 zip 压缩包时，由 BulkImportService 并行解析其中的全部账单；
+    已导入过的相同文件及已导入时间窗口内的明细会被跳过，见 ImportLedgerService。
+    任务状态持久化在 import_job 表中，服务启动时（run.py）重新执行未完成的任务。
+
+    多个进程（多个 Web worker、调试重载的父子进程）可能同时持有同一任务，执行前须以条件更新认领：
+    只有待执行的任务，或执行进程的心跳已超过租约时间的任务可以被认领。执行中的进程定期刷新心跳，
+    因此进程退出后任务在租约到期后才会被其他进程接管，不会同时执行两次。
+    """
+    LEASE = timedelta(minutes=5)
+    HEARTBEAT_INTERVAL = 60
+
+    _app = None
+    _executor = None
+    _heartbeat = None
+
+    @classmethod
+    def init_app(cls, app):
+        """绑定应用并启动线程池；未完成的任务由 resume_unfinished 在服务启动时恢复"""
+        cls._app = app
+        cls._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('IMPORT_WORKERS', 2),
+            thread_name_prefix='import-job'
+        )
+        if cls._heartbeat is None:
+            cls._heartbeat = threading.Thread(target=cls._heartbeat_loop, name='import-job-heartbeat', daemon=True)
+            cls._heartbeat.start()
+
+    @staticmethod
+    def owner():
+        """当前进程的标识，写入认领的任务"""
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    @classmethod
+    def submit(cls, file_name, file_path, owns_file=False):
+        """
+        登记导入任务并提交到线程池
+
+        Args:
+            file_name (str): 文件名
+            file_path (str): 文件路径
+            owns_file (bool): 文件是否由上传接口为本任务写入，只有这类文件在任务失败时删除
+
+        Returns:
+            str: 任务ID
+        """
+        job = ImportJob(
+            job_id=uuid.uuid4().hex,
+            file_name=file_name,
+            file_path=file_path,
+            owns_file=owns_file,
+            state=ImportJob.PENDING
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        cls._executor.submit(cls._run, job.job_id)
+        return job.job_id
+
+    @staticmethod
+    def _claimable(now):
+        """待执行，或执行中但心跳已超过租约时间（执行进程已退出）"""
+        return or_(ImportJob.state == ImportJob.PENDING,
+                   and_(ImportJob.state == ImportJob.RUNNING,
+                        or_(ImportJob.heartbeat.is_(None), ImportJob.heartbeat < now - ImportJobService.LEASE)))
+
+    @classmethod
+    def resume_unfinished(cls):
+        """
+        将未完成的任务放回队列，只应在服务进程启动时调用
+
+        是否真正执行由 claim 决定，其他进程正在执行的任务会被跳过。
+
+        Returns:
+            int: 放回队列的任务数
+        """
+        jobs = ImportJob.query.filter(ImportJobService._claimable(datetime.now())).all()
+        for job in jobs:
+            logging.info(f"Resuming import job {job.job_id}: {job.file_name}")
+            cls._executor.submit(cls._run, job.job_id)
+        return len(jobs)
+
+    @staticmethod
+    def claim(job_id):
+        """
+        以条件更新认领任务并标记为执行中，同一时刻只有一个进程能认领成功
+
+        Returns:
+            bool: 是否认领成功
+        """
+        now = datetime.now()
+        result = db.session.execute(
+            update(ImportJob).where(ImportJob.job_id == job_id, ImportJobService._claimable(now))
+            .values(state=ImportJob.RUNNING, owner=ImportJobService.owner(), heartbeat=now, error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def _heartbeat_loop(cls):
+        """定期刷新本进程执行中任务的心跳"""
+        while True:
+            time.sleep(cls.HEARTBEAT_INTERVAL)
+            with cls._app.app_context():
+                try:
+                    cls.beat()
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Import job heartbeat failed: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    @staticmethod
+    def beat():
+        """刷新心跳，返回刷新的任务数"""
+        result = db.session.execute(
+            update(ImportJob).where(ImportJob.owner == ImportJobService.owner(), ImportJob.state == ImportJob.RUNNING)
+            .values(heartbeat=datetime.now()).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def get(job_id):
+        return db.session.get(ImportJob, job_id)
+
+    @classmethod
+    def _run(cls, job_id):
+        with cls._app.app_context():
+            try:
+                cls.execute(job_id)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def execute(job_id):
+        """执行导入任务：认领任务后解析文件、去重写库并记录进度；任务已完成或由其他进程执行时跳过"""
+        if not ImportJobService.claim(job_id):
+            return
+        job = db.session.get(ImportJob, job_id)
+
+        def report(rows_parsed, rows_inserted):
+            # 每个文件提交后更新进度，批量导入过程中即可查询已处理的行数
+            job.rows_parsed = rows_parsed
+            job.rows_inserted = rows_inserted
+            job.duplicates_skipped = rows_parsed - rows_inserted
+            db.session.commit()
+
+        try:
+            summary = BulkImportService.import_path(job.file_path, progress=report)
+            errors = [f"{f['file']}: {f['error']}" for f in summary['files'] if f['error']]
+            if errors and not BulkImportService.is_bundle(job.file_path):
+                # 单个文件解析失败时任务失败；批量导入中个别文件失败只记录错误
+                raise ValueError(summary['files'][0]['error'])
+
+            job.rows_parsed = summary['rows_parsed']
+            job.rows_inserted = summary['rows_inserted']
+            job.duplicates_skipped = summary['duplicates_skipped']
+            job.error = '\n'.join(errors) or None
+            job.state = ImportJob.SUCCEEDED
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Import job {job_id} failed: {str(e)}", exc_info=True)
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.state = ImportJob.FAILED
+            job.error = str(e)
+            db.session.commit()
+            # 上传的文件失败后不保留，允许修正后重新上传；导入已有目录或压缩包时不删除用户的文件
+            if job.owns_file and os.path.isfile(job.file_path):
+                os.remove(job.file_path)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# app/service/import_ledger_service.py
+import hashlib
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import ImportLedger
+
+
+class ImportLedgerService:
+    """
+    已导入账单文件登记
+
+    每个成功导入的文件按内容哈希登记来源、明细时间范围和行数：
+    - 内容完全相同的文件直接跳过，不再解析；
+    - 同一来源的账单时间范围重叠时，落在已导入时间窗口内的明细直接跳过，
+      只有窗口外的明细进入去重写库流程。
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def hash_bytes(content):
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path):
+        with open(file_path, 'rb') as f:
+            return ImportLedgerService.hash_stream(f)
+
+    @staticmethod
+    def hash_stream(stream):
+        """按块读取二进制流计算哈希，不把内容整体读入内存"""
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(ImportLedgerService.CHUNK_SIZE), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def is_imported(content_hash):
+        """内容相同的文件是否已导入"""
+        return db.session.execute(
+            select(ImportLedger.id).where(ImportLedger.content_hash == content_hash)
+        ).first() is not None
+
+    @staticmethod
+    def _merged_windows(source):
+        """返回同一来源已导入时间窗口（合并重叠部分后）的起止时间数组"""
+        windows = db.session.execute(
+            select(ImportLedger.start_time, ImportLedger.end_time)
+            .where(ImportLedger.source == source,
+                   ImportLedger.start_time.isnot(None),
+                   ImportLedger.end_time.isnot(None))
+            .order_by(ImportLedger.start_time)
+        ).all()
+
+        merged = []
+        for start, end in windows:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        starts = np.array([w[0] for w in merged], dtype='datetime64[us]')
+        ends = np.array([w[1] for w in merged], dtype='datetime64[us]')
+        return starts, ends
+
+    @staticmethod
+    def filter_new_rows(source, records):
+        """
+        过滤掉落在同一来源已导入时间窗口内的明细
+
+        Args:
+            source (str): 账单来源
+            records (list): 现金流记录字典列表
+
+        Returns:
+            list: 窗口外的记录
+        """
+        if not records:
+            return records
+        starts, ends = ImportLedgerService._merged_windows(source)
+        if not len(starts):
+            return records
+
+        times = pd.to_datetime([record['time'] for record in records]).to_numpy(dtype='datetime64[us]')
+        idx = np.searchsorted(starts, times, side='right') - 1
+        inside = (idx >= 0) & (times <= ends[np.maximum(idx, 0)])
+        return [record for record, skip in zip(records, inside) if not skip]
+
+    @staticmethod
+    def record(content_hash, file_name, source, records):
+        """登记已导入的文件，由调用方提交事务"""
+        times = pd.to_datetime([record['time'] for record in records])
+        ImportLedgerService.record_window(
+            content_hash, file_name, source,
+            times.min().to_pydatetime() if len(times) else None,
+            times.max().to_pydatetime() if len(times) else None,
+            len(records)
+        )
+
+    @staticmethod
+    def record_window(content_hash, file_name, source, start_time, end_time, row_count):
+        """按已统计的时间范围和行数登记文件，用于流式导入，由调用方提交事务"""
+        db.session.add(ImportLedger(
+            content_hash=content_hash,
+            file_name=file_name,
+            source=source,
+            start_time=start_time,
+            end_time=end_time,
+            row_count=row_count
+        ))
@@ -4,17 +4,28 @@
 import logging
 
 # 更新导入路径
-from parser import WeixinProcessor, AlipayProcessor
+from parser import get_processor
 
 class ImportService:
+    @staticmethod
+    def get_processor(file_path, content=None):
+        """
+        根据文件头部内容选择账单处理器，只读取文件开头几 KB，无法识别时按文件名兜底
+
+        Args:
+            file_path (str): 文件路径或文件名
+            content (bytes, optional): 文件内容，传入时不再读取磁盘
+
+        Returns:
+            Processor or None: 不支持的文件返回 None
+        """
+        return get_processor(file_path, content)
+
     @staticmethod
     def import_cashflow(file_path):
         try:
-            if '微信支付账单' in str(file_path):
-                bill = WeixinProcessor(file_path)
-                return bill.df.to_dict(orient='records')
-            if 'alipay_record' in str(file_path) or '支付宝' in str(file_path):
-                bill = AlipayProcessor(file_path)
+            bill = ImportService.get_processor(file_path)
+            if bill is not None:
                 return bill.df.to_dict(orient='records')
             return {'error': f'Unsupported file type: {file_path}'}, 400
         except Exception as e:
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# app/service/latest_price_service.py
+from sqlalchemy import func, select
+
+from app.extentions import db
+from app.models import LatestPrice, StockPrice
+from app.utils.upsert import upsert
+
+
+class LatestPriceService:
+    """
+    最新价格表 latest_price 的维护
+
+    每只证券取自身最近一个交易日的收盘价，停牌或未更新到全局最新日期的证券不会从估值中消失；
+    price_getter 写入行情（股票、基金）后按证券刷新，持仓、资产视图只按主键关联该表。
+    """
+
+    @staticmethod
+    def refresh(stock_codes=None):
+        """
+        按 stock_price 重新取证券的最近收盘价并写入 latest_price
+
+        Args:
+            stock_codes (iterable, optional): 需要刷新的证券，默认全部
+
+        Returns:
+            int: 写入的证券数
+        """
+        latest = select(StockPrice.stock_code, func.max(StockPrice.date).label('date')).group_by(StockPrice.stock_code)
+        if stock_codes is not None:
+            latest = latest.where(StockPrice.stock_code.in_(list(stock_codes)))
+        latest = latest.subquery()
+        rows = db.session.execute(
+            select(StockPrice.stock_code, StockPrice.date, StockPrice.close).join(
+                latest, (StockPrice.stock_code == latest.c.stock_code) & (StockPrice.date == latest.c.date))
+        ).mappings().all()
+
+        table = LatestPrice.__table__
+        try:
+            upsert(table, [dict(row) for row in rows], ['stock_code'],
+                   lambda new: {'date': new.date, 'close': new.close})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
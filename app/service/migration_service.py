@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# app/service/migration_service.py
+import logging
+
+from sqlalchemy import func, select, table
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.extentions import db
+from app.migrations import MIGRATIONS
+from app.models import SchemaMigration
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN 查询计划"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = 'EXPLAIN QUERY PLAN ' if compiler.dialect.name == 'sqlite' else 'EXPLAIN '
+    return prefix + compiler.process(element.statement, **kw)
+
+
+class MigrationService:
+    """
+    数据库结构版本化迁移
+
+    已执行的版本记录在 schema_migration 表中，应用启动时按版本号依次执行未执行的迁移。
+    MySQL 的 DDL 会隐式提交，迁移中途失败时已完成的变更不会回滚，
+    因此每个迁移都须可重复执行，修复后重新运行即可。
+    """
+
+    @staticmethod
+    def applied_versions():
+        return set(db.session.execute(select(SchemaMigration.version)).scalars())
+
+    @staticmethod
+    def pending():
+        applied = MigrationService.applied_versions()
+        return [migration for migration in MIGRATIONS if migration.VERSION not in applied]
+
+    @staticmethod
+    def upgrade(target=None):
+        """
+        执行未执行的迁移
+
+        Args:
+            target (int, optional): 最高执行到的版本号，默认全部
+
+        Returns:
+            list: 本次执行的版本号
+        """
+        SchemaMigration.__table__.create(bind=db.engine, checkfirst=True)
+        executed = []
+        for migration in MigrationService.pending():
+            if target is not None and migration.VERSION > target:
+                break
+            logging.info(f"Applying migration {migration.VERSION:03d} {migration.NAME}")
+            migration.upgrade()
+            db.session.add(SchemaMigration(version=migration.VERSION, name=migration.NAME))
+            db.session.commit()
+            executed.append(migration.VERSION)
+        return executed
+
+    @staticmethod
+    def status():
+        """各迁移的执行状态"""
+        applied = {row.version: row for row in SchemaMigration.query.all()}
+        return [{
+            'version': migration.VERSION,
+            'name': migration.NAME,
+            'applied_time': applied[migration.VERSION].to_dict()['applied_time']
+            if migration.VERSION in applied else None
+        } for migration in MIGRATIONS]
+
+    @staticmethod
+    def table_scans(rows, dialect_name):
+        """
+        查询计划中的全表扫描
+
+        Returns:
+            list: [(表名, 估算行数)]，SQLite 的计划不含行数，估算行数为 None
+        """
+        if dialect_name == 'sqlite':
+            return [(row['detail'].split()[1], None) for row in rows
+                    if row['detail'].startswith('SCAN ') and 'USING' not in row['detail']]
+        return [(row['table'], row.get('rows')) for row in rows if row.get('type') == 'ALL']
+
+    @staticmethod
+    def explain(statement, small_table_rows=None):
+        """
+        获取查询计划，并找出全表扫描的表
+
+        MySQL 中 type 为 ALL 即全表扫描，无论 possible_keys 是否为空：有可用索引却未使用，
+        同样说明索引与查询不匹配。SQLite 中不带 USING INDEX 的 SCAN 即全表扫描。
+        数据量很小时优化器可能认为全表扫描更快，只有显式指定 small_table_rows 时，
+        才放过行数不超过该值的表（MySQL 取 EXPLAIN 估算的 rows，SQLite 取表的实际行数）。
+
+        Args:
+            statement: 待分析的 select 语句
+            small_table_rows (int, optional): 允许全表扫描的小表行数上限，默认不允许
+
+        Returns:
+            tuple: (查询计划行列表, 全表扫描的表名列表)
+        """
+        rows = [dict(row) for row in db.session.execute(Explain(statement)).mappings()]
+        full_scans = []
+        for table_name, estimated_rows in MigrationService.table_scans(rows, db.engine.dialect.name):
+            if small_table_rows is not None:
+                if estimated_rows is None:
+                    estimated_rows = db.session.execute(select(func.count()).select_from(table(table_name))).scalar()
+                if estimated_rows <= small_table_rows:
+                    continue
+            full_scans.append(table_name)
+        return rows, full_scans
+
+    @staticmethod
+    def verify(version=None, small_table_rows=None):
+        """
+        对迁移声明的热点查询执行 EXPLAIN
+
+        Args:
+            version (int, optional): 只校验指定版本，默认校验全部已执行的迁移
+            small_table_rows (int, optional): 允许全表扫描的小表行数上限，见 explain
+
+        Returns:
+            list: 每个查询的校验结果，ok 为 False 表示仍然全表扫描
+        """
+        applied = MigrationService.applied_versions()
+        results = []
+        for migration in MIGRATIONS:
+            if (version is not None and migration.VERSION != version) or migration.VERSION not in applied:
+                continue
+            for description, statement in migration.hot_queries():
+                plan, full_scans = MigrationService.explain(statement, small_table_rows)
+                results.append({
+                    'version': migration.VERSION,
+                    'query': description,
+                    'ok': not full_scans,
+                    'full_scans': full_scans,
+                    'plan': plan
+                })
+        return results
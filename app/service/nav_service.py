@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# app/service/nav_service.py
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from app.extentions import db
+from app.models import PortfolioDailyValue, Transaction
+from app.service.price_matrix_service import PriceMatrixService
+
+# 各交易类型对持仓数量与净投入的影响，口径与持仓表一致
+QUANTITY_SIGN = {'BUY': 1, 'SELL': -1}
+
+
+def _flow(types, amounts, fees):
+    """净投入：买入金额+费用，卖出 -金额+费用，分红 -金额"""
+    return np.select(
+        [types == 'BUY', types == 'SELL', types == 'DIVIDEND'],
+        [amounts + fees, -amounts + fees, -amounts],
+        0.0
+    )
+
+
+class NavService:
+    """
+    证券组合每日估值 portfolio_daily_value 的计算与维护
+
+    以交易日 × 证券的矩阵计算：交易按日累加后求累计和得到每日持仓，与对齐并向下填充的收盘价矩阵相乘得到市值。
+    单位净值按日收益率连乘，当日净投入为正视为开盘前投入（计入分母），为负视为收盘后取出（计入分子），
+    剔除资金进出对收益率的影响。
+    表按日期增量追加，交易变更时从交易日起截断，由下次 update 重新计算。
+    """
+
+    @staticmethod
+    def trade_date(value):
+        """交易时间（datetime、date 或 'YYYY-MM-DD ...' 字符串）所在日期"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+    @staticmethod
+    def last():
+        return db.session.execute(
+            select(PortfolioDailyValue).order_by(PortfolioDailyValue.date.desc()).limit(1)
+        ).scalar()
+
+    @staticmethod
+    def _trades(start=None, end=None):
+        stmt = select(Transaction.stock_code, Transaction.type, Transaction.timestamp,
+                      Transaction.quantity, Transaction.amount, Transaction.fee)
+        if start is not None:
+            stmt = stmt.where(Transaction.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(Transaction.timestamp < end)
+        rows = db.session.execute(stmt).all()
+        return {
+            'stock_code': np.array([row.stock_code for row in rows], dtype=object),
+            'type': np.array([row.type for row in rows], dtype=object),
+            'date': np.array([NavService.trade_date(row.timestamp) for row in rows], dtype='datetime64[D]'),
+            'quantity': np.array([float(row.quantity or 0) for row in rows]),
+            'amount': np.array([float(row.amount or 0) for row in rows]),
+            'fee': np.array([float(row.fee or 0) for row in rows]),
+        }
+
+    @staticmethod
+    def update(until=None):
+        """
+        从已有最后一个交易日之后追加估值，直到 until（默认为最新行情日）
+
+        Returns:
+            int: 新增的交易日数
+        """
+        try:
+            last = NavService.last()
+            start = last.date + timedelta(days=1) if last else None
+            stock_codes = db.session.execute(
+                select(Transaction.stock_code).distinct().order_by(Transaction.stock_code)).scalars().all()
+            if not stock_codes:
+                return 0
+            if start is None:
+                start = NavService.trade_date(db.session.execute(
+                    select(Transaction.timestamp).order_by(Transaction.timestamp).limit(1)).scalar())
+
+            dates = PriceMatrixService.trading_dates(stock_codes, start, until)
+            if not len(dates):
+                return 0
+            _, closes = PriceMatrixService.load(stock_codes, dates=dates)
+
+            column = {code: i for i, code in enumerate(stock_codes)}
+            start_time = datetime.combine(start, datetime.min.time())
+            end_time = datetime.combine(dates[-1].item() + timedelta(days=1), datetime.min.time())
+
+            # 起始持仓：start 之前的全部买卖
+            holdings = np.zeros(len(stock_codes))
+            before = NavService._trades(end=start_time)
+            if len(before['type']):
+                columns = np.array([column[code] for code in before['stock_code']])
+                sign = np.array([QUANTITY_SIGN.get(t, 0) for t in before['type']])
+                np.add.at(holdings, columns, sign * before['quantity'])
+
+            # 区间内交易归入当日或之后的第一个交易日
+            trades = NavService._trades(start_time, end_time)
+            quantity_delta = np.zeros((len(dates), len(stock_codes)))
+            flows = np.zeros(len(dates))
+            if len(trades['type']):
+                rows = np.searchsorted(dates, trades['date'])
+                columns = np.array([column[code] for code in trades['stock_code']])
+                sign = np.array([QUANTITY_SIGN.get(t, 0) for t in trades['type']])
+                np.add.at(quantity_delta, (rows, columns), sign * trades['quantity'])
+                np.add.at(flows, rows, _flow(trades['type'], trades['amount'], trades['fee']))
+
+            holdings = holdings + np.cumsum(quantity_delta, axis=0)
+            market_value = np.nansum(holdings * closes, axis=1)
+            position_count = np.count_nonzero(np.abs(holdings) > 1e-9, axis=1)
+
+            previous_value = np.concatenate([[float(last.market_value) if last else 0.0], market_value[:-1]])
+            numerator = market_value - np.minimum(flows, 0)
+            denominator = previous_value + np.maximum(flows, 0)
+            returns = np.divide(numerator, denominator, out=np.ones(len(dates)), where=denominator > 0)
+            nav = (float(last.nav) if last else 1.0) * np.cumprod(returns)
+            net_investment = (float(last.net_investment) if last else 0.0) + np.cumsum(flows)
+
+            db.session.execute(insert(PortfolioDailyValue.__table__), [{
+                'date': dates[i].item(),
+                'market_value': round(float(market_value[i]), 2),
+                'net_investment': round(float(net_investment[i]), 2),
+                'daily_flow': round(float(flows[i]), 2),
+                'nav': round(float(nav[i]), 6),
+                'position_count': int(position_count[i]),
+            } for i in range(len(dates))])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(dates)
+
+    @staticmethod
+    def invalidate_from(trade_date):
+        """删除 trade_date 当日及之后的估值，不提交事务，用于交易补录、修改后截断"""
+        db.session.execute(delete(PortfolioDailyValue.__table__).where(
+            PortfolioDailyValue.date >= NavService.trade_date(trade_date)))
+
+    @staticmethod
+    def rebuild(start=None):
+        """
+        从 start（默认全部）起重新计算估值
+
+        Returns:
+            int: 重新计算的交易日数
+        """
+        try:
+            if start is None:
+                db.session.execute(delete(PortfolioDailyValue.__table__))
+            else:
+                NavService.invalidate_from(start)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return NavService.update()
+
+    @staticmethod
+    def range(start=None, end=None):
+        """读取日期范围内（包含两端）的估值记录"""
+        stmt = select(PortfolioDailyValue).order_by(PortfolioDailyValue.date)
+        if start is not None:
+            stmt = stmt.where(PortfolioDailyValue.date >= start)
+        if end is not None:
+            stmt = stmt.where(PortfolioDailyValue.date <= end)
+        return db.session.execute(stmt).scalars().all()
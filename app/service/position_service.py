@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# app/service/position_service.py
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import case, delete, func, insert, select, update
+
+from app.extentions import db
+from app.models import Position, Transaction
+from app.service.cost_basis_service import CostBasisService
+from app.service.nav_service import NavService
+from app.utils.upsert import upsert
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+class PositionService:
+    """
+    持仓汇总表 position 的维护
+
+    交易的新增、修改、删除在同一事务内按差额更新对应证券的数量、成本和交易笔数，
+    读取持仓只需按 stock_code 主键查询，不再每次汇总全部交易记录。
+    rebuild 按交易表全量重建，check 将汇总表与交易表的实时汇总（原 v_position 视图口径）逐项比对。
+    """
+
+    @staticmethod
+    def aggregate():
+        """按证券汇总交易记录，口径与原 v_position 视图一致"""
+        quantity = func.sum(case(
+            (Transaction.type == 'BUY', Transaction.quantity),
+            (Transaction.type == 'SELL', -Transaction.quantity),
+            else_=0
+        ))
+        cost = func.sum(case(
+            (Transaction.type == 'BUY', Transaction.amount + Transaction.fee),
+            (Transaction.type == 'SELL', -Transaction.amount + Transaction.fee),
+            (Transaction.type == 'DIVIDEND', -Transaction.amount),
+            else_=0
+        ))
+        return select(
+            Transaction.stock_code,
+            quantity.label('quantity'),
+            cost.label('cost'),
+            func.count().label('trade_count'),
+            func.max(Transaction.timestamp).label('last_updated')
+        ).group_by(Transaction.stock_code)
+
+    @staticmethod
+    def snapshot(transaction):
+        """记录交易修改或删除前影响持仓的字段，transaction 可以是模型对象或字典"""
+        get = transaction.get if isinstance(transaction, dict) else lambda key: getattr(transaction, key)
+        return {key: get(key) for key in ('stock_code', 'type', 'timestamp', 'quantity', 'amount', 'fee')}
+
+    @staticmethod
+    def _deltas(added, removed):
+        deltas = defaultdict(lambda: {'quantity': Decimal(0), 'cost': Decimal(0), 'trade_count': 0})
+        for sign, transactions in ((1, added), (-1, removed)):
+            for transaction in transactions:
+                row = PositionService.snapshot(transaction)
+                quantity, amount, fee = _decimal(row['quantity']), _decimal(row['amount']), _decimal(row['fee'])
+                if row['type'] == 'BUY':
+                    quantity_delta, cost_delta = quantity, amount + fee
+                elif row['type'] == 'SELL':
+                    quantity_delta, cost_delta = -quantity, -amount + fee
+                elif row['type'] == 'DIVIDEND':
+                    quantity_delta, cost_delta = Decimal(0), -amount
+                else:
+                    quantity_delta, cost_delta = Decimal(0), Decimal(0)
+
+                delta = deltas[row['stock_code']]
+                delta['quantity'] += sign * quantity_delta
+                delta['cost'] += sign * cost_delta
+                delta['trade_count'] += sign
+        return deltas
+
+    @staticmethod
+    def apply(added=(), removed=()):
+        """
+        按新增、删除的交易更新持仓，修改视为删除旧值并新增新值，不提交事务
+
+        调用前交易表的变更须已写入当前事务（flush），最近交易时间按交易表重新取最大值。
+
+        Args:
+            added (iterable): 新增的交易（模型对象或字典）
+            removed (iterable): 删除的交易，修改前通过 snapshot 保存
+        """
+        deltas = PositionService._deltas(added, removed)
+        if not deltas:
+            return
+        CostBasisService.mark_changed(deltas)
+        # 每日估值从最早受影响的交易日起失效，下次 update 时重新计算
+        trade_dates = [NavService.trade_date(PositionService.snapshot(t)['timestamp']) for t in (*added, *removed)]
+        NavService.invalidate_from(min(trade_dates))
+        table = Position.__table__
+        upsert(table, [{'stock_code': stock_code, **delta} for stock_code, delta in deltas.items()],
+               ['stock_code'], lambda new: {
+                   'quantity': table.c.quantity + new.quantity,
+                   'cost': table.c.cost + new.cost,
+                   'trade_count': table.c.trade_count + new.trade_count
+               })
+
+        stock_codes = list(deltas)
+        # 按 (stock_code, timestamp) 索引取各证券最近交易时间
+        latest = select(func.max(Transaction.timestamp)).where(
+            Transaction.stock_code == table.c.stock_code).scalar_subquery()
+        db.session.execute(update(table).where(table.c.stock_code.in_(stock_codes)).values(last_updated=latest))
+        db.session.execute(delete(table).where(table.c.stock_code.in_(stock_codes), table.c.trade_count <= 0))
+
+    @staticmethod
+    def get(stock_code):
+        return db.session.get(Position, stock_code)
+
+    @staticmethod
+    def rebuild():
+        """
+        按交易表全量重建持仓
+
+        Returns:
+            int: 持仓记录数
+        """
+        table = Position.__table__
+        try:
+            db.session.execute(delete(table))
+            db.session.execute(insert(table).from_select(
+                ['stock_code', 'quantity', 'cost', 'trade_count', 'last_updated'], PositionService.aggregate()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return db.session.execute(select(func.count()).select_from(table)).scalar()
+
+    @staticmethod
+    def check():
+        """
+        比对持仓表与交易表的实时汇总
+
+        Returns:
+            list: 不一致的证券 [{'stock_code', 'field', 'expected', 'actual'}]，一致时为空
+        """
+        expected = {row.stock_code: row for row in db.session.execute(PositionService.aggregate())}
+        actual = {row.stock_code: row for row in db.session.execute(select(Position.__table__))}
+
+        mismatches = []
+        for stock_code in sorted(set(expected) | set(actual)):
+            exp, act = expected.get(stock_code), actual.get(stock_code)
+            if exp is None or act is None:
+                mismatches.append({'stock_code': stock_code, 'field': 'row',
+                                   'expected': exp is not None, 'actual': act is not None})
+                continue
+            for field, places in (('quantity', 2), ('cost', 6), ('trade_count', 0)):
+                if round(_decimal(getattr(exp, field)), places) != round(_decimal(getattr(act, field)), places):
+                    mismatches.append({'stock_code': stock_code, 'field': field,
+                                       'expected': str(getattr(exp, field)), 'actual': str(getattr(act, field))})
+            if exp.last_updated != act.last_updated:
+                mismatches.append({'stock_code': stock_code, 'field': 'last_updated',
+                                   'expected': str(exp.last_updated), 'actual': str(act.last_updated)})
+        return mismatches
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# app/service/price_matrix_service.py
+import numpy as np
+from sqlalchemy import func, select
+
+from app.extentions import db
+from app.models import StockPrice
+
+
+def forward_fill(matrix, seed=None):
+    """
+    按列向下填充 NaN（停牌日沿用最近收盘价）
+
+    Args:
+        matrix (ndarray): 日期 × 证券
+        seed (ndarray, optional): 首行之前的最近值，用于填充开头的缺失
+    """
+    if seed is not None:
+        matrix = np.vstack([seed, matrix])
+    rows = np.arange(len(matrix))[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isnan(matrix), 0, rows), axis=0)
+    filled = matrix[last_valid, np.arange(matrix.shape[1])]
+    return filled[1:] if seed is not None else filled
+
+
+class PriceMatrixService:
+    """按交易日 × 证券对齐的收盘价矩阵"""
+
+    @staticmethod
+    def trading_dates(stock_codes, start=None, end=None):
+        """证券在区间内有行情的日期（并集），升序"""
+        stmt = select(StockPrice.date).where(StockPrice.stock_code.in_(stock_codes)).distinct().order_by(StockPrice.date)
+        if start is not None:
+            stmt = stmt.where(StockPrice.date >= start)
+        if end is not None:
+            stmt = stmt.where(StockPrice.date <= end)
+        return np.array(db.session.execute(stmt).scalars().all(), dtype='datetime64[D]')
+
+    @staticmethod
+    def seed_closes(stock_codes, before):
+        """各证券在 before 之前最近一个交易日的收盘价，无行情时为 NaN"""
+        latest = select(StockPrice.stock_code, func.max(StockPrice.date).label('date')).where(
+            StockPrice.stock_code.in_(stock_codes), StockPrice.date < before
+        ).group_by(StockPrice.stock_code).subquery()
+        rows = db.session.execute(
+            select(StockPrice.stock_code, StockPrice.close).join(
+                latest, (StockPrice.stock_code == latest.c.stock_code) & (StockPrice.date == latest.c.date))
+        ).all()
+        position = {code: i for i, code in enumerate(stock_codes)}
+        seed = np.full(len(stock_codes), np.nan)
+        for code, close in rows:
+            seed[position[code]] = float(close)
+        return seed
+
+    @staticmethod
+    def load(stock_codes, start=None, end=None, dates=None):
+        """
+        收盘价矩阵
+
+        Args:
+            stock_codes (list): 证券代码，决定矩阵列顺序
+            start, end (date, optional): 日期范围（包含两端）
+            dates (ndarray, optional): 指定的日期轴，默认为证券在区间内有行情的日期并集
+
+        Returns:
+            tuple: (日期轴 datetime64[D], 收盘价矩阵)，缺失值按最近收盘价填充，
+                   区间开始前从未有过行情的位置为 NaN
+        """
+        stock_codes = list(stock_codes)
+        if dates is None:
+            dates = PriceMatrixService.trading_dates(stock_codes, start, end)
+        matrix = np.full((len(dates), len(stock_codes)), np.nan)
+        if not len(dates) or not stock_codes:
+            return dates, matrix
+
+        rows = db.session.execute(
+            select(StockPrice.date, StockPrice.stock_code, StockPrice.close).where(
+                StockPrice.stock_code.in_(stock_codes),
+                StockPrice.date >= dates[0].item(), StockPrice.date <= dates[-1].item())
+        ).all()
+        if rows:
+            position = {code: i for i, code in enumerate(stock_codes)}
+            row_dates = np.array([row.date for row in rows], dtype='datetime64[D]')
+            row_index = np.searchsorted(dates, row_dates)
+            valid = (row_index < len(dates)) & (dates[np.minimum(row_index, len(dates) - 1)] == row_dates)
+            columns = np.array([position[row.stock_code] for row in rows])
+            closes = np.array([float(row.close) for row in rows])
+            matrix[row_index[valid], columns[valid]] = closes[valid]
+
+        seed = PriceMatrixService.seed_closes(stock_codes, dates[0].item())
+        return dates, forward_fill(matrix, seed)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# app/service/risk_service.py
+import threading
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.extentions import db
+from app.models import PortfolioDailyValue, Position, StockPrice
+from app.service.nav_service import NavService
+from app.service.price_matrix_service import PriceMatrixService
+
+TRADING_DAYS = 252
+
+
+def _returns(values):
+    """按列计算日收益率，前一日无值或为 0 时为 NaN"""
+    previous = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(previous > 0, values[1:] / previous - 1, np.nan)
+
+
+def _column(values):
+    return values if values.ndim == 2 else values[:, None]
+
+
+def metrics(values, benchmark=None, risk_free=0.0):
+    """
+    按列计算风险收益指标
+
+    Args:
+        values (ndarray): 日期 × 证券的价格（或净值）矩阵，一维时视为单列
+        benchmark (ndarray, optional): 与 values 对齐的基准指数收盘价
+        risk_free (float): 年化无风险利率
+
+    Returns:
+        dict: 指标名 -> 每列取值的数组（无法计算时为 NaN）
+            total_return       区间收益率
+            annualized_return  年化收益率
+            volatility         年化波动率
+            max_drawdown       最大回撤（负数）
+            sharpe, sortino    年化夏普、索提诺比率
+            beta               相对基准的贝塔
+    """
+    values = _column(np.asarray(values, dtype=float))
+    columns = values.shape[1]
+    result = {name: np.full(columns, np.nan) for name in
+              ('total_return', 'annualized_return', 'volatility', 'max_drawdown', 'sharpe', 'sortino', 'beta')}
+    if len(values) < 2:
+        return result
+
+    returns = _returns(values)
+    valid = ~np.isnan(returns)
+    observations = valid.sum(axis=0)
+    enough = observations >= 2
+    rf_daily = (1 + risk_free) ** (1 / TRADING_DAYS) - 1
+
+    # 区间首末有效值
+    has_value = ~np.isnan(values) & (values > 0)
+    first_index = np.argmax(has_value, axis=0)
+    last_index = len(values) - 1 - np.argmax(has_value[::-1], axis=0)
+    first = values[first_index, np.arange(columns)]
+    last = values[last_index, np.arange(columns)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.where(has_value.any(axis=0), last / first - 1, np.nan)
+        result['total_return'] = total
+        result['annualized_return'] = np.where(
+            observations > 0, (1 + total) ** (TRADING_DAYS / np.maximum(observations, 1)) - 1, np.nan)
+
+        # 最大回撤：相对历史最高点的最大跌幅，NaN 不参与最高点
+        peak = np.fmax.accumulate(np.where(has_value, values, np.nan), axis=0)
+        result['max_drawdown'] = np.where(has_value.any(axis=0), np.nanmin(values / peak - 1, axis=0), np.nan)
+
+        excess = np.where(valid, returns - rf_daily, np.nan)
+        mean_excess = np.nansum(excess, axis=0) / np.maximum(observations, 1)
+        std = np.sqrt(np.nansum((returns - np.nansum(returns, axis=0) / np.maximum(observations, 1)) ** 2, axis=0)
+                      / np.maximum(observations - 1, 1))
+        downside = np.sqrt(np.nansum(np.minimum(excess, 0) ** 2, axis=0) / np.maximum(observations, 1))
+        annualize = np.sqrt(TRADING_DAYS)
+        result['volatility'] = np.where(enough, std * annualize, np.nan)
+        result['sharpe'] = np.where(enough & (std > 0), mean_excess / std * annualize, np.nan)
+        result['sortino'] = np.where(enough & (downside > 0), mean_excess / downside * annualize, np.nan)
+
+        if benchmark is not None:
+            benchmark_returns = _returns(_column(np.asarray(benchmark, dtype=float)))
+            pair = valid & ~np.isnan(benchmark_returns)
+            count = pair.sum(axis=0)
+            x = np.where(pair, benchmark_returns, 0.0)
+            y = np.where(pair, returns, 0.0)
+            mean_x = x.sum(axis=0) / np.maximum(count, 1)
+            mean_y = y.sum(axis=0) / np.maximum(count, 1)
+            covariance = (np.where(pair, (x - mean_x) * (y - mean_y), 0.0)).sum(axis=0)
+            variance = (np.where(pair, (x - mean_x) ** 2, 0.0)).sum(axis=0)
+            result['beta'] = np.where((count >= 2) & (variance > 0), covariance / variance, np.nan)
+    return result
+
+
+def money_weighted_return(dates, flows):
+    """
+    资金加权收益率（年化内部收益率）
+
+    Args:
+        dates (ndarray): 现金流日期 datetime64[D]
+        flows (ndarray): 现金流，投入为负、取回（含期末市值）为正
+
+    Returns:
+        float: 年化收益率，现金流同号或无解时为 NaN
+    """
+    years = (dates - dates[0]).astype(float) / 365
+    if not (flows > 0).any() or not (flows < 0).any():
+        return np.nan
+
+    def npv(rate):
+        return np.sum(flows * (1 + rate) ** -years)
+
+    low, high = -0.9999, 1.0
+    while npv(high) > 0 and high < 1e6:
+        high *= 2
+    if np.sign(npv(low)) == np.sign(npv(high)):
+        return np.nan
+    # 二分法求根：NPV 随收益率单调递减（先投入后取回）
+    for _ in range(200):
+        middle = (low + high) / 2
+        if np.sign(npv(middle)) == np.sign(npv(low)):
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def _json(values):
+    return None if values is None or np.isnan(values) else round(float(values), 6)
+
+
+class RiskService:
+    """
+    组合与持仓证券的风险收益指标
+
+    证券指标按对齐并向下填充的收盘价矩阵逐列向量化计算；组合指标基于 portfolio_daily_value 的单位净值，
+    时间加权收益率取净值区间涨幅，资金加权收益率为期初市值、每日净投入与期末市值的内部收益率。
+    结果按 (区间, 截止日, 基准, 无风险利率) 缓存，键中包含截止日的净值和当前持仓，
+    交易变更或估值重算后自然失效。
+    """
+    MAX_CACHE = 256
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def latest_date():
+        return db.session.execute(select(func.max(StockPrice.date))).scalar()
+
+    @staticmethod
+    def _holdings():
+        return db.session.execute(
+            select(Position.stock_code, Position.quantity).where(Position.quantity > 0).order_by(Position.stock_code)
+        ).all()
+
+    @staticmethod
+    def _nav_token(start, end):
+        last = db.session.execute(
+            select(PortfolioDailyValue.date, PortfolioDailyValue.nav, PortfolioDailyValue.net_investment)
+            .where(PortfolioDailyValue.date <= end).order_by(PortfolioDailyValue.date.desc()).limit(1)
+        ).first()
+        count = db.session.execute(select(func.count()).select_from(PortfolioDailyValue).where(
+            PortfolioDailyValue.date >= start, PortfolioDailyValue.date <= end)).scalar()
+        return count, tuple(last) if last else None
+
+    @staticmethod
+    def get(start=None, end=None, benchmark='000300', risk_free=0.0):
+        """
+        计算区间 [start, end] 的风险收益指标，优先返回缓存
+
+        Args:
+            start (date, optional): 区间起始日，默认为截止日前一年
+            end (date, optional): 截止日，默认为最新行情日
+            benchmark (str): 计算贝塔的基准指数代码，须已在 stock_price 中
+            risk_free (float): 年化无风险利率
+        """
+        end = end or RiskService.latest_date()
+        if end is None:
+            return None
+        start = start or end - timedelta(days=365)
+        holdings = RiskService._holdings()
+        key = (start, end, benchmark, risk_free, tuple(map(tuple, holdings)), RiskService._nav_token(start, end))
+        with RiskService._lock:
+            if key in RiskService._cache:
+                return RiskService._cache[key]
+
+        result = {
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': end.strftime('%Y-%m-%d'),
+            'benchmark': benchmark,
+            'risk_free': risk_free,
+            'portfolio': RiskService.portfolio(start, end, benchmark, risk_free),
+            'securities': RiskService.securities(holdings, start, end, benchmark, risk_free),
+        }
+        with RiskService._lock:
+            if len(RiskService._cache) >= RiskService.MAX_CACHE:
+                RiskService._cache.clear()
+            RiskService._cache[key] = result
+        return result
+
+    @staticmethod
+    def securities(holdings, start, end, benchmark, risk_free):
+        """持仓证券的价格指标，weight 为截止日市值占比"""
+        if not holdings:
+            return []
+        stock_codes = [row.stock_code for row in holdings]
+        dates, closes = PriceMatrixService.load(stock_codes + [benchmark], start, end)
+        if not len(dates):
+            return []
+        values = metrics(closes[:, :-1], closes[:, -1], risk_free)
+
+        market_value = np.array([float(row.quantity) for row in holdings]) * np.nan_to_num(closes[-1, :-1])
+        total = market_value.sum()
+        weights = market_value / total if total > 0 else np.full(len(stock_codes), np.nan)
+        return [{
+            'stock_code': stock_code,
+            'weight': _json(weights[i]),
+            **{name: _json(column[i]) for name, column in values.items()}
+        } for i, stock_code in enumerate(stock_codes)]
+
+    @staticmethod
+    def portfolio(start, end, benchmark, risk_free):
+        """组合净值指标，以及时间加权与资金加权收益率"""
+        rows = NavService.range(start, end)
+        if not rows:
+            return None
+        dates = np.array([row.date for row in rows], dtype='datetime64[D]')
+        nav = np.array([float(row.nav) for row in rows])
+        _, benchmark_closes = PriceMatrixService.load([benchmark], dates=dates)
+        values = {name: _json(column[0]) for name, column in metrics(nav, benchmark_closes, risk_free).items()}
+
+        # 期初市值视为投入，之后每日净投入为投入（正数记为流出），期末市值视为取回
+        market_value = np.array([float(row.market_value) for row in rows])
+        flows = -np.array([float(row.daily_flow) for row in rows])
+        flows[0] = -market_value[0]
+        flows[-1] += market_value[-1]
+        days = (dates[-1] - dates[0]).astype(int)
+        twr = nav[-1] / nav[0] - 1 if nav[0] > 0 else np.nan
+        return {
+            **values,
+            'twr': _json(twr),
+            # 与资金加权收益率一致按自然日年化
+            'twr_annualized': _json((1 + twr) ** (365 / days) - 1 if days else np.nan),
+            'mwr': _json(money_weighted_return(dates, flows)),
+            'market_value': round(float(market_value[-1]), 2),
+            'net_investment': round(float(rows[-1].net_investment), 2),
+        }
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# app/service/transaction_service.py
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, insert, select
+
+from app.extentions import db
+from app.models import Cashflow, Transaction
+from app.service.cashflow_search_service import CashflowSearchService
+from app.service.position_service import PositionService
+from app.utils.utils import determine_cashflow_properties, generate_cashflow_id, calculate_cashflow_amount
+
+
+class TransactionService:
+    """证券交易记录写入"""
+    REQUIRED_FIELDS = ('stock_code', 'type', 'timestamp', 'price', 'quantity', 'amount', 'fee', 'payment_method')
+    NUMERIC_FIELDS = ('quantity', 'price', 'amount', 'fee')
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def to_decimal(value):
+        """
+        数值字段转换为 Decimal，接受数字和数字字符串
+
+        Raises:
+            ValueError: 非数值、布尔值或 NaN、Infinity
+        """
+        if isinstance(value, bool):
+            raise ValueError(value)
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise ValueError(value)
+        if not number.is_finite():
+            raise ValueError(value)
+        return number
+
+    @staticmethod
+    def validate(data):
+        """
+        校验单条交易并计算关联现金流的属性，数量、价格、金额、费用转换为 Decimal，
+        非数值作为该条记录的错误返回
+
+        Returns:
+            tuple: (交易字段、现金流字段组成的字典, None) 或 (None, 错误信息)
+        """
+        missing = [field for field in TransactionService.REQUIRED_FIELDS if data.get(field) is None]
+        if missing:
+            return None, {"error": f"缺少字段: {', '.join(missing)}"}
+
+        numbers, invalid = {}, []
+        for field in TransactionService.NUMERIC_FIELDS:
+            try:
+                numbers[field] = TransactionService.to_decimal(data[field])
+            except ValueError:
+                invalid.append(f'{field}={data[field]!r}')
+        if invalid:
+            return None, {"error": f"数值格式错误: {', '.join(invalid)}"}
+
+        cashflow_properties, error_response = determine_cashflow_properties(data)
+        if error_response:
+            return None, error_response
+
+        timestamp = data['timestamp']
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                return None, {"error": f"时间格式错误: {timestamp}"}
+
+        try:
+            cashflow_amount = calculate_cashflow_amount(data['type'], numbers['amount'], numbers['fee'])
+        except (TypeError, ValueError) as e:
+            return None, {"error": f"数值计算错误: {str(e)}"}
+
+        transaction = {
+            'stock_code': data['stock_code'],
+            'type': data['type'],
+            'timestamp': timestamp,
+            'quantity': numbers['quantity'],
+            'price': numbers['price'],
+            'fee': numbers['fee'],
+            'amount': numbers['amount']
+        }
+        cashflow = {
+            'cashflow_id': generate_cashflow_id(),
+            'type': cashflow_properties['cashflow_type'],
+            'category': "投资理财",
+            'time': timestamp,
+            'payment_method': data['payment_method'],
+            'counterparty': data['stock_code'],
+            'debit_credit': cashflow_properties['debit_credit'],
+            'amount': cashflow_amount,
+            'goods': f'股票代码:{data["stock_code"]},金额:{data["amount"]},价格:{data["price"]},'
+                     f'数量:{data["quantity"]},费用:{data["fee"]}'
+        }
+        return {'transaction': transaction, 'cashflow': cashflow}, None
+
+    @staticmethod
+    def bulk_create(data_list):
+        """
+        批量创建交易及关联的现金流
+
+        先逐条校验整批数据，校验失败的记录不写入；其余记录在一个事务中以多行 INSERT 写入，
+        并在同一事务内更新持仓，任一语句失败整批回滚。transaction_id 在锁定当前最大值后连续分配，
+        使交易与现金流可以在同一批语句中关联，无需逐条 flush 取回自增ID。
+
+        Args:
+            data_list (list): 交易字典列表，字段见 determine_cashflow_properties
+
+        Returns:
+            tuple: (创建的 transaction_id 列表, 校验失败记录的错误列表，含 index 为记录在批次中的位置)
+        """
+        valid, errors = [], []
+        for index, data in enumerate(data_list):
+            row, error_response = TransactionService.validate(data)
+            if error_response:
+                errors.append({"index": index, **error_response})
+                continue
+            valid.append(row)
+        if not valid:
+            return [], errors
+
+        try:
+            # 锁定当前最大ID，避免并发写入分配到相同的ID
+            last_id = db.session.execute(
+                select(func.max(Transaction.transaction_id)).with_for_update()
+            ).scalar() or 0
+
+            transactions, cashflows = [], []
+            for transaction_id, row in enumerate(valid, start=last_id + 1):
+                transactions.append({'transaction_id': transaction_id, **row['transaction']})
+                cashflows.append({'transaction_id': transaction_id, **row['cashflow']})
+
+            for i in range(0, len(valid), TransactionService.BATCH_SIZE):
+                db.session.execute(insert(Transaction.__table__), transactions[i:i + TransactionService.BATCH_SIZE])
+                db.session.execute(insert(Cashflow.__table__), cashflows[i:i + TransactionService.BATCH_SIZE])
+            # 多行 INSERT 不经过 ORM flush 事件，显式写入搜索索引
+            CashflowSearchService.index_records(cashflows)
+            PositionService.apply(added=transactions)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return [transaction['transaction_id'] for transaction in transactions], errors
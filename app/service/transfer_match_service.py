@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# app/service/transfer_match_service.py
+import uuid
+from collections import defaultdict, deque
+from datetime import timedelta
+from itertools import groupby
+
+from sqlalchemy import bindparam, select, update
+
+from app.extentions import db
+from app.models import AccountInfo, Cashflow
+
+
+class TransferMatchService:
+    """
+    自有账户之间转账的自动配对
+
+    导入的账单中，自有账户之间的转账表现为两条互不关联的记录（如银行卡支出、余额宝收入），
+    会在汇总中被重复计为收入和支出。配对规则：
+    - 两条记录的支付方式都在 account_info 中，且互不相同；
+    - 一收一支，金额相同（精确到分），时间相差不超过 TOLERANCE；
+    - 均未关联证券交易、未配对、未被取消过配对；
+    - 有转账的佐证：任一方的交易对方是另一方的账户，或任一方的类型、商品含转账关键词（TRANSFER_KEYWORDS）。
+    配对成功的两条记录写入相同的 transfer_id，汇总查询按 transfer_id 排除；
+    误配的记录可取消配对（unpair），之后不再参与自动配对。
+
+    候选记录按 (金额, 时间) 排序后逐组扫描。金额组内的待配对记录按时间顺序放入两类队列：
+    按 (收/支, 所在账户)，以及按 (收/支, 佐证指向的账户)，带关键词的记录指向所有其他账户。
+    新记录只需比较若干队列的队首：佐证指向本记录账户的队列，以及本记录佐证指向的账户队列。
+    过期和已配对的队首在比较时弹出，每条记录最多进出 K + 1 个队列（K 为自有账户数），
+    整体复杂度为 O(n log n + nK)。
+    """
+    TOLERANCE = timedelta(minutes=30)
+    BATCH_SIZE = 1000
+    TRANSFER_KEYWORDS = ('转账', '转入', '转出', '充值', '提现')
+
+    @staticmethod
+    def account_names():
+        return set(db.session.execute(select(AccountInfo.account_name)).scalars())
+
+    @staticmethod
+    def candidates(accounts, start=None, end=None):
+        """未配对的自有账户收支记录，start、end 为左闭右开时间范围"""
+        stmt = select(Cashflow.cashflow_id, Cashflow.time, Cashflow.debit_credit, Cashflow.amount,
+                      Cashflow.payment_method, Cashflow.counterparty, Cashflow.type, Cashflow.goods).where(
+            Cashflow.transfer_id.is_(None),
+            Cashflow.transfer_excluded.is_(False),
+            Cashflow.transaction_id.is_(None),
+            Cashflow.debit_credit.in_(('收入', '支出')),
+            Cashflow.payment_method.in_(accounts)
+        )
+        if start is not None:
+            stmt = stmt.where(Cashflow.time >= start)
+        if end is not None:
+            stmt = stmt.where(Cashflow.time < end)
+        return db.session.execute(stmt).all()
+
+    @staticmethod
+    def is_tagged(row):
+        """类型或商品中含转账关键词"""
+        text = f'{row.type or ""} {row.goods or ""}'
+        return any(keyword in text for keyword in TransferMatchService.TRANSFER_KEYWORDS)
+
+    @staticmethod
+    def evidence_accounts(row, accounts):
+        """该记录的佐证所指向的其他自有账户"""
+        if TransferMatchService.is_tagged(row):
+            return accounts - {row.payment_method}
+        if row.counterparty in accounts and row.counterparty != row.payment_method:
+            return {row.counterparty}
+        return set()
+
+    @staticmethod
+    def pair(rows, tolerance=None, accounts=None):
+        """
+        在候选记录中查找转账对
+
+        Args:
+            rows (list): 包含 cashflow_id、time、debit_credit、amount、payment_method、
+                counterparty、type、goods 的行
+            tolerance (timedelta, optional): 两条记录的最大时间差，默认为 TOLERANCE
+            accounts (set, optional): 自有账户名称，默认为候选记录中出现的支付方式
+
+        Returns:
+            list: [(支出记录ID, 收入记录ID)]
+        """
+        tolerance = tolerance or TransferMatchService.TOLERANCE
+        if accounts is None:
+            accounts = {row.payment_method for row in rows}
+        rows = sorted(rows, key=lambda row: (round(row.amount * 100), row.time, row.cashflow_id))
+
+        pairs = []
+        for _, group in groupby(rows, key=lambda row: round(row.amount * 100)):
+            by_account = defaultdict(deque)  # (收/支, 所在账户) -> 待配对记录
+            by_evidence = defaultdict(deque)  # (收/支, 佐证指向的账户) -> 待配对记录
+            matched = set()
+            for row in group:
+                opposite = '支出' if row.debit_credit == '收入' else '收入'
+                targets = TransferMatchService.evidence_accounts(row, accounts)
+                queues = [by_evidence[(opposite, row.payment_method)]]
+                queues.extend(by_account[(opposite, account)] for account in targets)
+
+                match = None
+                for queue in queues:
+                    # 弹出已配对和超出时间窗口的队首，之后的记录时间更晚，同样不会再用到
+                    while queue and (queue[0].cashflow_id in matched or row.time - queue[0].time > tolerance):
+                        queue.popleft()
+                    if queue and (match is None or (queue[0].time, queue[0].cashflow_id) <
+                                  (match.time, match.cashflow_id)):
+                        match = queue[0]
+
+                if match is None:
+                    by_account[(row.debit_credit, row.payment_method)].append(row)
+                    for account in targets:
+                        by_evidence[(row.debit_credit, account)].append(row)
+                    continue
+                matched.add(match.cashflow_id)
+                pairs.append((match.cashflow_id, row.cashflow_id) if row.debit_credit == '收入'
+                             else (row.cashflow_id, match.cashflow_id))
+        return pairs
+
+    @staticmethod
+    def stamp(pairs):
+        """为每对记录写入新的 transfer_id，不提交事务"""
+        params = []
+        for out_id, in_id in pairs:
+            transfer_id = uuid.uuid4().hex
+            params.append({'b_cashflow_id': out_id, 'b_transfer_id': transfer_id})
+            params.append({'b_cashflow_id': in_id, 'b_transfer_id': transfer_id})
+
+        table = Cashflow.__table__
+        stmt = update(table).where(
+            table.c.cashflow_id == bindparam('b_cashflow_id'),
+            table.c.transfer_id.is_(None)
+        ).values(transfer_id=bindparam('b_transfer_id'))
+        for i in range(0, len(params), TransferMatchService.BATCH_SIZE):
+            db.session.execute(stmt, params[i:i + TransferMatchService.BATCH_SIZE])
+
+    @staticmethod
+    def match(start=None, end=None, tolerance=None):
+        """
+        配对时间范围内未配对的转账记录并提交
+
+        导入后按新记录的时间范围增量配对，范围两端各扩展一个时间容差，
+        以便与已有记录配对；不指定范围时扫描全部历史记录。
+
+        Args:
+            start (datetime, optional): 起始时间
+            end (datetime, optional): 结束时间（包含）
+            tolerance (timedelta, optional): 最大时间差，默认为 TOLERANCE
+
+        Returns:
+            int: 新配对的转账数
+        """
+        tolerance = tolerance or TransferMatchService.TOLERANCE
+        accounts = TransferMatchService.account_names()
+        if not accounts:
+            return 0
+
+        rows = TransferMatchService.candidates(
+            accounts,
+            start - tolerance if start is not None else None,
+            end + tolerance + timedelta(microseconds=1) if end is not None else None
+        )
+        pairs = TransferMatchService.pair(rows, tolerance, accounts)
+        try:
+            TransferMatchService.stamp(pairs)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(pairs)
+
+    @staticmethod
+    def match_records(records, tolerance=None):
+        """按新导入记录（字典列表）的时间范围增量配对"""
+        times = [record['time'] for record in records if record.get('time') is not None]
+        if not times:
+            return 0
+        return TransferMatchService.match(min(times), max(times), tolerance)
+
+    @staticmethod
+    def unpair(transfer_id):
+        """
+        取消一组转账配对并提交
+
+        两条记录的 transfer_id 清空，重新计入收支汇总，并标记为不再参与自动配对，
+        避免下次导入时被重新配对。
+
+        Args:
+            transfer_id (str): 转账ID
+
+        Returns:
+            int: 取消配对的记录数，0 表示转账ID不存在
+        """
+        stmt = update(Cashflow).where(Cashflow.transfer_id == transfer_id).values(
+            transfer_id=None, transfer_excluded=True)
+        try:
+            count = db.session.execute(stmt).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return count
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# app/utils/fetch_scheduler.py
+"""
+限速并发抓取
+
+有界线程池并发执行网络请求，每个上游数据源（akshare、stockapi.com.cn 等）各自一个令牌桶限速，
+失败按指数退避加随机抖动重试，并按任务记录尝试次数、耗时和结果。
+只负责网络请求，写库由调用方在主线程按完成顺序处理。
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多累积 capacity 个，每次请求消耗一个
+
+    Args:
+        rate (float): 每秒请求数
+        capacity (int, optional): 允许的突发请求数，默认为 1（请求间隔均匀）
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError(f'Invalid rate: {rate}')
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，令牌不足时阻塞到补充为止；返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """第 attempt 次重试前的等待时间：指数退避上限内取随机值（full jitter），避免多个任务同时重试"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class FetchTask:
+    """
+    抓取任务
+
+    Args:
+        key (str): 任务标识，如证券代码
+        upstream (str): 上游名称，决定使用的令牌桶
+        fetch (callable): 无参数的抓取函数，返回值作为结果
+    """
+
+    def __init__(self, key, upstream, fetch):
+        self.key = key
+        self.upstream = upstream
+        self.fetch = fetch
+
+
+class FetchResult:
+    """抓取结果：value 为抓取函数的返回值，error 为最后一次失败的原因，throttled 为限速等待的秒数"""
+
+    def __init__(self, key, upstream, value=None, error=None, attempts=0):
+        self.key = key
+        self.upstream = upstream
+        self.value = value
+        self.error = error
+        self.attempts = attempts
+        self.elapsed = 0.0
+        self.throttled = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'upstream': self.upstream,
+            'ok': self.ok,
+            'attempts': self.attempts,
+            'elapsed': round(self.elapsed, 3),
+            'throttled': round(self.throttled, 3),
+            'error': self.error
+        }
+
+
+class FetchMetrics:
+    """一次调度的统计：按任务的结果，以及按上游汇总的成功、失败、重试次数"""
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, result):
+        self.results.append(result)
+
+    def summary(self):
+        upstreams = defaultdict(lambda: {'success': 0, 'failure': 0, 'retries': 0, 'elapsed': 0.0})
+        for result in self.results:
+            item = upstreams[result.upstream]
+            item['success' if result.ok else 'failure'] += 1
+            item['retries'] += max(result.attempts - 1, 0)
+            item['elapsed'] += result.elapsed
+        return {
+            'total': len(self.results),
+            'success': sum(result.ok for result in self.results),
+            'failure': sum(not result.ok for result in self.results),
+            'upstreams': {name: {**item, 'elapsed': round(item['elapsed'], 3)} for name, item in upstreams.items()},
+            'failures': [result.to_dict() for result in self.results if not result.ok]
+        }
+
+
+class FetchScheduler:
+    """
+    有界线程池 + 按上游限速 + 重试的抓取调度
+
+    Args:
+        rates (dict): 上游名称 -> 每秒请求数，未列出的上游不限速
+        max_workers (int): 并发线程数
+        retries (int): 失败后的最大重试次数
+        backoff (float): 退避基准秒数
+        max_backoff (float): 单次退避上限秒数
+        retry_on (tuple): 需要重试的异常类型
+    """
+
+    def __init__(self, rates, max_workers=4, retries=3, backoff=1.0, max_backoff=30.0, retry_on=(Exception,)):
+        self.buckets = {upstream: TokenBucket(rate) for upstream, rate in rates.items()}
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+        self.metrics = FetchMetrics()
+
+    def _run(self, task):
+        result = FetchResult(task.key, task.upstream)
+        bucket = self.buckets.get(task.upstream)
+        started = time.monotonic()
+        while True:
+            result.attempts += 1
+            if bucket is not None:
+                result.throttled += bucket.acquire()
+            try:
+                result.value = task.fetch()
+                result.error = None
+                break
+            except self.retry_on as e:
+                result.error = f'{type(e).__name__}: {e}'
+                if result.attempts > self.retries:
+                    break
+                delay = backoff_delay(result.attempts, self.backoff, self.max_backoff)
+                logger.warning(f"抓取 {task.key} 第 {result.attempts} 次失败，{delay:.1f} 秒后重试: {result.error}")
+                time.sleep(delay)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def run(self, tasks):
+        """
+        并发执行任务，按完成顺序逐个返回 FetchResult
+
+        不在重试范围内的异常同样记为失败，不会中断其他任务。
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='price-fetch') as executor:
+            futures = {executor.submit(self._run, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = FetchResult(task.key, task.upstream, error=f'{type(e).__name__}: {e}', attempts=1)
+                self.metrics.add(result)
+                yield result
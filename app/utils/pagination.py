@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# app/utils/pagination.py
+import base64
+import json
+import threading
+import time as _time
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(sort_value, id_value):
+    """
+    生成不透明的分页游标，内容为最后一条记录的 (排序字段, 主键)
+
+    Returns:
+        str: URL 安全的 base64 字符串
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, id_value], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析分页游标
+
+    Returns:
+        tuple: (排序字段时间, 主键)，排序字段为空时时间为 None
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, id_value = json.loads(raw.decode('utf-8'))
+        return (datetime.fromisoformat(sort_value) if sort_value is not None else None), id_value
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, page_size=10, nullable=False):
+    """
+    按 (sort_column DESC, id_column DESC) 进行键集分页
+
+    游标之后的记录通过索引定位（sort < t OR (sort = t AND id < i)），
+    不使用 OFFSET，翻页耗时只与每页大小有关。
+    排序字段可为空时，空值记录排在最后（与 MySQL、SQLite 的降序规则一致）。
+
+    Args:
+        query: 已应用过滤条件的查询
+        sort_column: 排序字段，例如 Cashflow.time
+        id_column: 主键字段，用于排序字段相同时确定顺序
+        cursor (str, optional): 上一页返回的 next_cursor，为空时返回第一页
+        page_size (int): 每页条数
+        nullable (bool): 排序字段是否可为空
+
+    Returns:
+        tuple: (当前页记录列表, 下一页游标，没有更多记录时为 None)
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor)
+        if sort_value is None:
+            condition = and_(sort_column.is_(None), id_column < id_value)
+        else:
+            condition = or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < id_value))
+            if nullable:
+                condition = or_(condition, sort_column.is_(None))
+        query = query.filter(condition)
+
+    # 多取一条判断是否还有下一页
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+class CountCache:
+    """
+    列表总数缓存
+
+    相同过滤条件的 COUNT 结果在 ttl 秒内复用，游标翻页时不必每次全表计数；
+    数据变更后总数最多延迟 ttl 秒更新。
+    """
+
+    def __init__(self, ttl=60, max_size=256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, query):
+        """返回缓存的总数，过期或不存在时执行 query.count()"""
+        now = _time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item and item[0] > now:
+                return item[1]
+
+        total = query.count()
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                # 先清理过期项，仍然超出时清空
+                self._items = {k: v for k, v in self._items.items() if v[0] > now}
+                if len(self._items) >= self.max_size:
+                    self._items.clear()
+            self._items[key] = (now + self.ttl, total)
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# app/utils/time_range.py
+"""
+时间范围过滤条件
+
+将月份、季度、年份、日期区间等参数统一转换为左闭右开区间 time >= start AND time < end，
+过滤条件直接作用于时间列，可以使用索引；避免 date_format(time, ...) = value 这类无法走索引的写法。
+"""
+import re
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_
+
+_YEAR = re.compile(r'^(\d{4})$')
+_QUARTER = re.compile(r'^(\d{4})-?[Qq]([1-4])$')
+_MONTH = re.compile(r'^(\d{4})-(\d{1,2})$')
+_DATE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+
+def year_range(year):
+    start = datetime(int(year), 1, 1)
+    return start, start + relativedelta(years=1)
+
+
+def quarter_range(year, quarter):
+    start = datetime(int(year), (int(quarter) - 1) * 3 + 1, 1)
+    return start, start + relativedelta(months=3)
+
+
+def month_range(value):
+    """
+    月份区间，value 为 YYYY-MM 或 YYYY-MM-DD（取所在月份，兼容 YYYY-MM-01 形式的月份参数）
+
+    Returns:
+        tuple: (月初, 下月初)
+
+    Raises:
+        ValueError: 格式错误
+    """
+    value = str(value).strip()
+    match = _MONTH.match(value) or _DATE.match(value)
+    if not match:
+        raise ValueError(f'Invalid month: {value}')
+    start = datetime(int(match.group(1)), int(match.group(2)), 1)
+    return start, start + relativedelta(months=1)
+
+
+def date_range(start_date=None, end_date=None):
+    """
+    日期区间，起止日期均包含在内，格式 YYYY-MM-DD；任一端为空时不限制
+
+    Returns:
+        tuple: (起始日 00:00, 结束日次日 00:00)
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+    return start, end
+
+
+def period_range(value):
+    """
+    按参数格式识别时间段：
+        YYYY        全年
+        YYYY-Qn     季度（也支持 YYYYQn）
+        YYYY-MM     整月
+        YYYY-MM-DD  单日
+
+    Returns:
+        tuple: (start, end)，左闭右开
+
+    Raises:
+        ValueError: 格式错误
+    """
+    value = str(value).strip()
+    if _YEAR.match(value):
+        return year_range(value)
+    match = _QUARTER.match(value)
+    if match:
+        return quarter_range(match.group(1), match.group(2))
+    if _MONTH.match(value):
+        return month_range(value)
+    if _DATE.match(value):
+        return date_range(value, value)
+    raise ValueError(f'Invalid period: {value}')
+
+
+def time_range_filter(column, start=None, end=None):
+    """
+    生成左闭右开的时间过滤条件 column >= start AND column < end，任一端为 None 时不限制
+
+    Returns:
+        ColumnElement: 可直接传给 query.filter()
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return and_(True, *conditions)
+
+
+def period_filter(column, value):
+    """按 period_range 支持的时间段参数生成过滤条件"""
+    return time_range_filter(column, *period_range(value))
+
+
+def month_filter(column, value):
+    """按月份参数（YYYY-MM 或 YYYY-MM-01）生成过滤条件"""
+    return time_range_filter(column, *month_range(value))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# app/utils/upsert.py
+"""按主键/唯一键插入或更新（MySQL ON DUPLICATE KEY UPDATE，SQLite、PostgreSQL ON CONFLICT DO UPDATE）"""
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.extentions import db
+
+
+def upsert(table, rows, index_elements, update):
+    """
+    批量插入，键冲突时按 update 更新已有行，不提交事务
+
+    Args:
+        table (Table): 目标表
+        rows (list): 待插入的字典列表
+        index_elements (list): 冲突判断的主键或唯一键列名（MySQL 按表上的全部唯一键判断）
+        update (callable): update(new) 返回 {列名: 表达式}，new 为待插入值的列集合，
+            例如 lambda new: {'quantity': table.c.quantity + new.quantity}
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update(**update(stmt.inserted))
+    else:
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=update(stmt.excluded))
+    db.session.execute(stmt, rows)
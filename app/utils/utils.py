@@ -9,6 +9,7 @@ __status__ = "Development"
 __description__ = "A simple web application to analyze bank transactions"
 
 import decimal
+import hashlib
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from shortuuid import uuid
@@ -32,6 +33,22 @@ def generate_cashflow_id():
     return uuid()
 
 
+def generate_cashflow_fingerprint(time, debit_credit, amount, payment_method):
+    """
+    生成现金流去重指纹
+    由精确到分钟的交易时间、收/支、金额（保留两位小数）和支付方式组成
+    """
+    if isinstance(time, str):
+        time = datetime.strptime(time, '%Y-%m-%d %H:%M:%S')
+    key = '|'.join([
+        time.strftime('%Y-%m-%d %H:%M'),
+        debit_credit or '',
+        f'{float(amount):.2f}',
+        payment_method or '',
+    ])
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
 def calculate_amount_quantity(data: dict, price: float, adjusted_fee: float) -> tuple:
     if data.get('amount'):
         amount = round(data['amount'], 2)
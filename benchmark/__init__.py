@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# 账单解析性能基准：合成账单生成器与基准测试脚本
+from .bill_generator import generate_alipay_bill, generate_weixin_bill, generate_bill
+
+__all__ = ['generate_alipay_bill', 'generate_weixin_bill', 'generate_bill']
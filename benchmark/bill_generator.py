@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+# benchmark/bill_generator.py
+"""
+合成账单生成器
+
+按真实导出格式生成支付宝（GBK，表头位于第 22 行）与微信（UTF-8 BOM，表头位于第 16 行）的
+CSV / XLSX 账单，表头汇总信息按生成的明细计算，保证 check_balance 校验通过。
+
+用法：python -m benchmark.bill_generator <alipay|weixin> <行数> <csv|xlsx> [输出目录] [随机种子]
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# XLSX 单个工作表的最大行数
+XLSX_MAX_ROWS = 1048576
+
+# 交易对方与商品说明，部分取值可命中 parser/category_rules.csv 中的规则
+COUNTERPARTIES = (
+    '拼多多平台商户', '抖音电商商家', '美团', '饿了么', '滴滴出行', '中国石化加油站', '停车场管理',
+    '中国铁路12306', '中国联通', '星巴克', '麦当劳', '盒马鲜生', '永辉超市', '顺丰快递', '京东商城',
+    '华润万家', '肯德基', '优衣库', '串串鑫油炸社', '社区便利店',
+)
+GOODS = (
+    '先用后付', '外卖订单', '快车行程', '92号汽油', '临时停车费', '火车票', '话费充值', '咖啡',
+    '汉堡套餐', '生鲜果蔬', '日用百货', '快递费', '服装', '二维码收款', '商品订单',
+)
+INCOME_COUNTERPARTIES = ('公司工资', '闲鱼买家', '红包', '好友转账')
+
+ALIPAY_PAYMENT_METHODS = (
+    '余额宝', '花呗', '光大银行信用卡(5851)', '民生银行储蓄卡(4827)',
+    '光大银行信用卡(5851)&红包', '招商银行储蓄卡(1234)&实体店多次立减券',
+)
+ALIPAY_CATEGORIES = ('餐饮美食', '日用百货', '交通出行', '充值缴费', '服饰装扮', '投资理财', '转账红包')
+
+WEIXIN_PAYMENT_METHODS = ('零钱', '民生银行储蓄卡(4827)', '光大银行信用卡(5851)', '零钱通')
+WEIXIN_TYPES = ('商户消费', '扫二维码付款', '转账', '微信红包', '其他')
+
+ALIPAY_COLUMNS = ('交易时间', '交易分类', '交易对方', '对方账号', '商品说明', '收/支', '金额', '收/付款方式',
+                  '交易状态', '交易订单号', '商家订单号', '备注', '')
+WEIXIN_COLUMNS = ('交易时间', '交易类型', '交易对方', '商品', '收/支', '金额(元)', '支付方式', '当前状态',
+                  '交易单号', '商户单号', '备注')
+
+ALIPAY_NOTES = (
+    '1.本回单内容可表明支付宝受理了相应支付交易申请，因系统原因或通讯故障等偶发因素导致本回单与实际交易结果不符时，以实际交易情况为准；',
+    '2.请勿将本回单作为收款方发货的凭据使用，请查证账户实际到账情况后再进行发货操作；',
+    '3.支付宝快捷支付等非余额支付方式可能既产生支付宝交易也同步产生银行交易，因此请勿使用本回单进行重复记账；',
+    '4.本回单如经任何涂改、编造，均立即失去效力；',
+    '5.部分账单如：充值提现、账户转存或者个人设置收支等不计入为收入或者支出，记为不计收支类；',
+    '6.因统计逻辑不同，明细金额直接累加后，可能会和下方统计金额不一致，请以实际交易金额为准；',
+    '7.禁止将本回单用于非法用途；',
+    '8.本明细仅展示当前账单中的交易，不包括已删除的记录；',
+    '9.本明细仅供个人对账使用。',
+)
+
+
+class _Totals:
+    """按笔数和分累计的收支汇总，避免浮点误差"""
+
+    def __init__(self):
+        self.counts = {}
+        self.cents = {}
+
+    def add(self, debit_credit, cents):
+        self.counts[debit_credit] = self.counts.get(debit_credit, 0) + 1
+        self.cents[debit_credit] = self.cents.get(debit_credit, 0) + cents
+
+    def line(self, label):
+        cents = self.cents.get(label, 0)
+        return f'{label}：{self.counts.get(label, 0)}笔 {cents // 100}.{cents % 100:02d}元'
+
+    def amount(self, label):
+        return round(self.cents.get(label, 0) / 100, 2)
+
+
+def _yuan(cents):
+    return f'{cents // 100}.{cents % 100:02d}'
+
+
+def _timeline(rng, rows, end):
+    """生成按时间倒序排列的交易时间，与真实账单一致"""
+    current = end
+    for _ in range(rows):
+        current -= timedelta(seconds=rng.randint(1, 600))
+        yield current
+
+
+def _alipay_rows(rng, rows, end, totals):
+    for i, time in enumerate(_timeline(rng, rows, end)):
+        roll = rng.random()
+        if roll < 0.75:
+            debit_credit, status = '支出', '交易成功'
+            counterparty, goods = rng.choice(COUNTERPARTIES), rng.choice(GOODS)
+            payment_method = rng.choice(ALIPAY_PAYMENT_METHODS)
+            cents = rng.randint(100, 50000)
+        elif roll < 0.85:
+            debit_credit, status = '收入', '交易成功'
+            counterparty, goods = rng.choice(INCOME_COUNTERPARTIES), '收款'
+            # 收入的收款方式可能为空，解析时记为余额宝
+            payment_method = '' if rng.random() < 0.5 else '余额宝'
+            cents = rng.randint(100, 500000)
+        else:
+            # 不计收支、交易关闭的记录会被解析器过滤
+            debit_credit = '不计收支'
+            status = '交易成功' if roll < 0.97 else '交易关闭'
+            counterparty, goods = '多基金_国泰', '余额宝-收益发放'
+            payment_method = '余额宝'
+            cents = rng.randint(1, 1000)
+
+        if status == '交易成功':
+            totals.add(debit_credit, cents)
+        yield (
+            time.strftime('%Y-%m-%d %H:%M:%S'), rng.choice(ALIPAY_CATEGORIES), counterparty, '/', goods,
+            debit_credit, _yuan(cents), payment_method, status,
+            f'{time:%Y%m%d}22001444{i:012d}\t', f'M{i:020d}\t', '', '',
+        )
+
+
+def _weixin_rows(rng, rows, end, totals):
+    for i, time in enumerate(_timeline(rng, rows, end)):
+        roll = rng.random()
+        if roll < 0.8:
+            debit_credit, status = '支出', '支付成功'
+            trade_type = rng.choice(WEIXIN_TYPES[:2])
+            counterparty, goods = rng.choice(COUNTERPARTIES), rng.choice(GOODS)
+            payment_method = rng.choice(WEIXIN_PAYMENT_METHODS)
+            cents = rng.randint(100, 50000)
+        elif roll < 0.95:
+            debit_credit = '收入'
+            trade_type = rng.choice(WEIXIN_TYPES[2:])
+            counterparty, goods = rng.choice(INCOME_COUNTERPARTIES), '/'
+            # 存入零钱的收入支付方式为 /，解析时记为零钱
+            status = '已存入零钱' if rng.random() < 0.5 else '已到账'
+            payment_method = '/'
+            cents = rng.randint(100, 500000)
+        else:
+            debit_credit, status = '/', '支付成功'
+            trade_type = '零钱通存取'
+            counterparty, goods = '零钱通', '转入零钱通'
+            payment_method = '零钱'
+            cents = rng.randint(100, 100000)
+
+        totals.add(debit_credit, cents)
+        yield (
+            time.strftime('%Y-%m-%d %H:%M:%S'), trade_type, counterparty, goods, debit_credit, f'¥{_yuan(cents)}',
+            payment_method, status, f'4200002{i:021d}\t', f'{i:032d}\t', '/',
+        )
+
+
+def _alipay_header(rows, start, end, totals):
+    """支付宝账单表头之前的说明行，空行仅出现在 CSV 中（pandas 读取时跳过）"""
+    return [
+        '-' * 84,
+        '导出信息：',
+        '姓名：测试用户',
+        '支付宝账户：bench@example.com',
+        f'起始时间：[{start:%Y-%m-%d %H:%M:%S}]    终止时间：[{end:%Y-%m-%d %H:%M:%S}]',
+        '导出交易类型：[全部]',
+        f'导出时间：[{end:%Y-%m-%d %H:%M:%S}]',
+        f'共{rows}笔记录',
+        totals.line('收入'),
+        totals.line('支出'),
+        totals.line('不计收支'),
+        '',
+        '特别提示：',
+        *ALIPAY_NOTES,
+        '',
+        '-' * 24 + '支付宝（中国）网络技术有限公司  电子客户回单' + '-' * 24,
+    ]
+
+
+def _weixin_header(rows, start, end, totals):
+    """微信账单表头之前的说明行，逗号占位行计入表头行号"""
+    neutral = totals.cents.get('/', 0)
+    return [
+        '微信支付账单明细',
+        '微信昵称：[测试用户]',
+        f'起始时间：[{start:%Y-%m-%d %H:%M:%S}] 终止时间：[{end:%Y-%m-%d %H:%M:%S}]',
+        '导出类型：[全部]',
+        f'导出时间：[{end:%Y-%m-%d %H:%M:%S}]',
+        None,
+        f'共{rows}笔记录',
+        totals.line('收入'),
+        totals.line('支出'),
+        f"中性交易：{totals.counts.get('/', 0)}笔 {_yuan(neutral)}元",
+        '注：',
+        '1. 充值/提现/理财通购买/零钱通存取/信用卡还款等交易，将计入中性交易',
+        '2. 本明细仅展示当前账单中的交易，不包括已删除的记录',
+        '3. 本明细仅供个人对账使用',
+        None,
+        '-' * 22 + '微信支付账单明细列表' + '-' * 20,
+    ]
+
+
+def _csv_field(value):
+    value = str(value)
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _write_csv(path, encoding, header_lines, columns, rows, padding=''):
+    # 汇总信息依赖全部明细，先写明细到临时文件，再拼接表头
+    body_path = path + '.body'
+    with open(body_path, 'w', encoding=encoding, newline='') as body:
+        body.write(','.join(columns) + '\n')
+        for row in rows:
+            body.write(','.join(_csv_field(value) for value in row) + '\n')
+
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        for line in header_lines():
+            f.write((padding if line is None else line + (padding if line else '')) + '\n')
+        with open(body_path, 'r', encoding=encoding, newline='') as body:
+            while True:
+                chunk = body.read(1 << 20)
+                if not chunk:
+                    break
+                f.write(chunk)
+    os.remove(body_path)
+
+
+def _write_xlsx(path, header_lines, columns, rows):
+    from openpyxl import Workbook
+
+    rows = list(rows)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for line in header_lines():
+        if line == '':
+            continue
+        sheet.append([] if line is None else [line])
+    sheet.append(list(columns))
+    for row in rows:
+        sheet.append([value.strip() if isinstance(value, str) else value for value in row])
+    workbook.save(path)
+
+
+def _generate(path, rows, seed, end, row_factory, header_factory, columns, encoding, padding=''):
+    if rows <= 0:
+        raise ValueError('行数必须为正整数')
+    is_xlsx = str(path).lower().endswith('.xlsx')
+    if is_xlsx and rows + 30 > XLSX_MAX_ROWS:
+        raise ValueError(f'XLSX 账单最多支持 {XLSX_MAX_ROWS - 30} 行明细，请改用 CSV')
+
+    rng = random.Random(seed)
+    end = end or datetime(2024, 12, 31, 23, 59, 59)
+    totals = _Totals()
+    earliest = []
+
+    def tracked_rows():
+        # 明细按时间倒序，最后一行即起始时间
+        for row in row_factory(rng, rows, end, totals):
+            earliest[:] = [row[0]]
+            yield row
+
+    def header_lines():
+        start = datetime.strptime(earliest[0], '%Y-%m-%d %H:%M:%S').replace(hour=0, minute=0, second=0)
+        return header_factory(rows, start, end, totals)
+
+    if is_xlsx:
+        _write_xlsx(path, header_lines, columns, tracked_rows())
+    else:
+        _write_csv(path, encoding, header_lines, columns, tracked_rows(), padding)
+
+    return {
+        'path': path,
+        'rows': rows,
+        'incomes': totals.amount('收入'),
+        'expenditures': totals.amount('支出'),
+    }
+
+
+def generate_alipay_bill(path, rows, seed=0, end=None):
+    """
+    生成支付宝账单，格式按文件扩展名（.csv / .xlsx）决定
+
+    Args:
+        path (str): 输出文件路径
+        rows (int): 明细行数
+        seed (int): 随机种子，相同参数生成相同内容
+        end (datetime, optional): 最后一笔交易的时间上限
+
+    Returns:
+        dict: 文件路径、行数及表头中的收入、支出合计
+    """
+    return _generate(path, rows, seed, end, _alipay_rows, _alipay_header, ALIPAY_COLUMNS, 'gbk')
+
+
+def generate_weixin_bill(path, rows, seed=0, end=None):
+    """生成微信账单，参数与返回值同 generate_alipay_bill"""
+    return _generate(path, rows, seed, end, _weixin_rows, _weixin_header, WEIXIN_COLUMNS, 'utf-8-sig',
+                     padding=',' * 8)
+
+
+GENERATORS = {
+    'alipay': (generate_alipay_bill, 'alipay_record_bench_{rows}.{fmt}'),
+    'weixin': (generate_weixin_bill, '微信支付账单(bench_{rows}).{fmt}'),
+}
+
+
+def generate_bill(kind, directory, rows, fmt='csv', seed=0, overwrite=False):
+    """
+    在目录中生成指定类型、行数与格式的账单，文件名与真实导出一致以便处理器识别
+
+    Args:
+        kind (str): 'alipay' 或 'weixin'
+        directory (str): 输出目录
+        rows (int): 明细行数
+        fmt (str): 'csv' 或 'xlsx'
+        seed (int): 随机种子
+        overwrite (bool): 文件已存在时是否重新生成，默认复用
+
+    Returns:
+        str: 账单文件路径
+    """
+    if kind not in GENERATORS:
+        raise ValueError(f'不支持的账单类型: {kind}')
+    if fmt not in ('csv', 'xlsx'):
+        raise ValueError(f'不支持的文件格式: {fmt}')
+
+    generator, pattern = GENERATORS[kind]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, pattern.format(rows=rows, fmt=fmt))
+    if overwrite or not os.path.exists(path):
+        generator(path, rows, seed)
+    return path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print('Usage: python -m benchmark.bill_generator <alipay|weixin> <rows> <csv|xlsx> [directory] [seed]')
+        sys.exit(1)
+
+    output = generate_bill(
+        sys.argv[1], sys.argv[4] if len(sys.argv) > 4 else '.', int(sys.argv[2]), sys.argv[3],
+        seed=int(sys.argv[5]) if len(sys.argv) > 5 else 0, overwrite=True
+    )
+    print(output)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# benchmark/parser_benchmark.py
+"""
+账单解析性能基准
+
+对合成账单分别测量 AlipayProcessor.df、WeixinProcessor.df、流式解析 iter_batches 与
+ImportService.import_cashflow 的吞吐（行/秒）和峰值内存，结果可保存为 JSON，并与基线比较以发现性能回退。
+
+用法：
+    python -m benchmark.parser_benchmark --sizes 10000 100000 --formats csv xlsx
+    python -m benchmark.parser_benchmark --output result.json
+    python -m benchmark.parser_benchmark --baseline result.json --tolerance 0.2
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.service.import_service import ImportService
+from benchmark.bill_generator import XLSX_MAX_ROWS, generate_bill
+from parser import AlipayProcessor, WeixinProcessor
+
+PROCESSORS = {
+    'alipay': AlipayProcessor,
+    'weixin': WeixinProcessor,
+}
+
+
+def _processor_df(kind, path):
+    df = PROCESSORS[kind](path).df
+    if df is None:
+        raise ValueError(f'Balance check failed: {path}')
+    return len(df)
+
+
+def _processor_stream(kind, path):
+    return sum(len(df) for df in PROCESSORS[kind](path).iter_batches())
+
+
+def _import_cashflow(kind, path):
+    records = ImportService.import_cashflow(path)
+    if not isinstance(records, list):
+        raise ValueError(f'Import failed: {records}')
+    return len(records)
+
+
+TARGETS = {
+    'processor': _processor_df,
+    'stream': _processor_stream,
+    'import_cashflow': _import_cashflow,
+}
+
+
+def measure(target, kind, path, repeat=1):
+    """
+    测量单个用例，耗时取多次运行的最小值，峰值内存单独运行一次并通过 tracemalloc 统计
+
+    Returns:
+        dict: rows（解析输出行数）、seconds、peak_mb
+    """
+    func = TARGETS[target]
+    seconds = None
+    rows = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = func(kind, path)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    # tracemalloc 会拖慢运行，不参与计时
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(kind, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'rows': rows, 'seconds': round(seconds, 4), 'peak_mb': round(peak / 1024 / 1024, 2)}
+
+
+def run(sizes, kinds, formats, targets, data_dir, repeat=1):
+    """
+    生成（或复用）合成账单并逐个测量
+
+    Returns:
+        list[dict]: 每个用例的测量结果，rows_per_sec 按账单明细行数计算
+    """
+    results = []
+    for kind in kinds:
+        for fmt in formats:
+            for size in sizes:
+                if fmt == 'xlsx' and size + 30 > XLSX_MAX_ROWS:
+                    print(f'skip {kind}/{fmt}/{size}: exceeds XLSX row limit', file=sys.stderr)
+                    continue
+                path = generate_bill(kind, data_dir, size, fmt)
+                for target in targets:
+                    result = measure(target, kind, path, repeat)
+                    result.update({
+                        'case': f'{target}/{kind}/{fmt}/{size}',
+                        'size': size,
+                        'file_mb': round(os.path.getsize(path) / 1024 / 1024, 2),
+                        'rows_per_sec': round(size / result['seconds']) if result['seconds'] else 0,
+                    })
+                    results.append(result)
+                    print(_format_row(result), flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线结果比较，吞吐下降或峰值内存上升超过 tolerance 的用例视为回退
+
+    Returns:
+        list[str]: 回退说明
+    """
+    previous = {item['case']: item for item in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result['case'])
+        if base is None:
+            continue
+        if result['rows_per_sec'] < base['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['case']}: rows/sec {base['rows_per_sec']} -> {result['rows_per_sec']}")
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{result['case']}: peak MB {base['peak_mb']} -> {result['peak_mb']}")
+    return regressions
+
+
+def _format_row(result):
+    return (f"{result['case']:<40} {result['rows_per_sec']:>12,} rows/s "
+            f"{result['seconds']:>10.3f} s {result['peak_mb']:>10.2f} MB peak")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark bill parsers on synthetic bills')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='rows per bill, e.g. 10000 100000 1000000 5000000')
+    arg_parser.add_argument('--kinds', nargs='+', choices=sorted(PROCESSORS), default=sorted(PROCESSORS))
+    arg_parser.add_argument('--formats', nargs='+', choices=['csv', 'xlsx'], default=['csv'])
+    arg_parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    arg_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'accounts_bench_bills'),
+                            help='directory for generated bills, reused across runs')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, best is reported')
+    arg_parser.add_argument('--output', help='write results as JSON')
+    arg_parser.add_argument('--baseline', help='compare against a previous JSON result')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='allowed relative slowdown / memory growth against the baseline')
+    args = arg_parser.parse_args(argv)
+
+    results = run(args.sizes, args.kinds, args.formats, args.targets, args.data_dir, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
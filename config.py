@@ -15,3 +15,11 @@ class Config:
     MYSQL_DATABASE = "money_track"
 
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{MYSQL_USERNAME}:{urlquote(MYSQL_PASSWORD)}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+
+    # 后台导入任务线程数
+    IMPORT_WORKERS = 2
+
+    # 行情抓取：并发线程数、各上游每秒请求数、失败重试次数
+    PRICE_FETCH_WORKERS = 4
+    PRICE_FETCH_RATES = {'stockapi': 2, 'akshare': 1}
+    PRICE_FETCH_RETRIES = 3
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# 批量导入账单：python import_bills.py <目录或zip文件> [进程数]
+import json
+import sys
+
+from app import create_app
+from app.service.bulk_import_service import BulkImportService
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python import_bills.py <directory|archive.zip> [workers]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    app = create_app()
+    with app.app_context():
+        result = BulkImportService.import_path(path, max_workers=workers)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 全量配对自有账户之间的转账：python match_transfers.py [时间容差分钟数]
+# 取消误配的转账：python match_transfers.py unpair <转账ID>
+import json
+import sys
+from datetime import timedelta
+
+from app import create_app
+from app.service.transfer_match_service import TransferMatchService
+
+if __name__ == "__main__":
+    app = create_app()
+    if len(sys.argv) > 2 and sys.argv[1] == 'unpair':
+        with app.app_context():
+            unpaired = TransferMatchService.unpair(sys.argv[2])
+        print(json.dumps({'transfer_id': sys.argv[2], 'unpaired': unpaired}))
+        sys.exit(0 if unpaired else 1)
+
+    tolerance = timedelta(minutes=int(sys.argv[1])) if len(sys.argv) > 1 else None
+    with app.app_context():
+        matched = TransferMatchService.match(tolerance=tolerance)
+    print(json.dumps({'transfers_matched': matched}))
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# 数据库结构迁移：python migrate.py [upgrade [版本号] | status | verify [版本号|all] [小表行数上限]]
+# verify 默认任何全表扫描都视为失败，指定小表行数上限时放过行数不超过该值的表
+import json
+import sys
+
+from app import create_app
+from app.service.migration_service import MigrationService
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    version = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != 'all' else None
+    small_table_rows = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    if command not in ('upgrade', 'status', 'verify'):
+        print("Usage: python migrate.py [upgrade [version] | status | verify [version|all] [small_table_rows]]")
+        sys.exit(1)
+
+    # create_app 启动时已执行全部迁移；指定版本时只执行到该版本
+    app = create_app(migrate=False)
+    with app.app_context():
+        if command == 'upgrade':
+            print(json.dumps({'applied': MigrationService.upgrade(version)}))
+        elif command == 'status':
+            print(json.dumps(MigrationService.status(), ensure_ascii=False, indent=2))
+        else:
+            results = MigrationService.verify(version, small_table_rows)
+            for result in results:
+                state = 'ok' if result['ok'] else f"FULL SCAN {', '.join(result['full_scans'])}"
+                print(f"{result['version']:03d} {result['query']:<40} {state}")
+            sys.exit(0 if all(result['ok'] for result in results) else 1)
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 组合每日估值维护：python nav.py [update | rebuild [起始日期 YYYY-MM-DD]]
+import json
+import sys
+from datetime import datetime
+
+from app import create_app
+from app.service.nav_service import NavService
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'update'
+    if command not in ('update', 'rebuild'):
+        print("Usage: python nav.py [update | rebuild [YYYY-MM-DD]]")
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if command == 'rebuild':
+            start = datetime.strptime(sys.argv[2], '%Y-%m-%d').date() if len(sys.argv) > 2 else None
+            print(json.dumps({'days': NavService.rebuild(start)}))
+        else:
+            print(json.dumps({'days': NavService.update()}))
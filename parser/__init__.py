@@ -6,5 +6,11 @@ Processor模块初始化文件
 from .base import Processor
 from .weixin import WeixinProcessor
 from .alipay import AlipayProcessor
+from .bank import BankProcessor
+from .category_rules import CategoryRuleEngine
+from .registry import register_processor, detect_processor, get_processor
+from .worker import parse_bill, source_content
 
-__all__ = ['Processor', 'WeixinProcessor', 'AlipayProcessor']
+__all__ = ['Processor', 'WeixinProcessor', 'AlipayProcessor', 'BankProcessor', 'CategoryRuleEngine',
+           'register_processor', 'detect_processor', 'get_processor', 'parse_bill',
+           'source_content']
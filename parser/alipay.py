@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 from .base import Processor
+from .registry import register_processor
 
 
+@register_processor
 class AlipayProcessor(Processor):
     # 定义读取列索引
     COLUMNS = [0, 2, 4, 5, 6, 7, 8]
@@ -19,18 +21,20 @@ class AlipayProcessor(Processor):
         '交易状态': 'status',
     }
 
+    HEADER_ROW = 22
     DATA_SOURCE = '支付宝'
     FILE_ENCODING = 'gbk'
+    SIGNATURES = ('支付宝账户', '支付宝（中国）网络技术有限公司')
+    FILENAME_KEYWORDS = ('alipay_record', '支付宝')
 
-    def __init__(self, path):
-        super().__init__(path)
+    def __init__(self, path, content=None):
+        super().__init__(path, content)
 
     @property
     def balance(self):
         return super().balance
 
-    @property
-    def df(self):  # 获取支付宝数据
+    def _parse(self):  # 获取支付宝数据
         try:
             df = self._load_data()
         except FileNotFoundError:
@@ -40,6 +44,15 @@ class AlipayProcessor(Processor):
         except Exception as e:
             raise ValueError(f"读取文件失败: {e}")
 
+        df = self._transform(df)
+
+        # 最终验证
+        if self.check_balance(df):
+            return df
+        return None
+
+    def _transform(self, df):
+        """明细转换，整表解析与流式解析的每一批共用"""
         # 验证必要字段
         self._validate_required_columns(df)
 
@@ -53,16 +66,11 @@ class AlipayProcessor(Processor):
         df = self._filter_data(df)
 
         # 添加额外字段
-        df = self._add_additional_fields(df)
-
-        # 最终验证
-        if self.check_balance(df):
-            return df
-        return None
+        return self._add_additional_fields(df)
 
     def _load_data(self):
         """加载数据"""
-        if self.path.endswith('.xlsx'):
+        if self._is_xlsx():
             return self._read_xlsx()
         else:
             return self._read_csv()
@@ -83,7 +91,7 @@ class AlipayProcessor(Processor):
         df['counterparty'] = df['counterparty'].fillna('')
 
         # 多账户合并付款，以 & 分隔，需手工整理
-        df = df.apply(self._inference_payment_method, axis=1)
+        df['payment_method'] = self._inference_payment_method(df)
 
         return df
 
@@ -91,39 +99,30 @@ class AlipayProcessor(Processor):
     def _filter_data(df):
         """过滤数据"""
         return df[(df['status'].isin(['交易成功', '支付成功'])) &
-                  (df['debit_credit'].isin(['收入', '支出']))]
+                  (df['debit_credit'].isin(['收入', '支出']))].copy()
 
     def _add_additional_fields(self, df):
         """添加额外字段"""
         # 增加字段：类型 type，类别 category、来源 source
         df.insert(1, 'type', "商户消费")
-        df["category"] = df.apply(self.inference_category, axis=1)
+        df["category"] = self.inference_categories(df)
         df["source"] = self.DATA_SOURCE
         return df
 
-    def _read_csv(self):
-        """读取支付宝CSV格式账单"""
-        return pd.read_csv(
-            self.path, header=22, usecols=self.COLUMNS,
-            encoding=self.FILE_ENCODING
-        )
-
     def _read_xlsx(self):
         """读取支付宝XLSX格式账单"""
-        return pd.read_excel(
-            self.path, header=22, usecols=self.COLUMNS
-        )
+        return self._frame_from_xlsx(header=self.HEADER_ROW, usecols=self.COLUMNS)
 
-    @staticmethod
-    def _inference_payment_method(row):
+    @classmethod
+    def _inference_payment_method(cls, df):
         """
         多账户合并付款，以 & 分隔，需手工整理
         去掉支付宝的支付方式后缀，整理格式例如：'光大银行信用卡(5851)'
-        :return: str
+        收入且支付方式为空时记为 '余额宝'
+        :return: pd.Series
         """
-        payment_method = row['payment_method']
-        if row['debit_credit'] == '收入' and pd.isnull(payment_method):
-            payment_method = '余额宝'
+        payment_method = df['payment_method'].mask(
+            (df['debit_credit'] == '收入') & df['payment_method'].isnull(), '余额宝'
+        )
         # 避免硬编码截断，保留原始信息或按需处理
-        row['payment_method'] = str(payment_method).split('&')[0].strip()  # 取首个支付方式
-        return row
+        return cls.first_payment_method(payment_method)  # 取首个支付方式
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pandas as pd
+from .base import Processor
+from .registry import register_processor
+
+
+@register_processor
+class BankProcessor(Processor):
+    """银行卡账单（bank_record_*.csv），文件不含汇总信息，不做余额校验"""
+    HEADER_ROW = 0
+    COLUMNS = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+
+    COLUMN_MAPPING = {
+        '交易时间': 'time',
+        '来源': 'source',
+        '收/支': 'debit_credit',
+        '支付状态': 'status',
+        '类型': 'type',
+        '交易对方': 'counterparty',
+        '商品': 'goods',
+        '金额': 'amount',
+        '支付方式': 'payment_method'
+    }
+    # 输出列顺序，与其他账单处理器保持一致
+    OUTPUT_COLUMNS = ['time', 'type', 'counterparty', 'goods', 'debit_credit', 'amount',
+                      'payment_method', 'status', 'category', 'source']
+
+    DATA_SOURCE = '银行卡账单'
+    CHECK_BALANCE = False
+    # 时间窗口按账户区分，需完整解析后才能确定导入登记来源
+    STREAMING = False
+    FILE_ENCODING = 'utf-8'
+    SIGNATURES = ('交易时间,来源,收/支,支付状态,类型,交易对方,商品,金额,支付方式',)
+    FILENAME_KEYWORDS = ('bank_record',)
+
+    def _parse(self):
+        """获取银行卡账单数据"""
+        try:
+            df = self._load_data()
+        except Exception as e:
+            raise ValueError(f"读取文件失败: {e}")
+        return self._transform(df)
+
+    def _transform(self, df):
+        """明细转换，整表解析与流式解析的每一批共用"""
+        # 验证必要字段
+        missing_columns = [col for col in self.COLUMN_MAPPING if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"文件缺少必要列: {missing_columns}")
+
+        # 列重命名
+        df = df.rename(columns=self.COLUMN_MAPPING)
+
+        # 数据预处理
+        df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
+        df['counterparty'] = df['counterparty'].fillna('')
+        df['payment_method'] = self.first_payment_method(df['payment_method'])
+        df['source'] = df['source'].fillna(self.DATA_SOURCE)
+
+        # 数据过滤
+        df = df[(df['status'] == '交易成功') & (df['debit_credit'].isin(['收入', '支出']))].copy()
+
+        # 推断分类
+        df['category'] = self.inference_categories(df)
+        return df[self.OUTPUT_COLUMNS]
+
+    def _load_data(self):
+        """加载数据"""
+        if self._is_xlsx():
+            return self._frame_from_xlsx(header=self.HEADER_ROW, usecols=self.COLUMNS)
+        return self._read_csv()
+
+    @property
+    def ledger_source(self):
+        """银行卡账单按账户区分时间窗口"""
+        df = self.df
+        accounts = sorted(df['payment_method'].unique()) if df is not None else []
+        return f"{self.DATA_SOURCE}:{'|'.join(accounts)}"
@@ -1,76 +1,181 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import io
+import itertools
 import re
+from collections import deque
+
 import pandas as pd
 
+from .category_rules import DEFAULT_RULES_PATH, load_category_engine
+from .registry import open_source
+
 class Processor:
-    def __init__(self, path):
+    # 类别规则表，子类可覆盖以使用不同的规则文件
+    CATEGORY_RULES_PATH = DEFAULT_RULES_PATH
+    # 未命中任何规则时的默认类别
+    DEFAULT_CATEGORY = '餐饮'
+    # 账单来源，子类覆盖
+    DATA_SOURCE = ''
+    # 文件编码，子类覆盖；未指定时根据文件名推断
+    FILE_ENCODING = None
+    # XLSX 账单中汇总信息所在的首/尾行数
+    SUMMARY_ROWS = 30
+    # 文件头部特征字符串，用于按内容识别账单格式，见 parser.registry
+    SIGNATURES = ()
+    # 文件名关键词，内容无法识别时兜底
+    FILENAME_KEYWORDS = ()
+    # 表头所在行及读取的列索引，子类覆盖；None 表示全部列
+    HEADER_ROW = 0
+    COLUMNS = None
+    # 流式解析每批的行数
+    CHUNK_SIZE = 50000
+    # 是否支持流式导入：导入登记来源须在解析前确定
+    STREAMING = True
+    # 是否校验表头汇总的收支金额
+    CHECK_BALANCE = True
+
+    def __init__(self, path, content=None):
+        """
+        :param path: 账单文件路径；传入 content 时仅用作文件名（判断格式、编码）
+        :param content: 可选，账单文件的字节内容，或打开二进制流的无参函数（例如压缩包成员），无需落盘，见 open_source
+        """
         self.path = path
+        self._content = content
         self._df = pd.DataFrame()
+        self._parsed = False
+        self._text = None  # CSV 账单的文本内容，只读取一次
+        self._rows = None  # XLSX 账单的单元格数据，只读取一次
+        self._summary_rows = None  # 流式解析时保留的 XLSX 首尾行，用于提取汇总信息
+
+    @classmethod
+    def sniff(cls, head_text):
+        """文件头部文本是否符合本格式"""
+        return any(signature in head_text for signature in cls.SIGNATURES)
 
     @property
     def balance(self):
         """获取文件中的余额信息"""
         try:
-            # 确定文件编码
-            file_encoding = self._determine_file_encoding()
-
-            # 根据文件类型读取内容并提取收入和支出
-            if self.path.lower().endswith('.xlsx'):
-                incomes, expenditures = self._extract_from_xlsx(file_encoding)
+            # 根据文件类型从已读取的内容中提取收入和支出
+            if self._is_xlsx():
+                incomes, expenditures = self._extract_from_xlsx()
             else:
-                incomes, expenditures = self._extract_from_text(file_encoding)
+                incomes, expenditures = self._extract_from_text()
 
             return round(incomes - expenditures, 2)
         except Exception:
             # 如果出现任何错误，返回默认值
             return 0.0
 
+    def _is_xlsx(self):
+        return str(self.path).lower().endswith('.xlsx')
+
     def _determine_file_encoding(self):
         """确定CSV文件编码格式"""
+        if self.FILE_ENCODING:
+            return self.FILE_ENCODING
         if 'alipay' in self.path or '支付宝' in self.path:
             return 'gbk'
         else:
             return 'utf-8'
 
-    def _extract_from_text(self, file_encoding):
-        """从文本文件中提取收入和支出"""
-        with open(self.path, 'r', encoding=file_encoding) as f:
-            text = f.read()
-            return self._extract_income_expense_from_text(text)
+    def _read_bytes(self):
+        if isinstance(self._content, bytes):
+            return self._content
+        with open_source(self.path, self._content) as f:
+            return f.read()
+
+    def _read_text(self):
+        """读取CSV文件文本，结果缓存在处理器上，汇总信息与明细共用同一份内容"""
+        if self._text is None:
+            self._text = self._read_bytes().decode(self._determine_file_encoding()).lstrip('\ufeff')
+        return self._text
+
+    def _open_text(self):
+        """以文本流方式打开CSV账单，供流式解析逐块读取，不缓存内容"""
+        encoding = self._determine_file_encoding()
+        if encoding.lower().replace('-', '').replace('_', '') == 'utf8':
+            encoding = 'utf-8-sig'  # 与 _read_text 一致，去除 BOM
+        return io.TextIOWrapper(open_source(self.path, self._content), encoding=encoding, newline='')
+
+    def _read_head_text(self):
+        """只读取CSV文件开头的汇总信息"""
+        with self._open_text() as stream:
+            return ''.join(itertools.islice(stream, self.SUMMARY_ROWS))
+
+    def _iter_xlsx_rows(self):
+        """以只读流式方式逐行读取XLSX首个工作表，去除每行末尾的空单元格"""
+        from openpyxl import load_workbook
 
-    def _extract_from_xlsx(self, file_encoding):
+        with open_source(self.path, self._content) as source:
+            workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+            try:
+                for row in workbook.worksheets[0].iter_rows(values_only=True):
+                    row = list(row)
+                    while row and (row[-1] is None or row[-1] == ''):
+                        row.pop()
+                    yield tuple(row)
+            finally:
+                workbook.close()
+
+    def _read_xlsx_rows(self):
+        """
+        读取XLSX首个工作表，结果缓存在处理器上
+        与 pandas 一致，去除每行及表尾的空单元格
+        :return: list[tuple]
+        """
+        if self._rows is None:
+            rows = []
+            last_row_with_data = -1
+            for row in self._iter_xlsx_rows():
+                if row:
+                    last_row_with_data = len(rows)
+                rows.append(row)
+            self._rows = rows[:last_row_with_data + 1]
+        return self._rows
+
+    @staticmethod
+    def _pick_columns(row, usecols):
+        if usecols is None:
+            return list(row)
+        return [row[i] if i < len(row) else None for i in usecols]
+
+    @classmethod
+    def _xlsx_columns(cls, row, usecols):
+        return [str(value).strip() if value is not None else '' for value in cls._pick_columns(row, usecols)]
+
+    def _frame_from_xlsx(self, header, usecols):
+        """
+        由缓存的XLSX单元格数据构造明细表，等价于 pd.read_excel(header=header, usecols=usecols)
+        """
+        rows = self._read_xlsx_rows()
+        if len(rows) <= header:
+            raise ValueError(f"文件行数不足，未找到第 {header + 1} 行表头")
+
+        columns = self._xlsx_columns(rows[header], usecols)
+        data = [self._pick_columns(row, usecols) for row in rows[header + 1:] if row]
+        return pd.DataFrame(data, columns=columns).infer_objects()
+
+    def _extract_from_text(self):
+        """从文本文件中提取收入和支出；流式解析时不缓存全文，只读取文件开头"""
+        text = self._text if self._text is not None else self._read_head_text()
+        return self._extract_income_expense_from_text(text)
+
+    def _extract_from_xlsx(self):
         """从Excel文件中提取收入和支出"""
         try:
-            # 读取Excel文件的前几行和后几行寻找汇总信息
-            # 读取前30行
-            df_head = pd.read_excel(self.path, header=None, nrows=30)
-            text_head = df_head.to_string()
-            incomes, expenditures = self._extract_income_expense_from_text(text_head)
-
-            # 如果在前几行找到了，直接返回
-            if incomes > 0 or expenditures > 0:
-                return incomes, expenditures
-
-            # 如果没找到，尝试读取后几行
-            excel_file = pd.ExcelFile(self.path)
-            for sheet_name in excel_file.sheet_names:
-                full_df = pd.read_excel(self.path, sheet_name=sheet_name, header=None)
-                total_rows = len(full_df)
-
-                if total_rows > 30:
-                    df_tail = pd.read_excel(
-                        self.path,
-                        sheet_name=sheet_name,
-                        header=None,
-                        skiprows=total_rows - 30
-                    )
-                    text_tail = df_tail.to_string()
-                    incomes, expenditures = self._extract_income_expense_from_text(text_tail)
-
-                    if incomes > 0 or expenditures > 0:
-                        return incomes, expenditures
-
+            # 汇总信息位于表头前几行或表尾几行
+            if self._rows is None and self._summary_rows is not None:
+                parts = self._summary_rows
+            else:
+                rows = self._read_xlsx_rows()
+                parts = (rows[:self.SUMMARY_ROWS], rows[-self.SUMMARY_ROWS:])
+            for part in parts:
+                text = '\n'.join(' '.join(str(value) for value in row if value is not None) for row in part)
+                incomes, expenditures = self._extract_income_expense_from_text(text)
+                if incomes > 0 or expenditures > 0:
+                    return incomes, expenditures
             return 0, 0
         except Exception:
             return 0, 0
@@ -97,35 +202,125 @@ class Processor:
 
     @property
     def df(self):
+        """解析后的账单数据，首次访问时解析并缓存，校验失败时为 None"""
+        if not self._parsed:
+            self._df = self._parse()
+            self._parsed = True
+        return self._df
+
+    def _parse(self):
+        """解析账单，子类实现"""
         return self._df
 
+    def _transform(self, df):
+        """将读取的原始明细转换为现金流记录格式（重命名、预处理、过滤、分类），子类实现"""
+        return df
+
+    def iter_batches(self, chunk_size=None):
+        """
+        流式解析：按固定行数分批读取明细，逐批完成转换后返回，峰值内存只与批大小有关
+
+        余额校验按各批收支的累计值在最后一批之后进行，校验失败时抛出 ValueError，
+        调用方应丢弃已处理的批次（例如回滚事务）。
+
+        :param chunk_size: 每批行数，默认 CHUNK_SIZE
+        :return: 生成器，每次返回一批 pd.DataFrame
+        """
+        sums = {}
+        for chunk in self._iter_raw_chunks(chunk_size or self.CHUNK_SIZE):
+            df = self._transform(chunk)
+            if df.empty:
+                continue
+            for debit_credit, amount in df.groupby('debit_credit')['amount'].sum().items():
+                sums[debit_credit] = sums.get(debit_credit, 0) + amount
+            yield df
+
+        if self.CHECK_BALANCE and not (sums and self._check_totals(sums)):
+            raise ValueError(f'Balance check failed: {self.path}')
+
+    def _iter_raw_chunks(self, chunk_size):
+        if self._is_xlsx():
+            yield from self._iter_xlsx_chunks(chunk_size)
+            return
+        with self._open_text() as stream:
+            yield from self._read_csv(stream, chunksize=chunk_size)
+
+    def _read_csv(self, source=None, chunksize=None):
+        """
+        读取CSV明细，子类可覆盖读取参数
+        :param source: 文本流，默认使用缓存的文件内容
+        :param chunksize: 指定时返回按批读取的迭代器
+        """
+        return pd.read_csv(
+            source if source is not None else io.StringIO(self._read_text()),
+            header=self.HEADER_ROW,
+            usecols=self.COLUMNS,
+            chunksize=chunksize
+        )
+
+    def _iter_xlsx_chunks(self, chunk_size):
+        """逐行读取XLSX明细并分批构造 DataFrame，同时保留首尾行用于提取汇总信息"""
+        rows = self._iter_xlsx_rows()
+        head = list(itertools.islice(rows, max(self.HEADER_ROW + 1, self.SUMMARY_ROWS)))
+        if len(head) <= self.HEADER_ROW:
+            raise ValueError(f"文件行数不足，未找到第 {self.HEADER_ROW + 1} 行表头")
+        tail = deque(head[:self.HEADER_ROW + 1], maxlen=self.SUMMARY_ROWS)
+        self._summary_rows = (head[:self.SUMMARY_ROWS], tail)
+
+        columns = self._xlsx_columns(head[self.HEADER_ROW], self.COLUMNS)
+        batch = []
+        for row in itertools.chain(head[self.HEADER_ROW + 1:], rows):
+            if not row:
+                continue
+            tail.append(row)
+            batch.append(self._pick_columns(row, self.COLUMNS))
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=columns).infer_objects()
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns).infer_objects()
+
+    @property
+    def ledger_source(self):
+        """导入登记使用的来源标识，已导入的时间窗口按来源区分"""
+        return self.DATA_SOURCE
+
     def check_balance(self, df):
         if df.empty:
             return None
-        sums = df.groupby(['debit_credit'])['amount'].sum()
-        if '收入' not in sums:
-            sums['收入'] = 0
+        return self._check_totals(df.groupby(['debit_credit'])['amount'].sum())
 
-        balance = round(sums['收入'] - sums['支出'], 2)
+    def _check_totals(self, sums):
+        """按借贷方向汇总的金额与文件表头的收支汇总比较"""
+        balance = round(sums.get('收入', 0) - sums['支出'], 2)
         if balance == self.balance:
             return f'{self.path} is checked'
         return None
 
+    @classmethod
+    def category_engine(cls):
+        """获取已编译的类别规则引擎"""
+        return load_category_engine(cls.CATEGORY_RULES_PATH, cls.DEFAULT_CATEGORY)
+
+    @classmethod
+    def inference_category(cls, row):
+        """识别交易类别（逐行版本，批量处理请使用 inference_categories）"""
+        category, _ = cls.category_engine().match(row['counterparty'], row['goods'])
+        return category
+
+    @classmethod
+    def inference_categories(cls, df):
+        """
+        按列识别交易类别，命中的规则可通过 category_engine().classify(df) 查看
+        :return: pd.Series
+        """
+        return cls.category_engine().classify(df)['category']
+
     @staticmethod
-    def inference_category(row):
-        """识别交易类别"""
-        text = str(row['counterparty']) + ' ' + str(row['goods'])
-        shopping_pattern = '平台商户|抖音电商商家|快递'  # 根据交易对方判断
-        transportation_pattern = '出行|加油|停车|中铁|12306'  # 根据二者判断
-        telecommunication_pattern = '联通'  # 根据交易对方判断
-        salary_pattern = '工资'
-        if re.search(shopping_pattern, text):
-            return '购物'
-        elif re.search(transportation_pattern, text):
-            return '交通'
-        elif re.search(telecommunication_pattern, text):
-            return '通讯'
-        elif re.search(salary_pattern, text):
-            return '工资'
-        else:
-            return '餐饮'
+    def first_payment_method(payment_method):
+        """
+        多账户合并付款以 & 分隔，按列取首个支付方式并去除首尾空白
+        空值按 str() 处理为 'nan'，与逐行逻辑保持一致
+        :return: pd.Series
+        """
+        return payment_method.astype(str).str.split('&', n=1).str[0].str.strip()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易类别规则引擎
+
+规则表（CSV 文件或数据库表）每行一个关键词：
+    rule_id   规则编号，用于回报命中的规则
+    category  类别
+    field     匹配字段：counterparty / goods，留空表示匹配 '交易对方 商品' 拼接文本
+    keyword   关键词，按字面匹配
+    priority  可选，优先级（越小越优先）；缺省时以行顺序为优先级
+
+同一条记录命中多条规则时取优先级最高的一条，均未命中时取默认类别。
+所有关键词按字段编译为一个前缀树正则，逐条文本只扫描一遍，
+单个位置的匹配代价取决于关键词长度而非规则数量。
+"""
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.csv')
+RULE_COLUMNS = ['rule_id', 'category', 'field', 'keyword']
+MATCH_FIELDS = ('', 'counterparty', 'goods')
+
+
+def _trie_pattern(keywords):
+    """将关键词构造成前缀树形式的正则，同一位置总是命中最长的关键词"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(node[char]) for char in sorted(c for c in node if c is not None)]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if None in node else body
+
+    return build(trie)
+
+
+class _KeywordMatcher:
+    """单个字段的多关键词匹配器"""
+
+    def __init__(self, keyword_ranks):
+        # 较长关键词命中时，其前缀关键词在同一位置同样命中，
+        # 因此预先把前缀中的最高优先级合并到长关键词上
+        self.ranks = {
+            keyword: min(keyword_ranks[keyword[:i]] for i in range(1, len(keyword) + 1)
+                         if keyword[:i] in keyword_ranks)
+            for keyword in keyword_ranks
+        }
+        # 零宽先行断言使每个起始位置都参与匹配，重叠的关键词不会被吞掉
+        self.pattern = re.compile('(?=(' + _trie_pattern(keyword_ranks) + '))')
+
+    def rank_text(self, text):
+        """返回文本命中的最高优先级，未命中返回 None"""
+        ranks = [self.ranks[keyword] for keyword in self.pattern.findall(text)]
+        return min(ranks) if ranks else None
+
+    def rank_column(self, texts):
+        """按列返回每条文本命中的最高优先级，未命中为 NaN"""
+        result = np.full(len(texts), np.nan)
+        if not len(texts):
+            return result
+        matches = pd.Series(texts.to_numpy(dtype=object)).str.extractall(self.pattern)[0]
+        if matches.empty:
+            return result
+        best = matches.map(self.ranks).groupby(level=0).min()
+        result[best.index.to_numpy()] = best.to_numpy()
+        return result
+
+
+class CategoryRuleEngine:
+    """基于规则表的交易类别识别"""
+
+    def __init__(self, rules, default_category='餐饮'):
+        missing_columns = [col for col in RULE_COLUMNS if col not in rules.columns]
+        if missing_columns:
+            raise ValueError(f"类别规则缺少必要列: {missing_columns}")
+
+        rules = rules.copy()
+        rules['field'] = rules['field'].fillna('').astype(str).str.strip()
+        rules['keyword'] = rules['keyword'].fillna('').astype(str)
+        invalid_fields = set(rules['field']) - set(MATCH_FIELDS)
+        if invalid_fields:
+            raise ValueError(f"类别规则包含未知匹配字段: {sorted(invalid_fields)}")
+        rules = rules[rules['keyword'] != '']
+        if 'priority' in rules.columns:
+            rules = rules.sort_values('priority', key=pd.to_numeric, kind='stable')
+
+        self.rules = rules.reset_index(drop=True)
+        self.default_category = default_category
+        self._categories = self.rules['category'].to_numpy(dtype=object)
+        self._rule_ids = self.rules['rule_id'].astype(str).to_numpy(dtype=object)
+
+        self._matchers = {}
+        for field, group in self.rules.groupby('field', sort=False):
+            keyword_ranks = {}
+            for rank, keyword in zip(group.index, group['keyword']):
+                keyword_ranks.setdefault(keyword, rank)
+            self._matchers[field] = _KeywordMatcher(keyword_ranks)
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_RULES_PATH, default_category='餐饮'):
+        """从 CSV 文件加载规则"""
+        return cls(pd.read_csv(path, dtype=str, keep_default_na=False), default_category)
+
+    @classmethod
+    def from_sql(cls, table_name, con, default_category='餐饮'):
+        """从数据库表加载规则，表需包含 RULE_COLUMNS 中的列，可带 priority 列"""
+        return cls(pd.read_sql_table(table_name, con), default_category)
+
+    def classify(self, df):
+        """
+        按列识别交易类别
+        :param df: 包含 counterparty、goods 列的 DataFrame
+        :return: pd.DataFrame，列为 category（类别）和 rule_id（命中规则，未命中为 None）
+        """
+        counterparty = df['counterparty'].astype(str)
+        goods = df['goods'].astype(str)
+        texts = {'': counterparty + ' ' + goods, 'counterparty': counterparty, 'goods': goods}
+
+        best = np.full(len(df), np.nan)
+        for field, matcher in self._matchers.items():
+            best = np.fmin(best, matcher.rank_column(texts[field]))
+
+        hit = ~np.isnan(best)
+        ranks = best[hit].astype(int)
+        categories = np.full(len(df), self.default_category, dtype=object)
+        categories[hit] = self._categories[ranks]
+        rule_ids = np.full(len(df), None, dtype=object)
+        rule_ids[hit] = self._rule_ids[ranks]
+        return pd.DataFrame({'category': categories, 'rule_id': rule_ids}, index=df.index)
+
+    def match(self, counterparty, goods):
+        """
+        识别单条记录的类别
+        :return: (category, rule_id)，未命中时 rule_id 为 None
+        """
+        counterparty, goods = str(counterparty), str(goods)
+        texts = {'': counterparty + ' ' + goods, 'counterparty': counterparty, 'goods': goods}
+
+        ranks = [matcher.rank_text(texts[field]) for field, matcher in self._matchers.items()]
+        ranks = [rank for rank in ranks if rank is not None]
+        if not ranks:
+            return self.default_category, None
+        rank = min(ranks)
+        return self._categories[rank], self._rule_ids[rank]
+
+
+@lru_cache(maxsize=None)
+def load_category_engine(path=DEFAULT_RULES_PATH, default_category='餐饮'):
+    """加载并缓存规则引擎，同一规则文件只编译一次"""
+    return CategoryRuleEngine.from_csv(path, default_category)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账单处理器注册表
+
+各 Processor 子类通过 register_processor 注册，并声明：
+    SIGNATURES         文件头部特征字符串
+    FILENAME_KEYWORDS  文件名关键词，内容无法识别时兜底
+识别格式时 CSV 只读取前 SNIFF_BYTES 字节，XLSX 只读取首个工作表的前 SNIFF_ROWS 行，
+不会触发完整解析。
+"""
+import io
+import os
+
+SNIFF_BYTES = 4096
+SNIFF_ROWS = 30
+
+_PROCESSORS = []
+
+
+def register_processor(cls):
+    """注册账单处理器（类装饰器），按注册顺序匹配"""
+    if cls not in _PROCESSORS:
+        _PROCESSORS.append(cls)
+    return cls
+
+
+def registered_processors():
+    return list(_PROCESSORS)
+
+
+def open_source(path, content=None):
+    """
+    以二进制流打开账单
+
+    :param path: 文件路径，content 为空时读取
+    :param content: 可选，文件字节内容，或返回二进制流的无参函数（例如按需打开压缩包成员，不读入内存）
+    """
+    if content is None:
+        return open(path, 'rb')
+    if callable(content):
+        return content()
+    return io.BytesIO(content)
+
+
+def _read_head_bytes(path, content):
+    if isinstance(content, bytes):
+        return content[:SNIFF_BYTES]
+    with open_source(path, content) as f:
+        return f.read(SNIFF_BYTES)
+
+
+def _read_head_rows(path, content):
+    """流式读取XLSX首个工作表的前几行，拼接为文本"""
+    from openpyxl import load_workbook
+
+    with open_source(path, content) as source:
+        workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+        try:
+            lines = []
+            for row in workbook.worksheets[0].iter_rows(max_row=SNIFF_ROWS, values_only=True):
+                lines.append(','.join('' if value is None else str(value) for value in row).rstrip(','))
+            return '\n'.join(lines)
+        finally:
+            workbook.close()
+
+
+def detect_processor(path, content=None):
+    """
+    根据文件头部内容识别账单格式
+    :param path: 文件路径或文件名
+    :param content: 可选，文件字节内容或打开二进制流的无参函数，见 open_source
+    :return: Processor 子类，无法识别时返回 None
+    """
+    is_xlsx = str(path).lower().endswith('.xlsx')
+    try:
+        head = _read_head_rows(path, content) if is_xlsx else _read_head_bytes(path, content)
+    except Exception:
+        head = '' if is_xlsx else b''
+
+    for cls in _PROCESSORS:
+        text = head if is_xlsx else head.decode(cls.FILE_ENCODING or 'utf-8', errors='ignore')
+        if cls.sniff(text):
+            return cls
+
+    # 内容无法识别时按文件名兜底
+    file_name = os.path.basename(str(path))
+    for cls in _PROCESSORS:
+        if any(keyword in file_name for keyword in cls.FILENAME_KEYWORDS):
+            return cls
+    return None
+
+
+def get_processor(path, content=None):
+    """识别账单格式并创建对应的处理器，无法识别时返回 None"""
+    cls = detect_processor(path, content)
+    return cls(path, content) if cls else None
@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 from .base import Processor
+from .registry import register_processor
 
 
+@register_processor
 class WeixinProcessor(Processor):
     HEADER_ROW = 16
     COLUMNS = [0, 1, 2, 3, 4, 5, 6, 7]
@@ -21,19 +23,29 @@ class WeixinProcessor(Processor):
     }
     DATA_SOURCE = "微信"
     FILE_ENCODING = 'utf-8'
+    SIGNATURES = ('微信支付账单明细',)
+    FILENAME_KEYWORDS = ('微信支付账单',)
 
     @property
     def balance(self):
         return super().balance
 
-    @property
-    def df(self):
+    def _parse(self):
         """获取微信数据"""
         try:
             df = self._load_data()
         except Exception as e:
             raise ValueError(f"读取文件失败: {e}")
 
+        df = self._transform(df)
+
+        # 最终验证
+        if self.check_balance(df):
+            return df
+        return None
+
+    def _transform(self, df):
+        """明细转换，整表解析与流式解析的每一批共用"""
         # 列重命名
         df = df.rename(columns=self.COLUMN_MAPPING)
 
@@ -41,16 +53,11 @@ class WeixinProcessor(Processor):
         df = self._preprocess_data(df)
 
         # 添加计算字段
-        df = self._add_computed_fields(df)
-
-        # 最终验证
-        if self.check_balance(df):
-            return df
-        return None
+        return self._add_computed_fields(df)
 
     def _load_data(self):
         """加载数据"""
-        if self.path.lower().endswith('.xlsx'):
+        if self._is_xlsx():
             return self._read_xlsx()
         else:
             return self._read_csv()
@@ -60,40 +67,23 @@ class WeixinProcessor(Processor):
         # 去除金额字段的货币符号
         df['amount'] = pd.to_numeric(df['amount'].str.replace('¥', ''), errors='coerce')
         # 推断支付方式
-        df = df.apply(self._inference_payment_method, axis=1)
+        df['payment_method'] = self._inference_payment_method(df)
         return df
 
     def _add_computed_fields(self, df):
         """添加计算字段"""
         # 推断分类
-        df['category'] = df.apply(self.inference_category, axis=1)
+        df['category'] = self.inference_categories(df)
         # 设置数据源
         df['source'] = self.DATA_SOURCE
         return df
 
-    def _read_csv(self):
-        """读取微信CSV格式账单"""
-        return pd.read_csv(
-            self.path,
-            header=self.HEADER_ROW,
-            usecols=self.COLUMNS,
-            skipfooter=0,
-            encoding=self.FILE_ENCODING,
-            engine='python'  # 支持 skipfooter
-        )
-
     def _read_xlsx(self):
         """读取微信XLSX格式账单"""
-        return pd.read_excel(
-            self.path,
-            header=self.HEADER_ROW,
-            usecols=self.COLUMNS,
-            skipfooter=0
-        )
+        return self._frame_from_xlsx(header=self.HEADER_ROW, usecols=self.COLUMNS)
 
     @staticmethod
-    def _inference_payment_method(row):
+    def _inference_payment_method(df):
         """微信收入的交易账户为 零钱 """
-        if row['debit_credit'] == '收入' and row['payment_method'] == '/' and row['status'] == "已存入零钱":
-            row['payment_method'] = '零钱'
-        return row
+        is_change = (df['debit_credit'] == '收入') & (df['payment_method'] == '/') & (df['status'] == "已存入零钱")
+        return df['payment_method'].mask(is_change, '零钱')
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账单解析进程池的工作函数
+
+进程池以 spawn 方式启动子进程，子进程只导入本模块所在的 parser 包，
+不导入 app 包，不会创建应用、连接数据库或启动后台导入任务。
+压缩包成员只传递 (压缩包路径, 成员名)，由子进程自行打开，成员内容不经过主进程。
+"""
+import zipfile
+from functools import partial
+
+from .registry import get_processor
+
+
+def open_member(archive_path, member):
+    """打开压缩包成员的二进制流，流关闭时一并关闭压缩包文件"""
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.open(member)
+
+
+def source_content(file_path, member=None):
+    """
+    处理器的 content 参数：压缩包成员返回按需打开成员流的函数（可跨进程传递），磁盘文件返回 None
+
+    Args:
+        file_path (str): 磁盘文件或压缩包路径
+        member (str, optional): 压缩包成员名
+    """
+    return partial(open_member, file_path, member) if member is not None else None
+
+
+def parse_bill(file_name, file_path, member=None):
+    """
+    解析单个账单文件，供进程池调用
+
+    Args:
+        file_name (str): 文件名，用于选择处理器
+        file_path (str): 磁盘文件或压缩包路径
+        member (str, optional): 压缩包成员名
+
+    Returns:
+        tuple: (账单来源, 现金流记录字典列表)
+    """
+    bill = get_processor(file_path if member is None else file_name, source_content(file_path, member))
+    if bill is None:
+        raise ValueError(f'Unsupported file type: {file_name}')
+    df = bill.df
+    if df is None:
+        raise ValueError(f'Balance check failed: {file_name}')
+    return bill.ledger_source, df.to_dict(orient='records')
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 持仓汇总表维护：python positions.py [rebuild | check]
+import json
+import sys
+
+from app import create_app
+from app.service.position_service import PositionService
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command not in ('rebuild', 'check'):
+        print("Usage: python positions.py [rebuild | check]")
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if command == 'rebuild':
+            print(json.dumps({'positions': PositionService.rebuild()}))
+        else:
+            mismatches = PositionService.check()
+            print(json.dumps(mismatches, ensure_ascii=False, indent=2))
+            sys.exit(1 if mismatches else 0)
@@ -1,11 +1,19 @@
 # -*- coding: utf-8 -*-
+import os
 from typing import Any
 
 import akshare as ak
 from datetime import datetime
 import requests
 
-from app.model import db, StockPrice
+from app.extentions import db
+from app.models import StockPrice
+from app.service.latest_price_service import LatestPriceService
+
+# 单次 HTTP 请求超时秒数，超时按失败处理并由调用方重试
+REQUEST_TIMEOUT = 15
+# stockapi 日线接口地址，可由环境变量覆盖（如指向测试桩）
+STOCK_API_URL = os.environ.get('STOCK_API_URL', 'https://stockapi.com.cn/v1/base/day')
 
 column_map = {
     '日期': 'date',
@@ -35,6 +43,7 @@ def insert_stock_data(stock_code):
     )
     df.rename(columns=column_map, inplace=True)
     df.to_sql('stock_price', con=db.engine, if_exists='append', index=False)
+    LatestPriceService.refresh([stock_code])
     print({'stock_code': stock_code, 'records': df.shape[0], 'from_date': df['date'].min(), 'to_date': df['date'].max()})
 
 
@@ -45,14 +54,14 @@ def query_stock_price(
 ) -> Any | None:
     start_date = start_date or "2000-01-01"
     end_date = end_date or datetime.now().strftime("%Y-%m-%d")
-    url = "https://stockapi.com.cn/v1/base/day"
     params = {
         "code": stock_code,
         "startDate": start_date,
         "endDate": end_date,
         "calculateCycle": "100",
     }
-    r = requests.get(url, params=params)
+    r = requests.get(STOCK_API_URL, params=params, timeout=REQUEST_TIMEOUT)
+    r.raise_for_status()
     data_json = r.json()
     if not (data_json["data"]):
         return None
@@ -94,18 +103,25 @@ def transform_stock_data(original_data):
 
 def create_stock_data(stock_code, start_date=None, end_date=None):
     records = query_stock_price(stock_code=stock_code, start_date=start_date, end_date=end_date)
+    return save_stock_data(records)
+
+
+def save_stock_data(records):
+    """写入 query_stock_price 返回的日线数据，已存在的 (证券, 日期) 跳过，并刷新涉及证券的最新价格"""
     created_stock_price = []
 
-    for data in records:
+    for data in records or []:
+        # 接口返回 'YYYY-MM-DD' 字符串，统一转换为 date
+        trade_date = datetime.strptime(str(data.get('date'))[:10], '%Y-%m-%d').date()
         # 查询是否存在相同记录
         existing_stock_price = StockPrice.query.filter(
             StockPrice.stock_code == data.get('stock_code'),
-            StockPrice.date == data.get('date')
+            StockPrice.date == trade_date
         ).first()
 
         if not existing_stock_price:
             stock_price = StockPrice(
-                date=data.get('date'),
+                date=trade_date,
                 stock_code=data.get('stock_code'),
                 open=data.get('open'),
                 close=data.get('close'),
@@ -121,6 +137,8 @@ def create_stock_data(stock_code, start_date=None, end_date=None):
             created_stock_price.append(stock_price)
 
     db.session.commit()
+    if created_stock_price:
+        LatestPriceService.refresh({stock_price.stock_code for stock_price in created_stock_price})
     return created_stock_price
 
 
@@ -131,7 +149,13 @@ def insert_fund_data(fund_code, start_date=None):
     :param start_date: 起始时间，格式：%Y%m%d
     :return: 基金数据
     """
-    start_date = start_date.replace('-', '') or "20000101"
+    df = fetch_fund_data(fund_code, start_date)
+    save_fund_data(fund_code, df)
+
+
+def fetch_fund_data(fund_code, start_date=None):
+    """获取场内ETF基金日线数据，列名转换为 stock_price 的字段，不写库"""
+    start_date = (start_date or '').replace('-', '') or "20000101"
     end_date = datetime.now().strftime("%Y%m%d")
     df = ak.fund_etf_hist_em(
         symbol=fund_code,
@@ -140,7 +164,13 @@ def insert_fund_data(fund_code, start_date=None):
     )
     df.rename(columns=column_map, inplace=True)
     df.insert(1, 'stock_code', fund_code)
+    return df
+
+
+def save_fund_data(fund_code, df):
+    """追加写入 fetch_fund_data 返回的日线数据，并刷新该基金的最新价格"""
     df.to_sql('stock_price', con=db.engine, if_exists='append', index=False)
+    LatestPriceService.refresh([fund_code])
     print({'fund_code': fund_code, 'records': df.shape[0], 'from_date': df['date'].min(), 'to_date': df['date'].max()})
 
 
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 # run.py
 from app import create_app
-
-app = create_app()
+from app.service.import_job_service import ImportJobService
 
 if __name__ == "__main__":
+    # 应用创建与任务恢复只在服务进程中执行：账单解析的 spawn 子进程会以 __mp_main__ 重新导入本模块，
+    # 放在模块顶层会让每个子进程都执行迁移、启动导入线程池和心跳并认领任务
+    app = create_app()
+
+    # 服务进程恢复未完成的导入任务，其他进程正在执行（心跳未过期）的任务不会被重复执行
+    with app.app_context():
+        ImportJobService.resume_unfinished()
+
     app.run(debug=True, host='0.0.0.0', port=18080)
@@ -1,88 +1,128 @@
 # -*- coding: utf-8 -*-
 import datetime
+import json
 import logging
-import time
 import sys
 import os
 from sqlalchemy import func
-from apscheduler.schedulers.blocking import BlockingScheduler
-from app.model import db, StockPrice
-from price_getter import create_stock_data, insert_fund_data
-from app import app  # 确保正确导入Flask应用实例
-
-# 确保 log 目录存在
-log_dir = 'log'
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-# 配置日志
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, 'stock_updater.log')),
-        logging.StreamHandler()
-    ]
-)
+from app import create_app
+from app.extentions import db
+from app.models import StockPrice
+from price_getter import query_stock_price, save_stock_data, fetch_fund_data, save_fund_data
+from app.service.nav_service import NavService
+from app.utils.fetch_scheduler import FetchScheduler, FetchTask
+
 logger = logging.getLogger(__name__)
 
 
-def get_latest_date(stock_code):
-    with app.app_context():
-        latest_date_str = db.session.query(func.max(StockPrice.date)).filter(
-            StockPrice.stock_code == stock_code
-        ).scalar()
-
-    # 统一转换为 date 对象
-    if latest_date_str:
-        if isinstance(latest_date_str, str):  # 处理字符串类型
-            return datetime.datetime.strptime(latest_date_str, "%Y-%m-%d").date()
-        return latest_date_str  # 已经是 date 类型
+def setup_logging(log_dir='log'):
+    """日志同时写入 log/stock_updater.log 和标准输出，只在命令行运行时配置"""
+    os.makedirs(log_dir, exist_ok=True)
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        handlers=[
+            logging.FileHandler(os.path.join(log_dir, 'stock_updater.log')),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def _to_date(value):
+    """统一转换为 date 对象（部分驱动返回字符串）"""
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def get_latest_dates():
+    """各证券已有行情的最近日期，一次分组查询代替逐个证券查询"""
+    rows = db.session.query(StockPrice.stock_code, func.max(StockPrice.date)).group_by(StockPrice.stock_code).all()
+    return {code: _to_date(latest_date) if latest_date else datetime.date(2000, 1, 1) for code, latest_date in rows}
+
+
+def build_task(code, latest_date):
+    """按代码类型（股票/基金）选择上游，返回抓取任务；不支持的代码返回 None"""
+    start_date = (latest_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    if code.startswith(('60', '000', '001', '002', '003')):  # 沪市&深市主板股票代码规则
+        return FetchTask(code, 'stockapi', lambda: ('stock', query_stock_price(code, start_date)))
+    if code.startswith('51'):  # 沪市ETF基金代码规则
+        return FetchTask(code, 'akshare', lambda: ('fund', fetch_fund_data(code, start_date)))
+    # elif code.startswith('15'):  # 深市ETF基金代码规则
+    return None
+
+
+def save_result(result):
+    """
+    在主线程写入抓取结果，写入函数同时刷新最新价格
+
+    组合估值只向后追加，此前抓取失败的证券补抓到的行情可能早于已存储的估值日期（当日按前一收盘价估值），
+    因此从新行情的最早日期起截断估值，由随后的 NavService.update 重新计算。
+    """
+    kind, data = result.value
+    if kind == 'stock':
+        dates = [stock_price.date for stock_price in save_stock_data(data)]
     else:
-        return datetime.date(2000, 1, 1)
+        save_fund_data(result.key, data)
+        dates = [] if data.empty else [data['date'].min()]
+    if dates:
+        NavService.invalidate_from(min(dates))
+        db.session.commit()
+
+
+def update_stock_prices(app=None):
+    """
+    更新所有股票价格
 
+    网络请求由 FetchScheduler 并发执行，每个上游按令牌桶限速，失败按退避重试；
+    写库在主线程按完成顺序进行，某只证券失败不影响其他证券。
 
-def update_stock_prices():
-    """更新所有股票价格"""
+    Args:
+        app (Flask, optional): 应用实例，默认新建；定时任务传入同一个实例，避免每次运行重复建表、迁移
+    """
+    app = app or create_app()
     with app.app_context():
         try:
-            # 获取所有唯一股票代码
-            stock_codes = [code[0] for code in db.session.query(
-                StockPrice.stock_code
-            ).distinct().all()]
-
-            for code in stock_codes:
+            tasks = [task for task in (build_task(code, latest_date)
+                                       for code, latest_date in get_latest_dates().items()) if task]
+            logger.info(f"开始更新 {len(tasks)} 只证券")
+
+            scheduler = FetchScheduler(
+                app.config.get('PRICE_FETCH_RATES', {'stockapi': 2, 'akshare': 1}),
+                max_workers=app.config.get('PRICE_FETCH_WORKERS', 4),
+                retries=app.config.get('PRICE_FETCH_RETRIES', 3)
+            )
+            for result in scheduler.run(tasks):
+                if not result.ok:
+                    logger.error(f"更新 {result.key} 失败（尝试 {result.attempts} 次）: {result.error}")
+                    continue
                 try:
-                    latest_date = get_latest_date(code)
-                    start_date = (latest_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-
-                    logger.info(f"正在更新 {code} 数据，开始日期：{start_date}")
-
-                    # 判断代码类型（股票/基金）
-                    if code.startswith(('60', '000', '001', '002', '003')):  # 沪市&深市主板股票代码规则
-                        create_stock_data(code, start_date)
-                    if code.startswith('51'):  # 沪市ETF基金代码规则
-                        insert_fund_data(code, start_date)
-                    # elif code.startswith('15'):  # 深市ETF基金代码规则
-                    #     insert_fund_data(code, start_date)
-
-                    time.sleep(1)  # 防止请求过频
-
+                    save_result(result)
+                    logger.info(f"已更新 {result.key}，尝试 {result.attempts} 次，耗时 {result.elapsed:.2f} 秒")
                 except Exception as e:
-                    logger.error(f"更新 {code} 失败: {str(e)}")
-                    continue
+                    db.session.rollback()
+                    # 写库失败同样计入失败统计
+                    result.error = f"写入失败: {str(e)}"
+                    logger.error(f"更新 {result.key} 失败: {result.error}")
+
+            logger.info(f"股票价格更新完成: {json.dumps(scheduler.metrics.summary(), ensure_ascii=False)}")
 
-            logger.info("股票价格更新完成")
+            # 按新行情追加组合每日估值
+            logger.info(f"组合估值新增 {NavService.update()} 个交易日")
 
         except Exception as e:
             logger.error(f"更新任务执行失败: {str(e)}")
 
 
 if __name__ == "__main__":
+    setup_logging()
+    app = create_app()
     # 手动更新，命令行参数传入 update_stock_prices
     if len(sys.argv) > 1 and sys.argv[1] == "update_stock_prices":
-        update_stock_prices()
+        update_stock_prices(app)
     else:
+        from apscheduler.schedulers.blocking import BlockingScheduler
+
         # 配置定时任务
         scheduler = BlockingScheduler(timezone="Asia/Shanghai")
 
@@ -90,6 +130,7 @@ if __name__ == "__main__":
         scheduler.add_job(
             update_stock_prices,
             'cron',
+            args=[app],
             hour=15,
             minute=50,
             misfire_grace_time=60
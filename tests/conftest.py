@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# tests/conftest.py
+"""
+测试公共夹具
+
+测试使用临时 SQLite 库，只创建用例需要的表。生产库为 MySQL，两处 MySQL 专有定义在此替换为 SQLite 等价写法：
+cashflow.month_date 生成列的表达式，以及 cashflow_ngram.gram 的 utf8mb4_bin 排序规则。
+"""
+import os
+import sys
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import api_bp  # noqa: E402
+from app.extentions import db  # noqa: E402
+from app.models import Cashflow, CashflowNgram  # noqa: E402
+from app.service.cashflow_search_service import CashflowSearchService  # noqa: E402
+from app.service.cost_basis_service import CostBasisService  # noqa: E402
+
+Cashflow.__table__.c.month_date.computed.sqltext = text("date(time, 'start of month')")
+CashflowNgram.__table__.c.gram.type.collation = None
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    按表名创建应用，返回的应用已注册 API 蓝图和 ORM 事件
+
+    用法：app = make_app('cashflow', 'cashflow_ngram')
+    """
+
+    def factory(*tables):
+        app = Flask('tests')
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + str(tmp_path / 'test.db')
+        app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+        app.config['TESTING'] = True
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        db.init_app(app)
+        app.register_blueprint(api_bp, url_prefix='/api')
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[db.metadata.tables[name] for name in tables])
+        CashflowSearchService.register()
+        CostBasisService.register()
+        return app
+
+    return factory
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# tests/test_cashflow_batch.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extentions import db
+from app.models import Cashflow
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app('cashflow', 'cashflow_ngram')
+    with app.app_context():
+        for i in range(20):
+            db.session.add(Cashflow(
+                cashflow_id=f'{i:05d}', time=datetime(2024, 1, 1) + timedelta(days=i * 3), counterparty='店铺',
+                goods='商品', debit_credit='支出', amount=1, payment_method='账户',
+                category='餐饮' if i % 2 else '购物'))
+        db.session.commit()
+    with app.app_context():
+        yield app.test_client()
+
+
+def total(client):
+    return client.get('/api/cashflow').get_json()['total']
+
+
+@pytest.mark.parametrize('body', [
+    {'filter': {'catgory': '餐饮'}},
+    {'filter': {'pageNum': 1}},
+    {'filter': {'category': '餐饮', 'query': 1}},
+    {'filter': {'metadata': 1}},
+    {'filter': ['category']},
+    {'filter': {'startDate': '', 'q': '  '}},
+])
+def test_delete_rejects_filters_without_effective_condition(client, body):
+    response = client.delete('/api/cashflow', json=body)
+    assert response.status_code == 400
+    assert total(client) == 20
+
+
+def test_patch_rejects_unknown_filter_field(client):
+    response = client.patch('/api/cashflow', json={'filter': {'catgory': '餐饮'}, 'values': {'category': '交通'}})
+    assert response.status_code == 400
+    assert client.get('/api/cashflow?category=交通').get_json()['total'] == 0
+
+
+def test_delete_by_filter(client):
+    response = client.delete('/api/cashflow', json={'filter': {'category': '餐饮', 'time': '2024-01'}})
+    assert response.status_code == 200
+    assert response.get_json()['deleted'] == 5
+    assert total(client) == 15
+
+
+def test_patch_by_ids_reports_missing(client):
+    response = client.patch('/api/cashflow', json={'ids': ['00001', 'missing'], 'values': {'category': '交通'}})
+    assert response.status_code == 207
+    assert response.get_json()['results'] == [
+        {'cashflow_id': '00001', 'status': 'updated'}, {'cashflow_id': 'missing', 'status': 'not_found'}]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# tests/test_cashflow_dedup.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.extentions import db
+from app.models import Cashflow
+from app.service.cashflow_dedup_service import CashflowDedupService, add_cashflow_records
+from app.utils.utils import generate_cashflow_fingerprint
+
+
+def record(minute, amount=10.0):
+    return {'time': f'2024-05-01 12:{minute:02d}:00', 'debit_credit': '支出', 'amount': amount,
+            'payment_method': '招商银行', 'counterparty': '店铺', 'goods': '商品'}
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app('cashflow', 'cashflow_ngram')
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_put_recomputes_fingerprint(client):
+    cashflow_id = add_cashflow_records([record(0)])[0]['cashflow_id']
+    response = client.put(f'/api/cashflow/{cashflow_id}', json={'time': '2024-05-02 08:30:00', 'amount': 12.5})
+    assert response.status_code == 200
+
+    cashflow = db.session.get(Cashflow, cashflow_id)
+    assert cashflow.time == datetime(2024, 5, 2, 8, 30)
+    assert cashflow.fingerprint == generate_cashflow_fingerprint(cashflow.time, '支出', 12.5, '招商银行')
+    # 原指纹已释放，相同的记录可以再次导入；新指纹生效，重复导入被跳过
+    assert len(add_cashflow_records([record(0)])) == 1
+    assert add_cashflow_records([{**record(30), 'time': '2024-05-02 08:30:00', 'amount': 12.5}]) == []
+
+
+def test_put_rejects_edit_that_duplicates_another_record(client):
+    first, second = add_cashflow_records([record(0), record(1)])
+    response = client.put(f"/api/cashflow/{second['cashflow_id']}", json={'time': '2024-05-01 12:00:30'})
+    assert response.status_code == 409
+    assert db.session.get(Cashflow, second['cashflow_id']).fingerprint == second['fingerprint']
+
+
+def test_put_ignores_derived_columns(client):
+    created = add_cashflow_records([record(0)])[0]
+    response = client.put(f"/api/cashflow/{created['cashflow_id']}", json={'fingerprint': 'x', 'category': '餐饮'})
+    assert response.status_code == 200
+    assert db.session.get(Cashflow, created['cashflow_id']).fingerprint == created['fingerprint']
+
+
+def test_bulk_insert_reports_only_inserted_rows(client, monkeypatch):
+    existing = add_cashflow_records([record(0)])
+    # 模拟查询指纹之后、写入之前被并发导入写入的记录
+    monkeypatch.setattr(CashflowDedupService, 'existing_fingerprints', staticmethod(lambda fingerprints: set()))
+    created = add_cashflow_records([record(0), record(1)])
+    assert [row['time'] for row in created] == [datetime(2024, 5, 1, 12, 1)]
+    assert db.session.query(Cashflow).count() == 2
+    assert existing[0]['cashflow_id'] not in {row['cashflow_id'] for row in created}
+
+
+def test_bulk_insert_raises_errors_other_than_duplicates(client):
+    # 只跳过指纹冲突，非空约束等错误不能被静默丢弃
+    with pytest.raises(IntegrityError):
+        add_cashflow_records([record(0), {**record(1), 'goods': None}])
+    db.session.rollback()
+    assert db.session.query(Cashflow).count() == 0
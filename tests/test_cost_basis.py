@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# tests/test_cost_basis.py
+"""CostBasisService.replay 与逐笔维护批次列表的朴素回放对比"""
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.service.cost_basis_service import CostBasisService
+
+Row = namedtuple('Row', 'transaction_id timestamp type quantity amount fee')
+
+
+def naive_replay(rows, method):
+    """
+    朴素批次回放：批次为 [买入交易ID, 数量（0.01 股）, 单位成本]，卖出逐批次消耗
+
+    Returns:
+        tuple: (未平仓批次 [(交易ID, 数量)], 卖出 [(匹配数量, 已实现盈亏)], 分红 [[(批次交易ID, 数量)]])
+    """
+    lots, sells, dividends = [], [], []
+    for row in rows:
+        units = round(float(row.quantity) * 100)
+        if row.type == 'BUY':
+            lots.append([row.transaction_id, units, (row.amount + row.fee) / units if units else 0])
+            if method == 'average':
+                total_units = sum(lot[1] for lot in lots)
+                total_cost = sum(lot[1] * lot[2] for lot in lots)
+                lots = [[None, total_units, total_cost / total_units]] if total_units else []
+        elif row.type == 'SELL':
+            need, cost = units, 0
+            while need and lots:
+                lot = lots[-1] if method == 'lifo' else lots[0]
+                taken = min(need, lot[1])
+                cost += taken * lot[2]
+                lot[1] -= taken
+                need -= taken
+                if lot[1] == 0:
+                    lots.remove(lot)
+            sells.append((units - need, round(row.amount - row.fee - cost, 2)))
+        elif row.type == 'DIVIDEND':
+            dividends.append([(lot[0], lot[1]) for lot in lots if lot[1] > 0])
+    return [(lot[0], lot[1] / 100) for lot in lots if lot[1] > 0], sells, dividends
+
+
+def random_rows(rng, count):
+    rows, timestamp = [], datetime(2020, 1, 1)
+    for i in range(count):
+        timestamp += timedelta(days=rng.randint(0, 3))
+        trade_type = rng.choice(['BUY', 'BUY', 'SELL', 'SELL', 'DIVIDEND', 'OTHER'])
+        quantity = rng.choice([100, 200, 50.5, rng.randint(1, 1000)])
+        rows.append(Row(i + 1, timestamp, trade_type, quantity if trade_type != 'DIVIDEND' else 0,
+                        round(quantity * rng.uniform(5, 20), 3), round(rng.random() * 5, 2)))
+    return rows
+
+
+@pytest.mark.parametrize('method', CostBasisService.METHODS)
+def test_replay_matches_naive_lot_replay(method):
+    rng = random.Random(7)
+    for _ in range(150):
+        rows = random_rows(rng, rng.randint(0, 60))
+        result = CostBasisService.replay(rows, method)
+        lots, sells, dividends = naive_replay(rows, method)
+
+        assert sorted(((lot['transaction_id'], lot['quantity']) for lot in result['lots']), key=str) == \
+            sorted(lots, key=str)
+        assert [round(sell['matched_quantity'] * 100) for sell in result['sells']] == [sell[0] for sell in sells]
+        assert [sell['realized_pnl'] for sell in result['sells']] == pytest.approx([sell[1] for sell in sells],
+                                                                                 abs=0.02)
+        assert [sorted(((item['lot_transaction_id'], round(item['quantity'] * 100))
+                        for item in dividend['allocations']), key=str) for dividend in result['dividends']] == \
+            [sorted(allocation, key=str) for allocation in dividends]
+
+
+def test_fifo_and_lifo_realize_different_pnl():
+    rows = [Row(1, datetime(2024, 1, 1), 'BUY', 100, 1000, 0), Row(2, datetime(2024, 1, 2), 'BUY', 100, 2000, 0),
+            Row(3, datetime(2024, 1, 3), 'SELL', 100, 1800, 0)]
+    pnl = {method: CostBasisService.replay(rows, method)['sells'][0]['realized_pnl']
+           for method in CostBasisService.METHODS}
+    assert pnl == pytest.approx({'fifo': 800, 'lifo': -200, 'average': 300})
+
+
+def test_invalidate_during_replay_is_not_overwritten(monkeypatch):
+    rows = [Row(1, datetime(2024, 1, 1), 'BUY', 100, 1000, 0)]
+
+    def load(stock_code):
+        # 回放读取交易后、写入缓存前，另一个请求提交了该证券的交易变更
+        CostBasisService.invalidate([stock_code])
+        return rows
+
+    monkeypatch.setattr(CostBasisService, '_cache', {})
+    monkeypatch.setattr(CostBasisService, 'load', staticmethod(load))
+    assert CostBasisService.get('600000')['lots'][0]['quantity'] == 100
+    assert ('600000', 'fifo') not in CostBasisService._cache
+
+    monkeypatch.setattr(CostBasisService, 'load', staticmethod(lambda stock_code: rows))
+    CostBasisService.get('600000')
+    assert ('600000', 'fifo') in CostBasisService._cache
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# tests/test_fetch_scheduler.py
+"""
+行情抓取调度：本地 http.server 桩模拟 stockapi 日线接口，按证券代码预设失败次数
+
+抓取函数有两种：直接用 urllib 请求桩，以及把 price_getter.query_stock_price 指向桩
+（需要安装 requests、akshare，未安装时跳过）。
+"""
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.utils.fetch_scheduler import FetchScheduler, FetchTask, TokenBucket, backoff_delay
+
+
+class StubUpstream:
+    """行情接口桩：failures 为证券代码 -> 返回 500 的次数，hits 记录每次请求的 (时间, 代码)，day 为返回的交易日"""
+    QUOTE = {'open': 10.2, 'high': 10.8, 'low': 10.1, 'close': 10.5, 'volume': 1000, 'amount': 10500,
+             'turnoverRatio': 0.0123, 'change': 0.3, 'changeRatio': 2.94}
+
+    def __init__(self, failures=None, day='2024-01-02'):
+        self.failures = dict(failures or {})
+        self.day = day
+        self.hits = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                code = parse_qs(urlparse(self.path).query)['code'][0]
+                with stub.lock:
+                    stub.hits.append((time.monotonic(), code))
+                    failed = stub.failures.get(code, 0) > 0
+                    if failed:
+                        stub.failures[code] -= 1
+                body = {'data': [] if failed else [{'code': f'{code}.SH', 'time': stub.day, **stub.QUOTE}]}
+                self.send_response(500 if failed else 200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(body).encode())
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v1/base/day'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(params=['urllib', 'query_stock_price'])
+def fetch(request, upstream, monkeypatch):
+    """返回 fetch(code) -> 抓取函数，结果为 [{'stock_code': ..., ...}]"""
+    if request.param == 'query_stock_price':
+        pytest.importorskip('requests')
+        pytest.importorskip('akshare')
+        import price_getter
+        monkeypatch.setattr(price_getter, 'STOCK_API_URL', upstream.url)
+        return lambda code: lambda: price_getter.query_stock_price(code, '2024-01-01', '2024-01-31')
+
+    def fetch_code(code):
+        def fetch_once():
+            with urllib.request.urlopen(f'{upstream.url}?code={code}', timeout=5) as response:
+                return [{'stock_code': item['code'].split('.')[0], 'date': item['time'], 'close': item['close']}
+                        for item in json.loads(response.read())['data']]
+        return fetch_once
+
+    return fetch_code
+
+
+def test_token_bucket_limits_request_rate(upstream, fetch):
+    rate, codes = 20, [f'6000{i:02d}' for i in range(12)]
+    scheduler = FetchScheduler({'stockapi': rate}, max_workers=4, retries=0)
+    results = list(scheduler.run([FetchTask(code, 'stockapi', fetch(code)) for code in codes]))
+
+    assert all(result.ok for result in results)
+    times = sorted(hit[0] for hit in upstream.hits)
+    assert len(times) == len(codes)
+    # 桶容量为 1，n 个请求至少间隔 (n - 1) / rate 秒，允许计时误差
+    assert times[-1] - times[0] >= (len(codes) - 1) / rate * 0.9
+    assert sum(result.throttled for result in results) > 0
+
+
+def test_retries_recover_and_summary_counts(upstream, fetch):
+    upstream.failures.update({'600001': 2, '600002': 1, '510300': 1, 'dead': 99})
+    tasks = [FetchTask(code, 'stockapi', fetch(code)) for code in ('600000', '600001', '600002', 'dead')]
+    tasks.append(FetchTask('510300', 'akshare', fetch('510300')))
+    scheduler = FetchScheduler({'stockapi': 100, 'akshare': 100}, max_workers=3, retries=3, backoff=0.01,
+                               max_backoff=0.05)
+    results = {result.key: result for result in scheduler.run(tasks)}
+
+    assert {key: result.attempts for key, result in results.items()} == {
+        '600000': 1, '600001': 3, '600002': 2, '510300': 2, 'dead': 4}
+    assert results['600001'].ok and results['600001'].value[0]['stock_code'] == '600001'
+    assert not results['dead'].ok and '500' in results['dead'].error
+    assert len(upstream.hits) == 12
+
+    summary = scheduler.metrics.summary()
+    assert (summary['total'], summary['success'], summary['failure']) == (5, 4, 1)
+    assert {name: (item['success'], item['failure'], item['retries'])
+            for name, item in summary['upstreams'].items()} == {'stockapi': (3, 1, 6), 'akshare': (1, 0, 1)}
+    assert [(item['key'], item['attempts']) for item in summary['failures']] == [('dead', 4)]
+
+
+def test_backoff_is_jittered_within_exponential_cap(monkeypatch):
+    monkeypatch.setattr(random, 'uniform', random.Random(3).uniform)
+    for attempt in range(1, 8):
+        cap = min(5.0, 0.5 * 2 ** (attempt - 1))
+        delays = [backoff_delay(attempt, base=0.5, cap=5.0) for _ in range(50)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert len(set(delays)) == len(delays) and max(delays) > cap / 2
+
+
+def test_token_bucket_rejects_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# tests/test_import_job.py
+import os
+import runpy
+import subprocess
+import sys
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import app as app_package
+from app.extentions import db
+from app.models import Cashflow, ImportJob
+from app.service import bulk_import_service
+from app.service.bulk_import_service import BulkImportService
+from app.service.cashflow_dedup_service import add_cashflow_records
+from app.service.import_job_service import ImportJobService
+from app.service.import_ledger_service import ImportLedgerService
+from benchmark.bill_generator import generate_bill
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app('cashflow', 'cashflow_ngram', 'import_job', 'import_ledger', 'account_info')
+    with app.app_context():
+        yield app
+
+
+def run_job(path, owns_file):
+    job = ImportJob(job_id='job' + str(owns_file), file_name=os.path.basename(path), file_path=str(path),
+                    owns_file=owns_file, state=ImportJob.PENDING)
+    db.session.add(job)
+    db.session.commit()
+    ImportJobService.execute(job.job_id)
+    return db.session.get(ImportJob, job.job_id)
+
+
+def test_failed_job_keeps_archive_it_does_not_own(app, tmp_path, monkeypatch):
+    archive = tmp_path / 'bills.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('bad.csv', 'not a bill')
+
+    def fail(path, max_workers=None, progress=None):
+        raise RuntimeError('broken member')
+
+    monkeypatch.setattr(BulkImportService, 'import_path', fail)
+    job = run_job(archive, owns_file=False)
+    assert job.state == ImportJob.FAILED
+    assert archive.exists()
+
+
+def test_failed_upload_is_removed(app, tmp_path):
+    upload = tmp_path / 'uploads' / 'unknown.csv'
+    upload.write_text('not a bill')
+    job = run_job(upload, owns_file=True)
+    assert job.state == ImportJob.FAILED
+    assert not upload.exists()
+
+
+def test_archive_members_parse_in_spawned_workers(app, tmp_path):
+    bills = tmp_path / 'bills'
+    bills.mkdir()
+    # 两个待解析文件时才使用进程池
+    paths = [generate_bill('alipay', str(bills), 50), generate_bill('weixin', str(bills), 50)]
+    archive = tmp_path / 'bills.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for path in paths:
+            zf.write(path, os.path.basename(path))
+        zf.writestr('bad.csv', 'not a bill')
+
+    job = run_job(archive, owns_file=False)
+    assert job.state == ImportJob.SUCCEEDED
+    # 两个账单都已解析（部分状态的明细会被处理器过滤）
+    assert job.rows_parsed > 50
+    assert 'bad.csv' in job.error
+    assert archive.exists()
+
+
+def test_records_and_ledger_commit_together(app, tmp_path, monkeypatch):
+    path = generate_bill('alipay', str(tmp_path), 50)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('ledger write failed')
+
+    monkeypatch.setattr(ImportLedgerService, 'record', fail)
+    summary = BulkImportService.import_path(path)
+    assert summary['files'][0]['error'] == 'ledger write failed'
+    # 登记失败时明细也不提交，重新导入时不会因时间窗口缺失而重复写入
+    assert db.session.query(Cashflow).count() == 0
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx'])
+@pytest.mark.parametrize('stream_threshold', [BulkImportService.STREAM_THRESHOLD, 0])
+def test_archive_members_are_opened_as_streams(app, tmp_path, monkeypatch, fmt, stream_threshold):
+    path = generate_bill('alipay', str(tmp_path), 200, fmt)
+    archive = tmp_path / 'bills.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.write(path, os.path.basename(path))
+
+    # 成员只通过 archive.open 按需读取，不整体读入内存（xlsx 自身的 zip 结构由 openpyxl 读取）
+    read = zipfile.ZipFile.read
+
+    def read_outer(self, name, *args, **kwargs):
+        if self.filename == str(archive):
+            pytest.fail('member read into memory')
+        return read(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, 'read', read_outer)
+    monkeypatch.setattr(BulkImportService, 'STREAM_THRESHOLD', stream_threshold)
+    summary = BulkImportService.import_path(str(archive))
+    assert summary['files'][0]['error'] is None
+    assert summary['rows_inserted'] == db.session.query(Cashflow).count() > 0
+
+
+def test_each_file_commits_separately(app, tmp_path, monkeypatch):
+    bills = tmp_path / 'bills'
+    bills.mkdir()
+    generate_bill('alipay', str(bills), 50)
+    generate_bill('weixin', str(bills), 50)
+    record = ImportLedgerService.record
+
+    def fail_weixin(content_hash, file_name, source, records):
+        if source != '支付宝':
+            raise RuntimeError('ledger write failed')
+        record(content_hash, file_name, source, records)
+
+    monkeypatch.setattr(ImportLedgerService, 'record', staticmethod(fail_weixin))
+    summary = BulkImportService.import_path(str(bills), max_workers=1)
+    errors = {f['file']: f['error'] for f in summary['files']}
+    assert sorted(errors.values(), key=str) == [None, 'ledger write failed']
+    # 一个文件写库失败不影响已提交的其他文件
+    assert summary['rows_inserted'] == db.session.query(Cashflow).count() > 0
+    assert db.session.query(Cashflow.source).distinct().count() == 1
+
+
+def test_job_progress_is_committed_per_file(app, tmp_path, monkeypatch):
+    bills = tmp_path / 'bills'
+    bills.mkdir()
+    generate_bill('alipay', str(bills), 50)
+    generate_bill('weixin', str(bills), 50)
+    committed = []
+
+    def add_records(records, commit=True):
+        # 写入每个文件前，从另一个连接读取任务已提交的进度
+        with db.engine.connect() as connection:
+            committed.append(connection.execute(
+                text("select rows_parsed from import_job where job_id = 'jobFalse'")).scalar())
+        return add_cashflow_records(records, commit)
+
+    monkeypatch.setattr(bulk_import_service, 'add_cashflow_records', add_records)
+    job = run_job(bills, owns_file=False)
+    assert job.state == ImportJob.SUCCEEDED
+    assert committed[0] == 0 and 0 < committed[1] < job.rows_parsed
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, job_id):
+        self.submitted.append(job_id)
+
+
+def add_job(job_id, state, heartbeat=None, owner=None):
+    db.session.add(ImportJob(job_id=job_id, file_name=job_id, file_path=job_id, state=state,
+                             heartbeat=heartbeat, owner=owner))
+    db.session.commit()
+
+
+def test_claim_is_exclusive(app):
+    add_job('pending', ImportJob.PENDING)
+    assert ImportJobService.claim('pending')
+    assert not ImportJobService.claim('pending')
+    job = db.session.get(ImportJob, 'pending')
+    db.session.refresh(job)
+    assert job.state == ImportJob.RUNNING and job.owner == ImportJobService.owner()
+
+
+def test_execute_skips_job_running_elsewhere(app, monkeypatch):
+    add_job('busy', ImportJob.RUNNING, heartbeat=datetime.now(), owner='other-host:1')
+    monkeypatch.setattr(BulkImportService, 'import_path', lambda *args, **kwargs: pytest.fail('job ran twice'))
+    ImportJobService.execute('busy')
+    assert db.session.get(ImportJob, 'busy').owner == 'other-host:1'
+
+
+def test_resume_only_reclaims_expired_leases(app, monkeypatch):
+    executor = RecordingExecutor()
+    monkeypatch.setattr(ImportJobService, '_executor', executor)
+    add_job('pending', ImportJob.PENDING)
+    add_job('alive', ImportJob.RUNNING, heartbeat=datetime.now(), owner='other-host:1')
+    add_job('dead', ImportJob.RUNNING, heartbeat=datetime.now() - ImportJobService.LEASE * 2, owner='other-host:2')
+    add_job('legacy', ImportJob.RUNNING)
+    add_job('done', ImportJob.SUCCEEDED)
+
+    assert ImportJobService.resume_unfinished() == 3
+    assert sorted(executor.submitted) == ['dead', 'legacy', 'pending']
+    assert ImportJobService.claim('dead')
+    assert not ImportJobService.claim('alive')
+
+
+def test_init_app_does_not_resume_jobs(app, monkeypatch):
+    add_job('pending', ImportJob.PENDING)
+    monkeypatch.setattr(ImportJobService, '_heartbeat', object())
+    ImportJobService.init_app(app)
+    ImportJobService._executor.shutdown(wait=True)
+    assert db.session.get(ImportJob, 'pending').state == ImportJob.PENDING
+
+
+def test_heartbeat_refreshes_own_jobs(app):
+    stale = datetime.now() - timedelta(hours=1)
+    add_job('mine', ImportJob.RUNNING, heartbeat=stale, owner=ImportJobService.owner())
+    add_job('theirs', ImportJob.RUNNING, heartbeat=stale, owner='other-host:1')
+    assert ImportJobService.beat() == 1
+    assert db.session.get(ImportJob, 'theirs').heartbeat == stale
+
+
+def test_reimporting_run_module_has_no_side_effects(monkeypatch):
+    # spawn 子进程以 __mp_main__ 重新导入 run.py，不得创建应用或恢复任务
+    monkeypatch.setattr(app_package, 'create_app', lambda *args, **kwargs: pytest.fail('create_app in worker'))
+    monkeypatch.setattr(ImportJobService, 'resume_unfinished', lambda: pytest.fail('resume in worker'))
+    namespace = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'run.py'),
+                               run_name='__mp_main__')
+    assert 'app' not in namespace
+
+
+def test_parse_worker_does_not_import_app():
+    # 进程池工作函数所在模块只依赖 parser 包
+    code = "import sys, parser.worker; print(sorted(m for m in sys.modules if m == 'app' or m.startswith('app.')))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
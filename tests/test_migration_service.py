@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# tests/test_migration_service.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.extentions import db
+from app.models import Cashflow
+from app.service.migration_service import MigrationService
+
+
+def test_mysql_full_scan_is_flagged_even_with_possible_keys():
+    rows = [
+        {'table': 'cashflow', 'type': 'ALL', 'possible_keys': 'idx_cashflow_payment_time', 'rows': 120000},
+        {'table': 'account_info', 'type': 'ALL', 'possible_keys': None, 'rows': 8},
+        {'table': 'stock_price', 'type': 'ref', 'possible_keys': 'PRIMARY', 'rows': 30},
+    ]
+    assert MigrationService.table_scans(rows, 'mysql') == [('cashflow', 120000), ('account_info', 8)]
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app('cashflow', 'cashflow_ngram')
+    with app.app_context():
+        for i in range(3):
+            db.session.add(Cashflow(cashflow_id=str(i), time=datetime(2024, 1, 1), goods='商品', debit_credit='支出',
+                                    amount=1, payment_method='账户'))
+        db.session.commit()
+        yield app
+
+
+def test_explain_flags_every_full_scan(app):
+    _, full_scans = MigrationService.explain(select(Cashflow.cashflow_id).where(Cashflow.goods == '商品'))
+    assert full_scans == ['cashflow']
+    _, full_scans = MigrationService.explain(select(Cashflow.goods).where(Cashflow.cashflow_id == '1'))
+    assert full_scans == []
+
+
+def test_small_table_exception_needs_explicit_threshold(app, monkeypatch):
+    statement = select(Cashflow.cashflow_id).where(Cashflow.goods == '商品')
+    assert MigrationService.explain(statement, small_table_rows=3)[1] == []
+    assert MigrationService.explain(statement, small_table_rows=2)[1] == ['cashflow']
+
+    # MySQL 按 EXPLAIN 估算的行数判断
+    monkeypatch.setattr(MigrationService, 'table_scans', staticmethod(lambda rows, dialect_name: [('cashflow', 50)]))
+    assert MigrationService.explain(statement)[1] == ['cashflow']
+    assert MigrationService.explain(statement, small_table_rows=100)[1] == []
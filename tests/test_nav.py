@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# tests/test_nav.py
+"""组合每日估值：分段增量 update 与全量 rebuild、逐日循环的参照实现结果一致"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.extentions import db
+from app.models import StockPrice, Transaction
+from app.service.nav_service import NavService
+from app.service.position_service import PositionService
+
+CODES = ['600001', '000002', '510300']
+DAYS = [date(2024, 1, 1) + timedelta(days=i) for i in range(90) if (date(2024, 1, 1) + timedelta(days=i)).weekday() < 5]
+
+
+@pytest.fixture
+def prices(make_app):
+    app = make_app('transaction', 'stock_price', 'portfolio_daily_value', 'position')
+    rng = random.Random(3)
+    prices = {}
+    with app.app_context():
+        for code in CODES:
+            price = rng.uniform(5, 50)
+            for day in DAYS:
+                price *= 1 + rng.gauss(0, 0.02)
+                if rng.random() < 0.1 and day > DAYS[3]:
+                    continue  # 停牌
+                prices[(code, day)] = round(price, 2)
+                db.session.add(StockPrice(stock_code=code, date=day, open=price, high=price, low=price,
+                                          close=round(price, 2), volume=1, amount=1, turnover=0))
+        for _ in range(80):
+            # 部分交易落在周末，归入之后的第一个交易日
+            day = rng.choice(DAYS[:80]) + timedelta(days=rng.choice([0, 0, 0, 5]))
+            trade_type = rng.choice(['BUY', 'BUY', 'SELL', 'DIVIDEND'])
+            quantity = rng.choice([100, 200, 300]) if trade_type != 'DIVIDEND' else 0
+            amount = round(quantity * rng.uniform(5, 50), 2) if quantity else round(rng.uniform(10, 100), 2)
+            db.session.add(Transaction(stock_code=rng.choice(CODES), type=trade_type,
+                                       timestamp=datetime.combine(day, datetime.min.time()) + timedelta(hours=10),
+                                       quantity=quantity, price=1, amount=amount, fee=round(rng.random() * 5, 2)))
+        db.session.commit()
+        PositionService.rebuild()
+        yield prices
+
+
+def reference(prices):
+    """逐日循环：按交易日遍历全部交易，时间加权收益率按当日现金流调整"""
+    rows = db.session.query(Transaction).all()
+    first = min(row.timestamp.date() for row in rows)
+    axis = [day for day in sorted({day for (_, day) in prices}) if day >= first]
+    holdings, last_price = {code: 0.0 for code in CODES}, {}
+    result, previous_value, nav, net_investment = [], 0.0, 1.0, 0.0
+    for i, day in enumerate(axis):
+        previous_day = axis[i - 1] if i else date(1900, 1, 1)
+        flow = 0.0
+        for row in rows:
+            if previous_day < row.timestamp.date() <= day:
+                quantity, amount, fee = float(row.quantity), float(row.amount), float(row.fee)
+                if row.type == 'BUY':
+                    holdings[row.stock_code] += quantity
+                    flow += amount + fee
+                elif row.type == 'SELL':
+                    holdings[row.stock_code] -= quantity
+                    flow += -amount + fee
+                elif row.type == 'DIVIDEND':
+                    flow -= amount
+        for code in CODES:
+            if (code, day) in prices:
+                last_price[code] = prices[(code, day)]
+        market_value = sum(holdings[code] * last_price[code] for code in CODES if code in last_price)
+        denominator = previous_value + max(flow, 0)
+        nav *= (market_value - min(flow, 0)) / denominator if denominator > 0 else 1
+        net_investment += flow
+        previous_value = market_value
+        result.append((day, round(market_value, 2), round(net_investment, 2), round(nav, 6)))
+    return result
+
+
+def stored():
+    return [(row.date, float(row.market_value), float(row.net_investment), float(row.nav)) for row in NavService.range()]
+
+
+def assert_same(actual, expected):
+    """增量计算从已存储（6 位小数）的净值接续，与连续计算的差异在舍入误差内"""
+    assert [row[0] for row in actual] == [row[0] for row in expected]
+    for got, want in zip(actual, expected):
+        assert got[1:3] == pytest.approx(want[1:3], abs=0.011)
+        assert got[3] == pytest.approx(want[3], abs=2e-6)
+
+
+def test_incremental_update_matches_rebuild(prices):
+    assert NavService.update(until=DAYS[10]) > 0
+    assert NavService.update(until=DAYS[30]) > 0
+    assert NavService.update() > 0
+    assert NavService.update() == 0
+    incremental = stored()
+
+    assert NavService.rebuild() == len(incremental)
+    assert_same(stored(), incremental)
+    assert_same(incremental, reference(prices))
+
+
+def test_backfilled_trade_truncates_and_update_catches_up(prices):
+    NavService.update()
+    transaction = Transaction(stock_code='600001', type='BUY', timestamp=datetime(2024, 2, 7, 11), quantity=1000,
+                              price=1, amount=9000, fee=3)
+    db.session.add(transaction)
+    db.session.flush()
+    PositionService.apply(added=[transaction])
+    db.session.commit()
+    assert NavService.last().date < date(2024, 2, 7)
+
+    NavService.update()
+    incremental = stored()
+    assert_same(incremental, reference(prices))
+
+    NavService.rebuild(date(2024, 3, 1))
+    assert_same(stored(), incremental)
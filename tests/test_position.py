@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# tests/test_position.py
+"""增量维护的持仓表在新增、修改、删除交易后与交易表的实时汇总一致"""
+import random
+
+import pytest
+from sqlalchemy import text
+
+from app.extentions import db
+from app.service.position_service import PositionService
+
+
+def random_trade(rng, i):
+    return {'stock_code': f'{i % 7:06d}', 'type': rng.choice(['BUY', 'BUY', 'SELL', 'DIVIDEND']),
+            'timestamp': f'2024-0{i % 9 + 1}-{i % 28 + 1:02d} 10:00:00', 'price': 10.5,
+            'quantity': rng.randint(1, 500), 'fee': round(rng.random() * 5, 2),
+            'amount': round(rng.random() * 10000, 3), 'payment_method': '券商'}
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app('transaction', 'cashflow', 'cashflow_ngram', 'position', 'portfolio_daily_value')
+    with app.app_context():
+        client = app.test_client()
+        rng = random.Random(5)
+        assert client.post('/api/transaction', json=[random_trade(rng, i) for i in range(300)]).status_code == 201
+        yield client
+
+
+def test_check_after_bulk_apply(client):
+    assert PositionService.check() == []
+
+
+def test_check_after_update_and_delete(client):
+    assert client.put('/api/transaction/5', json={'stock_code': '999999', 'quantity': 7, 'type': 'BUY'}) \
+        .status_code == 200
+    assert client.put('/api/transaction/6', json={'type': 'SELL', 'quantity': 3, 'amount': 1}).status_code == 200
+    assert client.delete('/api/transaction/7').status_code == 200
+    assert PositionService.check() == []
+    assert client.get('/api/asset/position/999999').get_json()['quantity'] == 7
+
+    # 证券的最后一笔交易删除后持仓记录一并删除
+    assert client.delete('/api/transaction/5').status_code == 200
+    assert client.get('/api/asset/position/999999').status_code == 404
+    assert PositionService.check() == []
+
+
+def test_check_reports_drift_and_rebuild_repairs_it(client):
+    db.session.execute(text("update position set quantity = quantity + 1 where stock_code = '000001'"))
+    db.session.commit()
+    assert [(item['stock_code'], item['field']) for item in PositionService.check()] == [('000001', 'quantity')]
+
+    assert PositionService.rebuild() == 7
+    assert PositionService.check() == []
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# tests/test_risk_metrics.py
+"""向量化风险指标与 pandas 逐列计算的结果对比"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.service.risk_service import TRADING_DAYS, metrics, money_weighted_return
+
+RISK_FREE = 0.02
+
+
+@pytest.fixture
+def prices():
+    """300 个交易日 × 4 只证券，含上市前空值和停牌空值；最后一列为基准"""
+    rng = np.random.default_rng(11)
+    values = 20 * np.cumprod(1 + rng.normal(0.0005, 0.02, size=(300, 4)), axis=0)
+    values[:40, 1] = np.nan  # 区间中途上市
+    values[rng.random((300, 4)) < 0.05] = np.nan
+    values[:, 3] = 3000 * np.cumprod(1 + rng.normal(0.0003, 0.01, size=300))
+    return values
+
+
+def pandas_metrics(series, benchmark):
+    returns = series.pct_change(fill_method=None)
+    benchmark_returns = benchmark.pct_change(fill_method=None)
+    rf_daily = (1 + RISK_FREE) ** (1 / TRADING_DAYS) - 1
+    excess = returns - rf_daily
+    observed = series.dropna()
+    total = observed.iloc[-1] / observed.iloc[0] - 1
+    paired = returns.notna() & benchmark_returns.notna()
+    return {
+        'total_return': total,
+        'annualized_return': (1 + total) ** (TRADING_DAYS / returns.count()) - 1,
+        'volatility': returns.std() * math.sqrt(TRADING_DAYS),
+        'max_drawdown': (series / series.cummax() - 1).min(),
+        'sharpe': excess.mean() / returns.std() * math.sqrt(TRADING_DAYS),
+        'sortino': excess.mean() / math.sqrt((excess.clip(upper=0) ** 2).mean()) * math.sqrt(TRADING_DAYS),
+        'beta': returns.cov(benchmark_returns) / benchmark_returns[paired].var(),
+    }
+
+
+def test_metrics_match_pandas(prices):
+    result = metrics(prices[:, :3], prices[:, 3], RISK_FREE)
+    benchmark = pd.Series(prices[:, 3])
+    for column in range(3):
+        expected = pandas_metrics(pd.Series(prices[:, column]), benchmark)
+        for name, value in expected.items():
+            assert result[name][column] == pytest.approx(value, rel=1e-9), (column, name)
+
+
+def test_single_column_and_short_series():
+    result = metrics(np.array([10.0, 11.0, 9.9]))
+    assert result['total_return'][0] == pytest.approx(-0.01)
+    assert result['max_drawdown'][0] == pytest.approx(-0.1)
+    assert np.isnan(result['beta'][0])
+    assert all(np.isnan(values[0]) for values in metrics(np.array([10.0])).values())
+
+
+def days(*values):
+    return pd.to_datetime(list(values)).values.astype('datetime64[D]')
+
+
+def test_money_weighted_return():
+    # 投入 100，一年（365 天）后取回 110
+    assert money_weighted_return(days('2023-01-01', '2024-01-01'), np.array([-100.0, 110.0])) == \
+        pytest.approx(0.10, abs=1e-9)
+    # 两年各投入 100，第二年末取回 230：100(1+r)^2 + 100(1+r) = 230
+    expected = (-100 + math.sqrt(100 ** 2 + 4 * 100 * 230)) / 200 - 1
+    assert money_weighted_return(days('2021-01-01', '2022-01-01', '2023-01-01'), np.array([-100.0, -100.0, 230.0])) \
+        == pytest.approx(expected, abs=1e-9)
+    assert np.isnan(money_weighted_return(days('2023-01-01', '2024-01-01'), np.array([-100.0, -10.0])))
+
+
+def test_money_weighted_return_zeroes_npv():
+    dates = days('2024-01-05', '2024-02-20', '2024-06-30', '2024-09-01', '2025-03-31')
+    flows = np.array([-1000.0, -500.0, 200.0, -300.0, 1800.0])
+    rate = money_weighted_return(dates, flows)
+    years = pd.Series(pd.to_datetime(dates) - pd.to_datetime(dates[0])).dt.days / 365
+    assert (flows * (1 + rate) ** -years).sum() == pytest.approx(0, abs=1e-6)
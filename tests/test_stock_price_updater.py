@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# tests/test_stock_price_updater.py
+"""行情更新任务冒烟测试：price_getter 指向本地 stockapi 桩，走完抓取、写库、刷新最新价格的完整流程"""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from app.extentions import db
+from app.models import LatestPrice, PortfolioDailyValue, StockPrice, Transaction
+from test_fetch_scheduler import StubUpstream
+
+pytest.importorskip('requests')
+pytest.importorskip('akshare')
+
+import price_getter  # noqa: E402
+import stock_price_updater  # noqa: E402
+
+
+def quote(code, day, close):
+    return StockPrice(stock_code=code, date=day, open=close, high=close, low=close, close=close, volume=1, amount=1,
+                      turnover=0)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    stub = StubUpstream(failures={'600001': 99})
+    monkeypatch.setattr(price_getter, 'STOCK_API_URL', stub.url)
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app('stock_price', 'latest_price', 'portfolio_daily_value', 'transaction')
+    app.config.update(PRICE_FETCH_RATES={'stockapi': 100, 'akshare': 100}, PRICE_FETCH_RETRIES=0)
+    with app.app_context():
+        db.session.add_all([quote('600000', date(2024, 1, 1), 9.9), quote('600001', date(2024, 1, 1), 20)])
+        db.session.commit()
+    return app
+
+
+def test_update_stock_prices_through_stub(app, upstream):
+    stock_price_updater.update_stock_prices(app)
+
+    assert sorted(code for _, code in upstream.hits) == ['600000', '600001']
+    with app.app_context():
+        saved = db.session.get(StockPrice, ('600000', date(2024, 1, 2)))
+        assert saved is not None and float(saved.close) == 10.5
+        assert float(db.session.get(LatestPrice, '600000').close) == 10.5
+        # 抓取失败的证券不写入行情
+        assert db.session.query(StockPrice).filter_by(stock_code='600001').count() == 1
+
+
+def test_save_functions_refresh_latest_price(app):
+    with app.app_context():
+        price_getter.save_stock_data([{'stock_code': '600000', 'date': '2024-01-03', 'open': 11, 'high': 11, 'low': 11,
+                                       'close': 11, 'volume': 1, 'amount': 1, 'turnover': 0}])
+        latest = db.session.get(LatestPrice, '600000')
+        assert (latest.date, float(latest.close)) == (date(2024, 1, 3), 11)
+
+        fund = pd.DataFrame([{'date': date(2024, 1, day), 'stock_code': '510300', 'open': 3, 'close': 3 + day / 100,
+                              'high': 3, 'low': 3, 'volume': 1, 'amount': 1, 'turnover': 0} for day in (2, 3)])
+        price_getter.save_fund_data('510300', fund)
+        db.session.expire_all()
+        assert float(db.session.get(LatestPrice, '510300').close) == 3.03
+        # 未写入新行情的证券不在本次刷新范围内
+        assert db.session.get(LatestPrice, '600001') is None
+
+
+def test_late_prices_recompute_stored_nav(app, upstream):
+    with app.app_context():
+        for code in ('600000', '600001'):
+            db.session.add(Transaction(stock_code=code, type='BUY', timestamp=datetime(2024, 1, 1, 10), quantity=100,
+                                       price=1, amount=1000, fee=0))
+        db.session.commit()
+
+    # 600001 抓取失败，2024-01-02 的估值按其前一收盘价 20 计算
+    stock_price_updater.update_stock_prices(app)
+    with app.app_context():
+        assert float(db.session.get(PortfolioDailyValue, date(2024, 1, 2)).market_value) == 100 * 10.5 + 100 * 20
+
+    # 下次运行补抓到 600001 的 2024-01-02 行情，已存储的估值重新计算
+    upstream.failures.clear()
+    stock_price_updater.update_stock_prices(app)
+    with app.app_context():
+        assert float(db.session.get(PortfolioDailyValue, date(2024, 1, 2)).market_value) == 100 * 10.5 * 2
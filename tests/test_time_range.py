@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# tests/test_time_range.py
+"""
+左闭右开时间过滤与原 date_format 写法的结果一致性
+
+SQLite 中以 strftime 代替 MySQL 的 date_format 作为参照，边界数据覆盖月末、季末、年末的最后一秒、
+次日零点以及带微秒的时间。
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Integer, cast, func, select
+
+from app.api.cashflow.resources import total_cache
+from app.extentions import db
+from app.models import Cashflow
+from app.utils.time_range import date_range, month_filter, period_filter, time_range_filter
+
+BOUNDARIES = [
+    datetime(2023, 12, 31, 23, 59, 59),
+    datetime(2023, 12, 31, 23, 59, 59, 999999),
+    datetime(2024, 1, 1, 0, 0, 0),
+    datetime(2024, 1, 15, 12, 30, 0),
+    datetime(2024, 1, 31, 23, 59, 59),
+    datetime(2024, 2, 1, 0, 0, 0),
+    datetime(2024, 2, 29, 23, 59, 59),
+    datetime(2024, 3, 1, 0, 0, 0),
+    datetime(2024, 3, 31, 23, 59, 59),
+    datetime(2024, 4, 1, 0, 0, 0),
+    datetime(2024, 6, 30, 23, 59, 59),
+    datetime(2024, 7, 1, 0, 0, 0),
+    datetime(2024, 9, 30, 23, 59, 59, 500000),
+    datetime(2024, 12, 31, 0, 0, 0),
+    datetime(2024, 12, 31, 23, 59, 59),
+    datetime(2025, 1, 1, 0, 0, 0),
+]
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app('cashflow', 'cashflow_ngram')
+    with app.app_context():
+        for i, time in enumerate(BOUNDARIES):
+            db.session.add(Cashflow(cashflow_id=f'{i:03d}', time=time, goods='商品', debit_credit='支出',
+                                    amount=i + 1, payment_method='账户'))
+        db.session.commit()
+        total_cache.clear()
+        yield app
+
+
+def ids(condition):
+    return set(db.session.execute(select(Cashflow.cashflow_id).where(condition)).scalars())
+
+
+def year_of(column):
+    return func.strftime('%Y', column)
+
+
+def month_of(column):
+    return cast(func.strftime('%m', column), Integer)
+
+
+@pytest.mark.parametrize('value, reference', [
+    ('2024', lambda c: year_of(c) == '2024'),
+    ('2023', lambda c: year_of(c) == '2023'),
+    ('2024-Q1', lambda c: (year_of(c) == '2024') & month_of(c).between(1, 3)),
+    ('2024Q2', lambda c: (year_of(c) == '2024') & month_of(c).between(4, 6)),
+    ('2024-q3', lambda c: (year_of(c) == '2024') & month_of(c).between(7, 9)),
+    ('2024-Q4', lambda c: (year_of(c) == '2024') & month_of(c).between(10, 12)),
+    ('2024-01', lambda c: func.strftime('%Y-%m', c) == '2024-01'),
+    ('2024-02', lambda c: func.strftime('%Y-%m', c) == '2024-02'),
+    ('2024-12', lambda c: func.strftime('%Y-%m', c) == '2024-12'),
+    ('2023-12-31', lambda c: func.strftime('%Y-%m-%d', c) == '2023-12-31'),
+    ('2024-12-31', lambda c: func.strftime('%Y-%m-%d', c) == '2024-12-31'),
+])
+def test_period_filter_matches_date_format(app, value, reference):
+    expected = ids(reference(Cashflow.time))
+    assert expected
+    assert ids(period_filter(Cashflow.time, value)) == expected
+
+
+@pytest.mark.parametrize('value', ['2024-01-01', '2024-02-01', '2024-03-01', '2024-07-01'])
+def test_month_filter_matches_date_format(app, value):
+    expected = ids(func.strftime('%Y-%m-01', Cashflow.time) == value)
+    assert ids(month_filter(Cashflow.time, value)) == expected
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2024-01-01', '2024-01-31'),
+    ('2023-12-31', '2023-12-31'),
+    ('2024-03-31', '2024-07-01'),
+    ('2024-07-01', None),
+    (None, '2024-02-29'),
+])
+def test_date_range_includes_last_second_of_end_date(app, start, end):
+    day = func.strftime('%Y-%m-%d', Cashflow.time)
+    expected = ids((day >= (start or '0000-00-00')) & (day <= (end or '9999-99-99')))
+    assert ids(time_range_filter(Cashflow.time, *date_range(start, end))) == expected
+
+
+def test_cursor_total_cache_key_includes_date_range(app):
+    client = app.test_client()
+
+    def total(**params):
+        response = client.get('/api/cashflow', query_string={'cursor': '', 'withTotal': 'true', **params})
+        return response.get_json()['total']
+
+    assert total(startDate='2024-01-01', endDate='2024-01-31') == 3
+    # 日期区间不同，不能命中上一次的缓存
+    assert total(startDate='2024-01-01', endDate='2024-12-31') == 13
+    assert total(startDate='2024-12-31') == 3
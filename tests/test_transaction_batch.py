@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# tests/test_transaction_batch.py
+from decimal import Decimal
+
+import pytest
+
+from app.extentions import db
+from app.models import Position, Transaction
+from app.service.transaction_service import TransactionService
+
+
+def trade(**values):
+    return {'stock_code': '600000', 'type': 'BUY', 'timestamp': '2024-03-01 10:00:00', 'price': 10.5,
+            'quantity': 100, 'amount': '1050.00', 'fee': 5, 'payment_method': '券商', **values}
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app('transaction', 'cashflow', 'cashflow_ngram', 'position', 'portfolio_daily_value')
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_validate_converts_numbers_to_decimal():
+    row, error = TransactionService.validate(trade(price='10.5', quantity=100))
+    assert error is None
+    assert row['transaction']['price'] == Decimal('10.5')
+    assert all(isinstance(row['transaction'][field], Decimal) for field in TransactionService.NUMERIC_FIELDS)
+    assert row['cashflow']['amount'] == pytest.approx(1055.0)
+
+
+@pytest.mark.parametrize('values', [
+    {'price': 'abc'}, {'quantity': ''}, {'amount': [1]}, {'fee': True}, {'price': 'NaN'}, {'amount': 'Infinity'}])
+def test_validate_reports_non_numeric_values(values):
+    row, error = TransactionService.validate(trade(**values))
+    assert row is None
+    assert error['error'].startswith('数值格式错误') and next(iter(values)) in error['error']
+
+
+def test_batch_with_non_numeric_row_returns_207(client):
+    response = client.post('/api/transaction', json=[trade(), trade(price='ten'), trade(type='SELL', quantity=40,
+                                                                                       amount=440)])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [error['index'] for error in body['errors']] == [1]
+    assert "price='ten'" in body['errors'][0]['error']
+    assert len(body['created_ids']) == 2
+
+    assert db.session.query(Transaction).count() == 2
+    assert db.session.get(Position, '600000').quantity == 60
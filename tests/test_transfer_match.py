@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# tests/test_transfer_match.py
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extentions import db
+from app.models import AccountInfo, Cashflow
+from app.service.transfer_match_service import TransferMatchService
+
+Row = namedtuple('Row', 'cashflow_id time debit_credit amount payment_method counterparty type goods')
+ACCOUNTS = {'招商银行', '余额宝', '微信零钱'}
+T0 = datetime(2024, 3, 1, 12)
+
+
+def row(cashflow_id, minutes, debit_credit, payment_method, counterparty='商户', goods='商品', amount=100.0,
+        type=None):
+    return Row(cashflow_id, T0 + timedelta(minutes=minutes), debit_credit, amount, payment_method, counterparty,
+               type, goods)
+
+
+def test_same_amount_without_evidence_is_not_paired():
+    rows = [row('a', 0, '支出', '招商银行'), row('b', 5, '收入', '余额宝', counterparty='某公司')]
+    assert TransferMatchService.pair(rows, accounts=ACCOUNTS) == []
+
+
+@pytest.mark.parametrize('out_row, in_row', [
+    (row('a', 0, '支出', '招商银行', counterparty='余额宝'), row('b', 5, '收入', '余额宝')),
+    (row('a', 0, '支出', '招商银行'), row('b', 5, '收入', '余额宝', counterparty='招商银行')),
+    (row('a', 0, '支出', '招商银行', goods='余额宝-自动转入'), row('b', 5, '收入', '余额宝')),
+    (row('a', 0, '支出', '招商银行'), row('b', 5, '收入', '余额宝', type='自转账')),
+])
+def test_pair_requires_evidence(out_row, in_row):
+    assert TransferMatchService.pair([in_row, out_row], accounts=ACCOUNTS) == [('a', 'b')]
+
+
+def test_counterparty_must_name_the_other_account():
+    rows = [row('a', 0, '支出', '招商银行', counterparty='微信零钱'), row('b', 5, '收入', '余额宝')]
+    assert TransferMatchService.pair(rows, accounts=ACCOUNTS) == []
+
+
+def test_evidence_pair_is_not_blocked_by_earlier_unrelated_row():
+    rows = [row('a', 0, '支出', '招商银行'), row('b', 1, '支出', '微信零钱', counterparty='余额宝'),
+            row('c', 2, '收入', '余额宝')]
+    assert TransferMatchService.pair(rows, accounts=ACCOUNTS) == [('b', 'c')]
+
+
+def naive_pair(rows, tolerance, accounts):
+    """逐条线性扫描全部待配对记录的参照实现"""
+
+    def evidence(a, b):
+        return b.payment_method in TransferMatchService.evidence_accounts(a, accounts) or \
+            a.payment_method in TransferMatchService.evidence_accounts(b, accounts)
+
+    pending, pairs = [], []
+    for current in sorted(rows, key=lambda r: (round(r.amount * 100), r.time, r.cashflow_id)):
+        options = [p for p in pending
+                   if round(p.amount * 100) == round(current.amount * 100) and p.debit_credit != current.debit_credit
+                   and p.payment_method != current.payment_method and current.time - p.time <= tolerance
+                   and evidence(current, p)]
+        if not options:
+            pending.append(current)
+            continue
+        match = min(options, key=lambda r: (r.time, r.cashflow_id))
+        pending.remove(match)
+        pairs.append((match.cashflow_id, current.cashflow_id) if current.debit_credit == '收入'
+                     else (current.cashflow_id, match.cashflow_id))
+    return pairs
+
+
+def test_pair_matches_naive_scan():
+    rng = random.Random(7)
+    accounts = sorted(ACCOUNTS)
+    rows = []
+    for i in range(600):
+        account = rng.choice(accounts)
+        rows.append(row(f'{i:04d}', rng.randrange(0, 24 * 60), rng.choice(['收入', '支出']), account,
+                        counterparty=rng.choice(accounts + ['商户', '某公司']),
+                        goods=rng.choice(['商品', '商品', '转账']), amount=float(rng.choice([10, 20, 50]))))
+    tolerance = timedelta(minutes=30)
+    assert TransferMatchService.pair(rows, tolerance, ACCOUNTS) == naive_pair(rows, tolerance, ACCOUNTS)
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app('cashflow', 'cashflow_ngram', 'account_info')
+    with app.app_context():
+        for name in ACCOUNTS:
+            db.session.add(AccountInfo(account_name=name, account_type='现金'))
+        for record in [row('a', 0, '支出', '招商银行', counterparty='余额宝'), row('b', 5, '收入', '余额宝')]:
+            db.session.add(Cashflow(**record._asdict()))
+        db.session.commit()
+        yield app.test_client()
+
+
+def test_unpaired_transfer_is_not_matched_again(client):
+    assert TransferMatchService.match() == 1
+    transfer_id = db.session.get(Cashflow, 'a').transfer_id
+
+    response = client.post(f'/api/cashflow/transfer/{transfer_id}/unpair')
+    assert response.status_code == 200
+    assert response.get_json() == {'unpaired': 2}
+    db.session.expire_all()
+    assert db.session.get(Cashflow, 'b').transfer_id is None
+
+    assert TransferMatchService.match() == 0
+    assert client.post(f'/api/cashflow/transfer/{transfer_id}/unpair').status_code == 404
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# tests/test_views.py
+"""
+view.sql 中持仓相关视图在 SQLite 上建立并查询，校验引用的列都存在、口径正确
+
+只做两处方言替换：去掉库名前缀 money_track.，MySQL 的 if() 换成 SQLite 的 iif()。
+"""
+import os
+import re
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.extentions import db
+from app.models import LatestPrice, Position
+
+VIEW_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'view.sql')
+
+
+def view_statement(name):
+    with open(VIEW_SQL, encoding='utf-8') as f:
+        content = f.read()
+    match = re.search(rf'create\s+(?:or\s+replace\s+)?view\s+(?:money_track\.)?{name}\s+as(.*?);', content,
+                      re.IGNORECASE | re.DOTALL)
+    assert match, f'view {name} not found'
+    body = match.group(1).replace('money_track.', '')
+    body = re.sub(r'\bif\(', 'iif(', body)
+    return f'CREATE VIEW {name} AS {body}'
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app('position', 'latest_price')
+    with app.app_context():
+        for name in ('v_position', 'v_position_pnl'):
+            db.session.execute(text(view_statement(name)))
+        db.session.add_all([
+            Position(stock_code='600000', quantity=100, cost=1050.5, trade_count=2, last_updated=datetime(2024, 3, 1)),
+            Position(stock_code='510300', quantity=0, cost=-20, trade_count=2, last_updated=datetime(2024, 3, 1)),
+            LatestPrice(stock_code='600000', date=date(2024, 3, 29), close=12.34),
+            LatestPrice(stock_code='510300', date=date(2024, 3, 29), close=3.5),
+        ])
+        db.session.commit()
+        yield app
+
+
+def test_position_pnl_uses_position_cost(app):
+    rows = {row.stock_code: row for row in db.session.execute(text('select * from v_position_pnl')).all()}
+    assert rows['600000'].avg_cost == pytest.approx(10.505, abs=1e-3)
+    assert rows['600000'].current_price == pytest.approx(12.34)
+    assert rows['600000'].unrealized_pnl == pytest.approx(183.5)
+    # 已清仓的证券剩余成本为负（卖出盈利），未实现盈亏为其相反数
+    assert rows['510300'].avg_cost == 0
+    assert rows['510300'].unrealized_pnl == pytest.approx(20)
+
+
+def test_position_pnl_matches_v_position(app):
+    pnl = db.session.execute(text('select stock_code, quantity, avg_cost from v_position_pnl')).all()
+    position = db.session.execute(text('select stock_code, quantity, avg_cost from v_position')).all()
+    assert sorted(pnl) == sorted(position)
@@ -173,6 +173,7 @@ with cashflow_tb as (select date_format(cf.time, '%Y-%m')
                               left join money_track.account_info ai on cf.payment_method = ai.account_name # 关联获取账户名称
 
                      where cf.transaction_id is null # 只考虑现金流，不包括证券交易，因其只在证券账户内部流转
+                       and cf.transfer_id is null # 排除已配对的自有账户转账
                      group by date_format(cf.time, '%Y-%m'),
                               if(ai.account_name is not null, account_name, 'other'))
 select `year_month`
@@ -211,6 +212,7 @@ from (
         left join money_track.account_info ai on cf.counterparty = ai.account_name
         where cf.transaction_id is null  -- 过滤掉`证券交易`
         and ai.account_name is null  -- 过滤掉`转账记录`
+        and cf.transfer_id is null  -- 过滤掉已配对的自有账户转账
         group by date_format(cf.time, '%Y-%m')) tb
 order by month;
 
@@ -267,6 +269,7 @@ from (
         from money_track.cashflow m
         where m.transaction_id is null  -- 过滤掉证券交易记录
           and m.debit_credit='支出'      -- 只统计支出消费记录
+          and m.transfer_id is null      -- 过滤掉已配对的自有账户转账
           and m.counterparty not in (
                 select distinct account_name from money_track.account_info
      )
@@ -276,26 +279,15 @@ from (
 order by month desc, amount desc;
 
 
-create view money_track.v_position as
+# 持仓：读取按交易记录增量维护的 position 表（见 PositionService），不再每次汇总全部交易
+# 原汇总口径见 PositionService.aggregate，python positions.py check 比对两者
+create or replace view money_track.v_position as
 select stock_code
     , quantity
     , if(quantity>0, round(cost/quantity, 3), 0) as avg_cost
     , round(cost, 2) as total_cost
     , last_updated
-from (
-         SELECT stock_code,
-                SUM(case
-                        when type = 'BUY' then quantity
-                        when type = 'SELL' then -quantity else 0 end)           AS quantity,
-                SUM(CASE
-                        WHEN type = 'BUY' THEN amount + fee
-                        when type = 'SELL' then -amount + fee
-                        when type = 'DIVIDEND' then -amount
-                        ELSE 0 END)                                             AS cost,
-                MAX(timestamp)                                                  AS last_updated
-         FROM money_track.transaction
-         GROUP BY stock_code
-)tb;
+from money_track.position;
 
 
 CREATE VIEW v_current_asset AS
@@ -305,8 +297,7 @@ SELECT
     a.cash + SUM(p.quantity * sp.close) AS total_asset
 FROM asset_snapshot a
          JOIN position p ON 1=1  -- 单账户无需关联条件
-         JOIN stock_price sp ON p.stock_code = sp.stock_code
-WHERE sp.date = (SELECT MAX(date) FROM stock_price);  -- 获取最新价格
+         JOIN latest_price sp ON p.stock_code = sp.stock_code;  -- 各证券最近收盘价
 
 # 持仓盈亏，TODO： 盈亏比例有问题
 # drop view v_current_asset;
@@ -322,12 +313,8 @@ select
     , round(p.quantity * sp.close, 2) as position_value
     , round(p.quantity * p.avg_cost,2) as realized_pnl
 from v_position p
-left join (
-        select date, stock_code, close,
-            row_number() over (partition by stock_code order by date desc) as rn
-        from stock_price
-) sp on p.stock_code = sp.stock_code
-where sp.rn = 1;
+-- 各证券最近收盘价由价格更新任务维护（见 LatestPriceService），不再扫描 stock_price 历史
+join latest_price sp on p.stock_code = sp.stock_code;
 
 -- 示例：统计 2023 年 10 月盈亏
 CREATE VIEW v_monthly_pnl AS
@@ -340,13 +327,13 @@ SELECT
 
 
 
+# position 表只存数量和总成本，平均成本按 cost/quantity 计算；盈亏按总成本计算，避免平均成本的舍入误差
 CREATE VIEW v_position_pnl AS
 SELECT
     p.stock_code,
     p.quantity,
-    p.avg_cost,
+    if(p.quantity>0, round(p.cost/p.quantity, 3), 0) AS avg_cost,
     sp.close AS current_price,
-    (sp.close - p.avg_cost) * p.quantity AS unrealized_pnl  -- 未实现盈亏
+    round(sp.close * p.quantity - p.cost, 2) AS unrealized_pnl  -- 未实现盈亏
 FROM position p
-         JOIN stock_price sp ON p.stock_code = sp.stock_code
-WHERE sp.date = (SELECT MAX(date) FROM stock_price);
+         JOIN latest_price sp ON p.stock_code = sp.stock_code;